@@ -0,0 +1,204 @@
+"""Adaptive tau-leaping for the stochastic Schnakenberg model
+
+The step size is chosen from the current propensities following
+Cao, Gillespie and Petzold (2006), Efficient step size selection for the
+tau-leaping simulation method, J. Chem. Phys. 124, 044109.
+"""
+
+import numpy as np
+import sim
+
+
+def inflow(D):
+    """Return the molecules arriving in each cell from the moves D (down, up, right, left)"""
+    I = np.zeros(D.shape[1:], dtype=D.dtype)
+    I[..., 1:, :] += D[0][..., :-1, :]
+    I[..., :-1, :] += D[1][..., 1:, :]
+    I[..., :, 1:] += D[2][..., :, :-1]
+    I[..., :, :-1] += D[3][..., :, 1:]
+    return I
+
+
+class AdaptiveTauLeapKernel:
+    """
+    Tau-leaping with the step size chosen at each step so that no
+    propensity is expected to change by more than a fraction epsilon.
+
+    Reactions which could take a cell below zero molecules ("critical"
+    reactions, which consume a species in a cell with fewer than n_critical
+    molecules) are not leaped: at most one of them fires per step, chosen
+    exactly as in the SSA. If the leap is so short that exact simulation is
+    cheaper (shorter than ssa_factor / total propensity) n_ssa exact SSA
+    steps are taken instead, and a leap which still takes a cell below
+    zero is rejected and retried with half the step size.
+
+    The channels are numbered as in sim.TauLeapKernel: birth of A and B,
+    death of A, the reaction and the four directions of diffusion for A
+    and for B.
+
+    The step is limited by the diffusion of B: the bound of the change of
+    B in a cell is epsilon * B / 3 molecules but at least one, and for
+    epsilon below about 0.04 (at B around 75) it is held at one molecule,
+    giving steps of about 1 / (variance of the change of B) and 2.7 times
+    as many steps as the fixed tau of the parameter files. The default
+    epsilon of 0.08 takes about as many steps as the fixed tau (470 against
+    500 on the 10x10 lattice of sim_2, see benchmark.bench_engines), with
+    the same spatial means and variances.
+
+    The grids keep their integer type, and are promoted (see
+    sim.fit_dtype) if they outgrow it.
+    """
+
+    def __init__(self, shape, mu, beta, alpha, kappa, d_A, d_B, rng=None, epsilon=0.08,
+                 n_critical=10, ssa_factor=10, n_ssa=100):
+
+        if rng is None:
+            rng = np.random.default_rng()
+
+        self.rng = rng
+        self.rates = {"mu": mu, "beta": beta, "alpha": alpha, "kappa": kappa, "d_A": d_A, "d_B": d_B}
+        self.epsilon = epsilon
+        self.n_critical = n_critical
+        self.ssa_factor = ssa_factor
+        self.n_ssa = n_ssa
+        self.P = np.zeros((12,) + tuple(shape))
+        self.dt = 0
+
+
+    def propensities(self, M_A, M_B):
+        """Return the propensity of every channel in every cell, as a (12, m, n) array"""
+
+        P, rates = self.P, self.rates
+        P[0] = rates["mu"]
+        P[1] = rates["beta"]
+        P[2] = rates["alpha"] * M_A
+        P[3] = rates["kappa"] * M_A * (M_A - 1) * M_B
+        for M, d, i in ((M_A, rates["d_A"], 4), (M_B, rates["d_B"], 8)):
+            P[i:i+4] = d * M
+            P[i][..., -1, :] = 0  # nothing goes down from the bottom row
+            P[i+1][..., 0, :] = 0  # or up from the top row
+            P[i+2][..., :, -1] = 0  # or right from the right column
+            P[i+3][..., :, 0] = 0  # or left from the left column
+        return P
+
+
+    def critical(self, M_A, M_B, P):
+        """Return the mask of channels and cells which could run out of molecules"""
+
+        low_A = M_A < self.n_critical
+        low_B = M_B < self.n_critical
+        mask = np.zeros(P.shape, dtype=bool)
+        mask[2] = low_A
+        mask[3] = low_B
+        mask[4:8] = low_A
+        mask[8:12] = low_B
+        return mask & (P > 0)
+
+
+    def select_tau(self, M_A, M_B, P):
+        """Return the largest leap for which the propensities change by about epsilon"""
+
+        # Mean and variance of the change of each species in each cell
+        mean_A = P[0] - P[2] + P[3] - P[4:8].sum(axis=0) + inflow(P[4:8])
+        var_A = P[0] + P[2] + P[3] + P[4:8].sum(axis=0) + inflow(P[4:8])
+        mean_B = P[1] - P[3] - P[8:12].sum(axis=0) + inflow(P[8:12])
+        var_B = P[1] + P[3] + P[8:12].sum(axis=0) + inflow(P[8:12])
+
+        # Highest order of reaction for each species (A takes part twice in 2A + B -> 3A)
+        A = np.maximum(M_A, 2)
+        g_A = 1.5 * (2 + 1 / (A - 1))
+        g_B = 3
+
+        tau = np.inf
+        for M, g, mean, var in ((M_A, g_A, mean_A, var_A), (M_B, g_B, mean_B, var_B)):
+            bound = np.maximum(self.epsilon * M / g, 1)
+            with np.errstate(divide="ignore"):
+                tau = min(tau, np.min(bound / np.abs(mean)), np.min(bound ** 2 / var))
+        return tau
+
+
+    def apply(self, M_A, M_B, Z):
+        """Return the grids after the reactions Z have fired, as 64-bit grids (see fit)"""
+
+        M_A = M_A + Z[0] - Z[2] + Z[3]
+        M_B = M_B + Z[1] - Z[3]
+        sim.TauLeapKernel.move(M_A, Z[4:8])
+        sim.TauLeapKernel.move(M_B, Z[8:12])
+        return M_A, M_B
+
+
+    @staticmethod
+    def fit(M, M_next):
+        """Return M_next in the type of M, or the smallest larger type it fits in"""
+
+        return M_next.astype(sim.fit_dtype(M.dtype, M_next.min(), M_next.max()), copy=False)
+
+
+    def fire_one(self, P, a0):
+        """Return the flat index of one reaction chosen with probability P / a0"""
+
+        return min(np.searchsorted(np.cumsum(P.ravel()), self.rng.random() * a0, side="right"), P.size - 1)
+
+
+    def ssa(self, M_A, M_B, tau_max):
+        """Take up to n_ssa exact SSA steps, stopping at time tau_max"""
+
+        dt = 0
+        M_A_next, M_B_next = M_A.astype(np.int64), M_B.astype(np.int64)
+        Z = np.zeros(self.P.shape, dtype=np.int64)
+        for _ in range(self.n_ssa):
+            P = self.propensities(M_A_next, M_B_next)
+            a0 = P.sum()
+            if a0 == 0:
+                dt = tau_max
+                break
+            dt_event = self.rng.exponential(1 / a0)
+            if dt + dt_event > tau_max:
+                dt = tau_max
+                break
+            dt += dt_event
+
+            i = self.fire_one(P, a0)
+            Z.ravel()[i] = 1
+            M_A_next, M_B_next = self.apply(M_A_next, M_B_next, Z)
+            Z.ravel()[i] = 0
+        return self.fit(M_A, M_A_next), self.fit(M_B, M_B_next), dt
+
+
+    def step(self, M_A, M_B, tau_max=np.inf):
+        """
+        Advance M_A and M_B by one adaptive step of at most tau_max, and
+        return the new grids (the length of the step is self.dt).
+        """
+
+        P = self.propensities(M_A, M_B)
+        a0 = P.sum()
+        critical = self.critical(M_A, M_B, P)
+        P_noncritical = np.where(critical, 0, P)
+        P_critical = np.where(critical, P, 0)
+
+        tau_1 = min(self.select_tau(M_A, M_B, P_noncritical), tau_max)
+
+        # Leaping that little is not worth it, simulate exactly instead
+        if tau_1 < self.ssa_factor / a0:
+            M_A, M_B, self.dt = self.ssa(M_A, M_B, tau_max)
+            return M_A, M_B
+
+        a0_critical = P_critical.sum()
+
+        while True:
+            # Time until the next critical reaction
+            tau_2 = self.rng.exponential(1 / a0_critical) if a0_critical > 0 else np.inf
+            tau = min(tau_1, tau_2)
+
+            Z = self.rng.poisson(tau * P_noncritical)
+            if tau_2 <= tau_1:
+                Z.ravel()[self.fire_one(P_critical, a0_critical)] += 1
+
+            M_A_next, M_B_next = self.apply(M_A, M_B, Z)
+            if M_A_next.min() >= 0 and M_B_next.min() >= 0:
+                break
+            tau_1 /= 2  # reject the leap
+
+        self.dt = tau
+        return self.fit(M_A, M_A_next), self.fit(M_B, M_B_next)
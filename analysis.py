@@ -0,0 +1,169 @@
+"""Pattern metrics of the simulated grids"""
+
+import numpy as np
+import os
+
+
+def dominant_wavelength(M):
+    """Return the wavelength (in cells) of the strongest spatial mode of M
+
+    The power spectrum of M (minus its mean) is computed with rfft2 over
+    the last two axes, so M can be a single (m, n) grid or a stack of grids
+    such as (R, m, n), in which case an array with one wavelength per grid
+    is returned.
+
+    Params:
+    M [Array] - Grid(s) of molecule numbers or concentrations
+    """
+    M = np.asarray(M, dtype=float)
+    m, n = M.shape[-2:]
+
+    M = M - M.mean(axis=(-2, -1), keepdims=True)
+    power = np.abs(np.fft.rfft2(M)) ** 2
+
+    # Wavenumber (in cycles per cell) of each entry of the spectrum
+    k_y = np.fft.fftfreq(m)[:, None]
+    k_x = np.fft.rfftfreq(n)[None, :]
+    k = np.sqrt(k_y ** 2 + k_x ** 2)
+
+    power[..., k == 0] = 0  # ignore the (zero) mean
+    power = power.reshape(power.shape[:-2] + (-1,))
+    i = np.argmax(power, axis=-1)
+
+    # A uniform grid has no dominant mode
+    k_max = np.where(power.max(axis=-1) > 0, k.ravel()[i], np.nan)
+    return 1 / k_max
+
+
+def count_spots(M, threshold=None, smooth=0):
+    """Return the number of spots (connected regions above threshold) of M
+
+    Regions are connected through the four nearest neighbours. For a stack
+    of grids such as (R, m, n) an array with one count per grid is returned.
+
+    Params:
+    M [Array] - Grid(s) of molecule numbers or concentrations
+    threshold [float] - Level above which a cell belongs to a spot
+                        (default None, the mean of each grid)
+    smooth [float] - Standard deviation (in cells) of a Gaussian filter
+                     applied first, to merge the noise of stochastic grids
+                     (default 0, no filter)
+    """
+    from scipy import ndimage
+
+    M = np.asarray(M, dtype=float)
+    if M.ndim > 2:
+        counts = [count_spots(grid, threshold, smooth) for grid in M.reshape((-1,) + M.shape[-2:])]
+        return np.array(counts).reshape(M.shape[:-2])
+
+    if smooth:
+        M = ndimage.gaussian_filter(M, smooth, mode="nearest")
+    level = M.mean() if threshold is None else threshold
+    return ndimage.label(M > level)[1]
+
+
+def radial_spectrum(M, n_bins=32):
+    """Return the radially averaged power spectrum of M
+
+    The power spectrum of M (minus its mean) from rfft2 is averaged over
+    rings of equal wavenumber, n_bins rings of equal width from 0 to 0.5
+    cycles per cell (the highest wavenumber along an axis).
+
+    Params:
+    M [Array] - Grid of molecule numbers or concentrations
+    n_bins [int] - Number of rings
+
+    Returns the centre wavenumbers (in cycles per cell) and mean power of the rings.
+    """
+    M = np.atleast_2d(np.asarray(M, dtype=float))
+    m, n = M.shape
+    power = np.abs(np.fft.rfft2(M - M.mean())) ** 2
+
+    k = np.sqrt(np.fft.fftfreq(m)[:, None] ** 2 + np.fft.rfftfreq(n)[None, :] ** 2)
+    ring = np.minimum((k / 0.5 * n_bins).astype(int), n_bins)  # ring n_bins collects the corners
+    inside = (k > 0) & (ring < n_bins)
+
+    total = np.bincount(ring[inside], weights=power[inside], minlength=n_bins)
+    count = np.bincount(ring[inside], minlength=n_bins)
+    centres = (np.arange(n_bins) + 0.5) * 0.5 / n_bins
+    return centres, total / np.maximum(count, 1)
+
+
+
+class PatternRecorder:
+    """
+    Records pattern metrics of both species during a run, every stride
+    time points: the spatial mean and variance, the dominant wavelength,
+    the number of spots (or stripes, see count_spots) and the radially
+    averaged power spectrum. The time series are small enough to keep for
+    every run of a sweep, instead of the snapshots.
+    """
+
+    def __init__(self, stride=1_000, smooth=0, n_bins=32):
+
+        """
+        stride is the interval (in time points) between records
+        smooth is the width (in cells) of the Gaussian filter applied
+        before counting spots, to see through the noise of stochastic grids
+        n_bins is the number of rings of the power spectrum
+        """
+
+        self.stride = stride
+        self.smooth = smooth
+        self.n_bins = n_bins
+        self.records = list()
+
+
+    @classmethod
+    def from_params(cls, settings):
+        """Return a recorder for the settings dictionary of a parameter file, or None"""
+        if not settings:
+            return None
+        return cls(**settings)
+
+
+    def due(self, t):
+        """Whether a record is due at time point t"""
+        return not self.records or t - self.records[-1]["t"] >= self.stride
+
+
+    def record(self, t, M_A, M_B):
+        """Compute the metrics of grids M_A and M_B at time point t"""
+        t = t.item() if isinstance(t, np.generic) else t
+        metrics = {"t": t}
+        for M, kind in ((M_A, "A"), (M_B, "B")):
+            M = np.atleast_2d(np.asarray(M, dtype=float))
+            metrics["mean_" + kind] = float(M.mean())
+            metrics["var_" + kind] = float(M.var())
+            metrics["wavelength_" + kind] = float(dominant_wavelength(M))
+            metrics["spots_" + kind] = int(count_spots(M, smooth=self.smooth))
+            metrics["spectrum_" + kind] = radial_spectrum(M, self.n_bins)[1]
+        self.records.append(metrics)
+
+
+    def series(self):
+        """Return a dictionary of metric -> array over the records (and the wavenumbers "k" of the spectra)"""
+        series = {"k": (np.arange(self.n_bins) + 0.5) * 0.5 / self.n_bins}
+        if self.records:
+            for key in self.records[0]:
+                series[key] = np.array([metrics[key] for metrics in self.records])
+        return series
+
+
+    def summary(self):
+        """Return the scalar metrics of the last record"""
+        if not self.records:
+            return dict()
+        return {key: value for key, value in self.records[-1].items() if np.ndim(value) == 0}
+
+
+    def save(self, path):
+        """Write the time series to the .npz file path"""
+        with open(path + ".tmp", "wb") as file:
+            np.savez_compressed(file, **self.series())
+        os.replace(path + ".tmp", path)
+
+
+def load_series(path):
+    """Return the time series saved by PatternRecorder.save as a dictionary of arrays"""
+    return dict(np.load(path))
@@ -0,0 +1,635 @@
+"""Benchmarks of the simulation kernels
+
+Run as a script to print the results for the shipped parameter files, or
+with --suite to run every solver on standard problems (the parameter
+files and grids from 64 x 64 to 1024 x 1024, with fixed seeds), save the
+throughput, memory and accuracy to Data/benchmarks/<commit>.json and flag
+the regressions against the results of an earlier commit.
+"""
+
+import numpy as np
+import time
+import glob
+import os
+import json
+import platform
+import tracemalloc
+import sim
+import parallel
+import streams
+import workflow as wf
+import finite_difference
+import kinetics
+from spectral import SpectralSolver
+
+
+def steps_per_second(step, n_steps):
+    """Return the number of calls of step() per second over n_steps calls"""
+    start_time = time.perf_counter()
+    for _ in range(n_steps):
+        step()
+    return n_steps / (time.perf_counter() - start_time)
+
+
+def bench_calculate_picture(filename, n_steps=200, seed=0):
+    """Compare sim.calculate_picture to sim.TauLeapKernel for a parameter file
+
+    Params:
+    filename [string] - Name of the parameter file in Parameters/
+    n_steps [int] - Number of time steps to time each kernel over
+    seed [int] - Seed of the random number generators
+
+    Returns a dictionary with the steps per second of both kernels.
+    """
+    params = wf.Simulation(filename).params
+    param_dict = {key: params[key] for key in
+                  ("tau", "mu", "beta", "alpha", "kappa", "d_A", "d_B")}
+
+    np.random.seed(seed)
+    state = list(sim.initialize_picture(params['m'], params['n'], params['A_init'], params['B_init']))
+    def old_step():
+        state[:] = sim.calculate_picture(**param_dict, M_A=state[0], M_B=state[1])
+
+    grids = list(sim.initialize_picture(params['m'], params['n'], params['A_init'], params['B_init']))
+    kernel = sim.TauLeapKernel(grids[0].shape, **param_dict, rng=np.random.default_rng(seed))
+    def new_step():
+        grids[:] = kernel.step(*grids)  # new arrays if the grids are promoted
+
+    return {"calculate_picture": steps_per_second(old_step, n_steps),
+            "TauLeapKernel": steps_per_second(new_step, n_steps)}
+
+
+def bench_parallel(size, workers, n_steps=50, filename="sim_2", seed=0):
+    """Time parallel.ParallelKernel on a size x size lattice
+
+    Params:
+    size [int] - Number of rows and columns of the lattice
+    workers [list] - Numbers of worker processes to time
+    n_steps [int] - Number of time steps per timing
+    filename [string] - Parameter file in Parameters/ with the rates to use
+    seed [int] - Seed of the random number generators
+
+    Returns a dictionary of number of workers -> steps per second, where
+    0 workers is the serial sim.TauLeapKernel.
+    """
+    params = wf.Simulation(filename).params
+    param_dict = {key: params[key] for key in
+                  ("tau", "mu", "beta", "alpha", "kappa", "d_A", "d_B")}
+    M_A, M_B = sim.initialize_picture(size, size, params['A_init'], params['B_init'])
+
+    grids = [M_A.copy(), M_B.copy()]
+    kernel = sim.TauLeapKernel(M_A.shape, **param_dict, rng=np.random.default_rng(seed))
+    def serial_step():
+        grids[:] = kernel.step(*grids)
+    result = {0: steps_per_second(serial_step, n_steps)}
+
+    for W in workers:
+        with parallel.ParallelKernel(M_A.shape, **param_dict, workers=W, seed=seed) as kernel:
+            kernel.advance(M_A.copy(), M_B.copy(), 1)  # start the workers
+            start_time = time.perf_counter()
+            kernel.advance(M_A.copy(), M_B.copy(), n_steps)
+            result[W] = n_steps / (time.perf_counter() - start_time)
+
+    return result
+
+
+def bench_engines(filename, size=10, N_t=1_001, engines=("tau", "adaptive", "nsm"), seed=0):
+    """Time the stochastic engines of workflow.Simulation against each other
+
+    Params:
+    filename [string] - Parameter file in Parameters/ with the rates to use
+    size [int] - Number of rows and columns of the (small) lattice
+    N_t [int] - Number of time points, the engines all run to (N_t - 1) * tau
+    engines [tuple] - Names of the engines to time
+    seed [int] - Seed of the random number generators
+
+    Returns a dictionary of engine -> (runtime, final mean of A, number of
+    steps), where the steps of "nsm" are its steps from snapshot to snapshot.
+    """
+    result = dict()
+    for engine in engines:
+        params = dict(wf.get_params(filename), m=size, n=size, N_t=N_t, engine=engine, seed=seed)
+        simulation = wf.Simulation(filename, every=N_t, params=params)
+        simulation.run_movie()
+        result[engine] = (simulation.runtime, simulation.X_A[-1].mean(), simulation.profiler.steps)
+    return result
+
+
+def bench_poisson(size, lam=0.3, n_draws=20, seed=0):
+    """Compare the Poisson draw throughput of the bit generators in streams.py
+
+    Params:
+    size [int] - Number of rows and columns of the grid of propensities
+    lam [float] - Expected number of events per cell (tau times the propensity)
+    n_draws [int] - Number of draws of the whole grid to time
+    seed [int] - Seed of the random number generators
+
+    Returns a dictionary of backend -> millions of draws per second, where
+    "legacy" is the global np.random state used by sim.calculate_picture.
+    """
+    lam_grid = np.full((size, size), lam)
+
+    backends = {"legacy": np.random.RandomState(seed)}
+    for name in streams.BIT_GENERATORS:
+        backends[name] = streams.make_generator(seed, name)
+
+    result = dict()
+    for name, rng in backends.items():
+        rate = steps_per_second(lambda: rng.poisson(lam_grid), n_draws)
+        result[name] = rate * size**2 / 1e6
+    return result
+
+
+def bench_imex(size, dt=0.02, n_steps=20, seed=0):
+    """Compare the explicit finite difference scheme of fd_main to spectral.SpectralSolver
+
+    Both solve the FitzHugh–Nagumo system of fd_main on a size x size grid
+    of side 2, the explicit scheme with the largest stable time step
+    0.9 * dx**2 / (4 * D_V) and the IMEX solver with dt.
+
+    Params:
+    size [int] - Number of rows and columns of the grid
+    dt [float] - Time step of the IMEX solver
+    n_steps [int] - Number of time steps to time each solver over
+    seed [int] - Seed of the random initial state
+
+    Returns a dictionary of solver -> (time step, seconds per unit of simulated time).
+    """
+    a, b, tau, k = 2.8e-4, 5e-3, .1, -.005
+    dx = 2. / size
+    D = (a, b / tau)
+    rng = np.random.default_rng(seed)
+    U, V = rng.random((size, size)), rng.random((size, size))
+
+    dt_explicit = 0.9 * dx**2 / (4 * max(D))
+    rate = steps_per_second(lambda: finite_difference.euler_step(U, V, dt_explicit, dx, D,
+                                                                  kinetics.fitzhugh_nagumo, (k, tau)), n_steps)
+    result = {"explicit": (dt_explicit, 1 / (rate * dt_explicit))}
+
+    U, V = rng.random((size, size)), rng.random((size, size))
+    solver = SpectralSolver(U.shape, dx, D, kinetics.fitzhugh_nagumo, (k, tau), dt=dt)
+    rate = steps_per_second(lambda: solver.step(U, V), n_steps)
+    result["imex"] = (dt, 1 / (rate * dt))
+    return result
+
+
+def bench_stencil(size, n_steps=20, seed=0):
+    """Compare finite_difference.euler_step to the backends of finite_difference.ExplicitSolver
+
+    Both step the FitzHugh–Nagumo system of fd_main on a size x size grid.
+
+    Params:
+    size [int] - Number of rows and columns of the grid (including the edges)
+    n_steps [int] - Number of time steps to time each solver over
+    seed [int] - Seed of the random initial state
+
+    Returns a dictionary of solver -> steps per second.
+    """
+    a, b, tau, k = 2.8e-4, 5e-3, .1, -.005
+    dx = 2. / size
+    D = (a, b / tau)
+    dt = 0.9 * dx**2 / (4 * max(D))
+    rng = np.random.default_rng(seed)
+    U, V = rng.random((size, size)), rng.random((size, size))
+
+    result = {"euler_step": steps_per_second(lambda: finite_difference.euler_step(
+        U, V, dt, dx, D, kinetics.fitzhugh_nagumo, (k, tau)), n_steps)}
+    for backend in ("numpy", "ndimage"):
+        solver = finite_difference.ExplicitSolver((size - 2, size - 2), dx, D, kinetics.fitzhugh_nagumo,
+                                                  (k, tau), dt=dt, backend=backend)
+        solver.load(U, V)
+        result[backend] = steps_per_second(solver.step, n_steps)
+    return result
+
+
+def bench_lut(size, n_frames=50, seed=0):
+    """Compare the matplotlib imshow frames of render.py to its lookup table frames
+
+    Params:
+    size [int] - Number of rows and columns of the grid
+    n_frames [int] - Number of frames to time each renderer over
+    seed [int] - Seed of the random grid
+
+    Returns a dictionary of renderer -> frames per second.
+    """
+    import render
+
+    M = np.random.default_rng(seed).integers(0, 1000, (size, size))
+    result = dict()
+    for name, style in (("matplotlib", render.make_style()),
+                        ("lut nearest", render.make_style(movie_type="lut", scale=4)),
+                        ("lut bilinear", render.make_style(movie_type="lut", scale=4, interpolation="bilinear"))):
+        render.render_frame(M, style)  # set up the figure or lookup table first
+        result[name] = steps_per_second(lambda: render.render_frame(M, style), n_frames)
+    return result
+
+
+def bench_catscan(size, window=4, seed=0):
+    """Compare the matplotlib catscan frames of render.Renderer to render.catscan_indices
+
+    Both render the windows [z, z + window] from 0 to 1000 of a random grid.
+
+    Params:
+    size [int] - Number of rows and columns of the grid
+    window [int] - Width of the color range of each frame
+    seed [int] - Seed of the random grid
+
+    Returns a dictionary of renderer -> frames per second.
+    """
+    import render
+
+    M = np.random.default_rng(seed).integers(0, 1000, (size, size))
+    renderer = render.Renderer(workers=1)
+    jobs = renderer.catscan_jobs(M, "bench", "X_A", 0, window=window, z_min=0, z_max=1000)
+
+    start_time = time.perf_counter()
+    for frame in renderer.render(jobs):
+        pass
+    result = {"matplotlib": len(jobs) / (time.perf_counter() - start_time)}
+
+    start_time = time.perf_counter()
+    z, stack = render.catscan_indices(M, window, 0, 1000)
+    frames = render.colormap_lut("viridis")[stack]
+    result["vectorized"] = len(frames) / (time.perf_counter() - start_time)
+    return result
+
+
+def parameter_files():
+    """Names of the parameter files in Parameters/ which Simulation can run"""
+    names = list()
+    for filepath in sorted(glob.glob("Parameters/*.txt")):
+        name = os.path.basename(filepath)[:-len(".txt")]
+        if "mu" in wf.get_params(name):
+            names.append(name)
+    return names
+
+
+
+# Suite of standard problems for every solver, with a results file per commit
+#
+# Each case returns its throughput (steps of the solver per second), the
+# peak memory allocated while setting it up and taking one step (with
+# tracemalloc), and its relative error against a reference solution (None
+# where the reference is too expensive to compute).
+
+SUITE_SIZES = (64, 128, 256, 512, 1024)
+REFERENCE_SIZE = 256  # largest grid with a reference solution
+
+
+def traced_peak(run):
+    """Return the result of run() and the peak memory (in MB) it allocated"""
+    tracemalloc.start()
+    try:
+        result = run()
+        peak = tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+    return result, peak
+
+
+def relative_error(Z, reference):
+    return float(np.linalg.norm(Z - reference) / np.linalg.norm(reference))
+
+
+def case_tau(filename="sim_2", size=None, n_steps=50, seed=0):
+    """TauLeapKernel with the rates of a parameter file, on its grid or a size x size grid
+
+    The error is that of the final mean of A against the mean field ODE of
+    the rates (so it includes the noise, which is fixed by the seed).
+    """
+    from scipy.integrate import solve_ivp
+
+    params = wf.Simulation(filename).params
+    param_dict = {key: params[key] for key in ("tau", "mu", "beta", "alpha", "kappa", "d_A", "d_B")}
+    m, n = (size, size) if size else (params['m'], params['n'])
+
+    def setup():
+        M_A, M_B = sim.initialize_picture(m, n, params['A_init'], params['B_init'])
+        kernel = sim.TauLeapKernel(M_A.shape, **param_dict, rng=np.random.default_rng(seed))
+        return kernel, list(kernel.step(M_A, M_B))
+
+    (kernel, grids), peak = traced_peak(setup)
+    def step():
+        grids[:] = kernel.step(*grids)
+    rate = steps_per_second(step, n_steps)
+
+    mu, beta, alpha, kappa = (params[key] for key in ("mu", "beta", "alpha", "kappa"))
+    def mean_field(t, y):
+        react = kappa * y[0] * (y[0] - 1) * y[1]
+        return [mu - alpha * y[0] + react, beta - react]
+    T = (n_steps + 1) * params['tau']
+    solution = solve_ivp(mean_field, (0, T), [params['A_init'], params['B_init']], method="LSODA", rtol=1e-8)
+    A = solution.y[0, -1]
+    return {"throughput": rate, "peak_mb": peak, "error": float(abs(grids[0].mean() - A) / A)}
+
+
+def fitzhugh_nagumo_problem(size, seed=0):
+    """The FitzHugh–Nagumo system of fd_main on a size x size grid (inside cells) of side 2"""
+    a, b, tau, k = 2.8e-4, 5e-3, .1, -.005
+    dx = 2. / size
+    rng = np.random.default_rng(seed)
+    return {"dx": dx, "D": (a, b / tau), "args": (k, tau),
+            "U": rng.random((size, size)), "V": rng.random((size, size))}
+
+
+def fd_reference(size, T, seed=0):
+    """U at time T of the FitzHugh–Nagumo problem, by explicit steps a quarter of the stable step"""
+    problem = fitzhugh_nagumo_problem(size, seed)
+    dt = 0.9 * problem["dx"]**2 / (4 * max(problem["D"])) / 4
+    solver = finite_difference.ExplicitSolver((size, size), problem["dx"], problem["D"], kinetics.fitzhugh_nagumo,
+                                              problem["args"], dt=dt)
+    solver.load(problem["U"], problem["V"])
+    for _ in range(int(round(T / dt))):
+        solver.step()
+    return solver.U[solver.stencil.inside]
+
+
+def case_explicit(size, n_steps=20, seed=0):
+    """finite_difference.ExplicitSolver with the largest stable step, on the FitzHugh–Nagumo problem"""
+    problem = fitzhugh_nagumo_problem(size, seed)
+    dt = 0.9 * problem["dx"]**2 / (4 * max(problem["D"]))
+
+    def setup():
+        solver = finite_difference.ExplicitSolver((size, size), problem["dx"], problem["D"],
+                                                  kinetics.fitzhugh_nagumo, problem["args"], dt=dt)
+        solver.load(problem["U"], problem["V"])
+        solver.step()
+        return solver
+
+    solver, peak = traced_peak(setup)
+    rate = steps_per_second(solver.step, n_steps)
+
+    error = None
+    if size <= REFERENCE_SIZE:
+        T = 4 * dt
+        solver = finite_difference.ExplicitSolver((size, size), problem["dx"], problem["D"],
+                                                  kinetics.fitzhugh_nagumo, problem["args"], dt=dt)
+        solver.load(problem["U"], problem["V"])
+        for _ in range(4):
+            solver.step()
+        error = relative_error(solver.U[solver.stencil.inside], fd_reference(size, T, seed))
+    return {"throughput": rate, "peak_mb": peak, "error": error}
+
+
+def case_imex(size, dt=0.02, n_steps=20, seed=0):
+    """spectral.SpectralSolver (with the lattice Laplacian of the explicit solver) on the FitzHugh–Nagumo problem"""
+    problem = fitzhugh_nagumo_problem(size, seed)
+
+    def setup():
+        solver = SpectralSolver((size, size), problem["dx"], problem["D"], kinetics.fitzhugh_nagumo,
+                                problem["args"], dt=dt, lattice=True)
+        U, V = problem["U"].copy(), problem["V"].copy()
+        solver.step(U, V)
+        return solver, U, V
+
+    (solver, U, V), peak = traced_peak(setup)
+    rate = steps_per_second(lambda: solver.step(U, V), n_steps)
+
+    error = None
+    if size <= REFERENCE_SIZE:
+        U, V = problem["U"].copy(), problem["V"].copy()
+        solver.advance(U, V, 5)
+        error = relative_error(U, fd_reference(size, 5 * dt, seed))
+    return {"throughput": rate, "peak_mb": peak, "error": error}
+
+
+def case_mol(size, t_max=1.0, seed=0):
+    """mol_solver.MOLSolver (BDF, analytic Jacobian) with the rates of spatial_main_2d
+
+    The throughput is in units of simulated time per second, and the error
+    is against a solve with tolerances 1000 times tighter.
+    """
+    from mol_solver import MOLSolver
+
+    h = 25e-3
+    D = (1e-5 / (2 * h**2), 1e-3 / (2 * h**2))
+    rates = (64000 * h**3, 192000 * h**3, 0.02, 2.44e-16 * h**-6)  # mu, beta, alpha, kappa
+    dx = 1.1
+    rng = np.random.default_rng(seed)
+    A_init = rng.normal(200, np.sqrt(200) / dx, (size, size))
+    B_init = rng.normal(75, np.sqrt(75) / dx, (size, size))
+
+    solver = MOLSolver((size, size), dx, D, *rates)
+    start_time = time.perf_counter()
+    (times, A, B), peak = traced_peak(lambda: solver.solve(t_max, A_init, B_init, t_eval=[t_max]))
+    rate = t_max / (time.perf_counter() - start_time)
+
+    error = None
+    if size <= 64:
+        times, A_ref, B_ref = solver.solve(t_max, A_init, B_init, t_eval=[t_max], rtol=1e-9, atol=1e-6)
+        error = relative_error(A[-1], A_ref[-1])
+    return {"throughput": rate, "peak_mb": peak, "error": error}
+
+
+def case_ode(size, dt=0.01, t_max=1.0, seed=0):
+    """ode_simulator.solve_schnakenberg_batch with fixed RK4 steps, for size x size independent systems
+
+    The throughput is in steps (of all systems) per second, and the error
+    is that of the first systems against solve_ivp with tight tolerances.
+    """
+    from ode_simulator import solve_schnakenberg_batch
+
+    rng = np.random.default_rng(seed)
+    y_init = rng.random((size**2, 2)) * 2
+    rates = rng.random((size**2, 2)) + 0.5
+
+    start_time = time.perf_counter()
+    (times, states), peak = traced_peak(lambda: solve_schnakenberg_batch(t_max, y_init, rates, method='rk4', dt=dt,
+                                                                         t_eval=[t_max]))
+    rate = (t_max / dt) / (time.perf_counter() - start_time)
+
+    errors = list()
+    for i in range(4):
+        errors.append(relative_error(states[i, :, -1], ode_reference(t_max, y_init[i], rates[i])))
+    return {"throughput": rate, "peak_mb": peak, "error": max(errors)}
+
+
+def ode_reference(t_max, y_init, rates):
+    """State at t_max of one Schnakenberg system, with tight tolerances"""
+    from scipy.integrate import solve_ivp
+    from ode_simulator import ode_schnakenberg
+
+    solution = solve_ivp(ode_schnakenberg, (0, t_max), y_init, args=tuple(rates), method="DOP853",
+                         rtol=1e-12, atol=1e-12)
+    return solution.y[:, -1]
+
+
+def run_suite(sizes=SUITE_SIZES, filenames=None, verbose=True):
+    """
+    Run every case of the suite on the grids of sizes (and the tau-leaping
+    kernel on the parameter files filenames, by default all of them).
+
+    Returns the results, a dictionary with the commit, machine and
+    a dictionary of case name (e.g. "imex/256") -> metrics.
+    """
+    cases = [("tau/" + name, lambda name=name: case_tau(name)) for name in (filenames or parameter_files())]
+    for size in sizes:
+        cases += [(f"tau/{size}", lambda size=size: case_tau(size=size)),
+                  (f"explicit/{size}", lambda size=size: case_explicit(size)),
+                  (f"imex/{size}", lambda size=size: case_imex(size)),
+                  (f"ode/{size}", lambda size=size: case_ode(size))]
+        if size <= 128:
+            cases.append((f"mol/{size}", lambda size=size: case_mol(size)))
+
+    results = dict()
+    for name, case in cases:
+        results[name] = case()
+        if verbose:
+            print(format_case(name, results[name]))
+
+    return {"commit": git_commit(), "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "machine": {"platform": platform.platform(), "processor": platform.processor(),
+                        "cpus": os.cpu_count(), "python": platform.python_version(), "numpy": np.__version__},
+            "results": results}
+
+
+def format_case(name, metrics):
+    error = "-" if metrics["error"] is None else f"{metrics['error']:.2e}"
+    return f"{name:<28}{metrics['throughput']:>14.1f}/s{metrics['peak_mb']:>10.1f} MB{error:>12}"
+
+
+def git_commit():
+    """Short hash of the checked out commit (with -dirty for local changes), or "unknown" outside git"""
+    import subprocess
+
+    try:
+        repository = os.path.dirname(os.path.abspath(__file__))
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True, cwd=repository).stdout.strip()
+        dirty = subprocess.run(["git", "diff", "--quiet", "HEAD"], cwd=repository).returncode != 0
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return commit + ("-dirty" if dirty else "")
+
+
+def save_suite(results, path="Data/benchmarks/"):
+    """Write the results of run_suite to <path>/<commit>.json and return the file"""
+    os.makedirs(path, exist_ok=True)
+    filepath = os.path.join(path, results["commit"] + ".json")
+    with open(filepath, "w") as file:
+        json.dump(results, file, indent=2)
+    return filepath
+
+
+def load_suite(commit=None, path="Data/benchmarks/", exclude=None):
+    """Return the saved results of commit (by default the most recent file other than exclude), or None"""
+    if commit is not None:
+        filepath = os.path.join(path, commit + ".json")
+    else:
+        files = [file for file in glob.glob(os.path.join(path, "*.json"))
+                 if os.path.basename(file) != (exclude or "") + ".json"]
+        if not files:
+            return None
+        filepath = max(files, key=os.path.getmtime)
+    with open(filepath, "r") as file:
+        return json.load(file)
+
+
+def compare_suite(results, baseline, tolerance=0.2):
+    """
+    Return the regressions of results against baseline (both from
+    run_suite), as lines of text: cases which are more than tolerance
+    (a fraction) slower, use more memory, or are less accurate.
+    """
+    regressions = list()
+    for name, metrics in results["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            continue
+        if metrics["throughput"] < (1 - tolerance) * old["throughput"]:
+            regressions.append(f"{name}: throughput {metrics['throughput']:.1f}/s < {old['throughput']:.1f}/s")
+        if metrics["peak_mb"] > (1 + tolerance) * old["peak_mb"] + 1:
+            regressions.append(f"{name}: peak memory {metrics['peak_mb']:.1f} MB > {old['peak_mb']:.1f} MB")
+        if (metrics["error"] is not None and old["error"] is not None
+                and metrics["error"] > (1 + tolerance) * old["error"] + 1e-12):
+            regressions.append(f"{name}: error {metrics['error']:.2e} > {old['error']:.2e}")
+    return regressions
+
+
+def suite_main(sizes=(64, 128, 256), baseline=None, tolerance=0.2):
+    """Run the suite, save its results, and compare them to the baseline commit (default: the last results)"""
+    print(f"{'case':<28}{'throughput':>16}{'peak':>13}{'error':>12}")
+    results = run_suite(sizes)
+    print(f"\nSaved {save_suite(results)}")
+
+    old = load_suite(baseline, exclude=results["commit"])
+    if old is None:
+        print("No earlier results to compare with")
+        return results, []
+    regressions = compare_suite(results, old, tolerance)
+    print(f"\nAgainst {old['commit']}: " + (f"{len(regressions)} regressions" if regressions else "no regressions"))
+    for line in regressions:
+        print("  " + line)
+    return results, regressions
+
+
+def print_tables():
+    """Print the tables of the benchmarks above for the shipped parameter files"""
+    print(f"{'file':<20}{'calculate_picture':>20}{'TauLeapKernel':>16}{'speedup':>10}")
+    for name in parameter_files():
+        result = bench_calculate_picture(name)
+        print(f"{name:<20}{result['calculate_picture']:>17.0f}/s{result['TauLeapKernel']:>13.0f}/s"
+              f"{result['TauLeapKernel'] / result['calculate_picture']:>9.2f}x")
+
+    print()
+    print(f"{'grid':<12}" + "".join(f"{name:>12}" for name in ["legacy"] + list(streams.BIT_GENERATORS)) + "  (M draws/s)")
+    for size in (100, 1000):
+        result = bench_poisson(size)
+        print(f"{size}x{size:<8}" + "".join(f"{rate:>12.1f}" for rate in result.values()))
+
+    print()
+    print(f"{'engine':<12}{'runtime':>10}{'final mean A':>16}{'steps':>10}")
+    for engine, (runtime, mean_A, steps) in bench_engines("sim_2").items():
+        print(f"{engine:<12}{runtime:>9.2f}s{mean_A:>16.1f}{steps:>10}")
+
+    print()
+    print(f"{'grid':<12}{'explicit dt':>14}{'s/unit time':>14}{'imex dt':>10}{'s/unit time':>14}{'speedup':>10}")
+    for size in (100, 512, 1024):
+        result = bench_imex(size)
+        (dt_explicit, cost_explicit), (dt_imex, cost_imex) = result["explicit"], result["imex"]
+        print(f"{size}x{size:<8}{dt_explicit:>14.2e}{cost_explicit:>14.2f}{dt_imex:>10.2g}{cost_imex:>14.3f}"
+              f"{cost_explicit / cost_imex:>9.0f}x")
+
+    print()
+    print(f"{'grid':<12}{'euler_step':>14}{'numpy':>14}{'ndimage':>14}")
+    for size in (100, 512, 1024):
+        result = bench_stencil(size)
+        print(f"{size}x{size:<8}" + "".join(f"{rate:>12.0f}/s" for rate in result.values()))
+
+    print()
+    workers = [W for W in (1, 2, 4, 8) if W <= os.cpu_count()]
+    print(f"{'lattice':<12}" + "".join(f"{str(W) + ' workers':>16}" for W in workers) + f"{'serial':>12}")
+    for size in (500, 1000):
+        result = bench_parallel(size, workers)
+        print(f"{size}x{size:<8}" + "".join(f"{result[W]:>9.1f}/s ({result[W] / result[0]:.1f}x)" for W in workers)
+              + f"{result[0]:>10.1f}/s")
+
+    print()
+    print(f"{'grid':<12}{'matplotlib':>14}{'lut nearest':>14}{'lut bilinear':>14}  (frames/s)")
+    for size in (100, 200):
+        result = bench_lut(size)
+        print(f"{size}x{size:<8}" + "".join(f"{rate:>14.0f}" for rate in result.values()))
+
+    print()
+    print(f"{'grid':<12}{'matplotlib':>14}{'vectorized':>14}  (catscan frames/s)")
+    for size in (100, 200):
+        result = bench_catscan(size)
+        print(f"{size}x{size:<8}" + "".join(f"{rate:>14.0f}" for rate in result.values()))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--suite", action="store_true", help="run the suite of standard problems instead of the tables")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[64, 128, 256],
+                        help=f"grid sizes of the suite (all: {' '.join(map(str, SUITE_SIZES))})")
+    parser.add_argument("--baseline", help="commit to compare the suite with (default: the last results)")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="fraction of a change flagged as a regression")
+    arguments = parser.parse_args()
+
+    if arguments.suite:
+        results, regressions = suite_main(arguments.sizes, arguments.baseline, arguments.tolerance)
+        raise SystemExit(1 if regressions else 0)
+
+    print_tables()
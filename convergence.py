@@ -0,0 +1,137 @@
+"""Detection of stationary patterns, to end runs early
+
+A ConvergenceMonitor is given the grid of one species every stride (time
+points, steps or units of time, depending on the runner) and computes
+cheap pattern metrics: the relative L2 change since the last check, the
+dominant wavelength (see analysis.dominant_wavelength) and the number of
+spots (see analysis.count_spots). The pattern is stationary once the
+change stays below tolerance, with the same wavelength and number of
+spots, for patience checks in a row.
+
+The runners (workflow.Simulation, spectral.SpectralSolver,
+finite_difference.ExplicitSolver and mol_solver.MOLSolver) then either
+stop (action "stop") or only keep every sparse_every-th of the remaining
+snapshots (action "sparse"), and record why and when in their metadata.
+"""
+
+import numpy as np
+import analysis
+
+
+class ConvergenceMonitor:
+    """
+    Tracks the pattern metrics of a run and decides when it is stationary.
+    """
+
+    def __init__(self, stride=1_000, tolerance=1e-3, patience=3, spot_tolerance=0,
+                 smooth=0, action="stop", sparse_every=10):
+
+        """
+        stride is the interval between checks
+        tolerance is the relative L2 change between checks below which the
+        grid counts as unchanged
+        patience is the number of unchanged checks in a row needed
+        spot_tolerance is the change in the number of spots still allowed
+        smooth is the width (in cells) of the Gaussian filter applied before
+        the metrics, to see through the noise of stochastic grids
+        action is "stop" or "sparse", see above
+        """
+
+        if action not in ("stop", "sparse"):
+            raise ValueError(f"unknown action {action!r}, use 'stop' or 'sparse'")
+
+        self.stride = stride
+        self.tolerance = tolerance
+        self.patience = patience
+        self.spot_tolerance = spot_tolerance
+        self.smooth = smooth
+        self.action = action
+        self.sparse_every = sparse_every
+
+        self.history = list()  # metrics of every check
+        self.streak = 0
+        self.converged = False
+        self.stop_reason = None
+        self.stop_time = None
+        self._last = None  # (time, grid) of the last check
+
+
+    @classmethod
+    def from_params(cls, settings):
+        """Return a monitor for the settings dictionary of a parameter file, or None"""
+        if not settings:
+            return None
+        return cls(**settings)
+
+
+    def due(self, t):
+        """Whether a check is due at time t"""
+        return self._last is None or t - self._last[0] >= self.stride
+
+
+    def check(self, t, M):
+        """
+        Compute the metrics of grid M at time t and return whether the
+        pattern is (now) stationary.
+        """
+        from scipy import ndimage
+
+        t = t.item() if isinstance(t, np.generic) else t
+        M = np.atleast_2d(np.array(M, dtype=float))  # a copy, a 1D grid is one row
+        if self.smooth:
+            M = ndimage.gaussian_filter(M, self.smooth, mode="nearest")
+
+        metrics = {"t": t,
+                   "wavelength": float(analysis.dominant_wavelength(M)),
+                   "spots": int(analysis.count_spots(M))}
+
+        if self._last is None:
+            metrics["change"] = np.inf
+        else:
+            previous = self._last[1]
+            metrics["change"] = float(np.linalg.norm(M - previous) / max(np.linalg.norm(previous), 1e-300))
+        self._last = (t, M)
+
+        if self.history and self._settled(metrics, self.history[-1]):
+            self.streak += 1
+        else:
+            self.streak = 0
+        self.history.append(metrics)
+
+        if self.streak >= self.patience and not self.converged:
+            self.converged = True
+            self.stop_time = t
+            self.stop_reason = (f"stationary: relative L2 change {metrics['change']:.2e} < {self.tolerance:g} "
+                                f"with wavelength {metrics['wavelength']:.3g} and {metrics['spots']} spots "
+                                f"for {self.patience} checks")
+        return self.converged
+
+
+    def _settled(self, metrics, previous):
+        same_wavelength = (metrics["wavelength"] == previous["wavelength"]
+                           or (np.isnan(metrics["wavelength"]) and np.isnan(previous["wavelength"])))
+        return (metrics["change"] < self.tolerance and same_wavelength
+                and abs(metrics["spots"] - previous["spots"]) <= self.spot_tolerance)
+
+
+    def thin(self, remaining):
+        """Return every sparse_every-th of the remaining snapshot times (or frames), and the last one"""
+        remaining = np.asarray(remaining)
+        kept = remaining[::self.sparse_every]
+        if len(remaining) and kept[-1] != remaining[-1]:
+            kept = np.append(kept, remaining[-1])
+        return kept
+
+
+def stop_metadata(monitor, t_end):
+    """Return why and when a run which ended at t_end stopped, for its metadata
+
+    Params:
+    monitor [ConvergenceMonitor] - The monitor of the run, or None
+    t_end [float] - The time the run ended at
+    """
+    t_end = t_end.item() if isinstance(t_end, np.generic) else t_end
+    if monitor is not None and monitor.converged:
+        return {"stop_reason": monitor.stop_reason, "stop_time": monitor.stop_time,
+                "action": monitor.action, "end_time": t_end}
+    return {"stop_reason": "horizon", "stop_time": t_end, "action": None, "end_time": t_end}
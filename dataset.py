@@ -0,0 +1,179 @@
+"""Lazy access to the saved trajectories of a simulation
+
+A run is found in Data/ either as the chunked store Data/<name>/ written by
+Simulation.go and Simulation.save_movie (see store.py) or as the movie
+files Data/<name>-X_A.npy and Data/<name>-X_B.npy of older versions, which
+are opened memory-mapped. Either way nothing is read until a snapshot is
+asked for, so slicing every 2,000th time point of a long movie only reads
+those snapshots from disk.
+
+    data = dataset.open_dataset("sim_1")
+    view = data.select(t_start=10_000, every=2_000, region=(slice(0, 50), slice(0, 50)))
+    for t, M_A in view.frames("X_A"):
+        ...
+    vis.create_all_gifs(view["X_A"], "sim_1", "X_A", every=2_000)
+"""
+
+import numpy as np
+import os
+import store
+
+
+def open_dataset(filename, datapath="Data/"):
+    """Return the Dataset of the run filename saved in datapath"""
+    path = os.path.join(datapath, filename)
+    if os.path.exists(os.path.join(path, "index.txt")):
+        return Dataset.from_store(store.TrajectoryStore(path, mode="r"))
+
+    npy = {kind: path + "-" + kind + ".npy" for kind in store.TrajectoryStore.kinds}
+    if all(os.path.exists(file) for file in npy.values()):
+        return Dataset({kind: np.load(file, mmap_mode="r") for kind, file in npy.items()})
+
+    raise FileNotFoundError(f"no store {path}/ or movie files {path}-X_A.npy, {path}-X_B.npy")
+
+
+
+class Dataset:
+    """
+    The snapshots of both species of a run, as array-likes indexed by
+    snapshot (memory-mapped arrays or store views), with the time point
+    of each snapshot in times (by default snapshot i is time point i).
+    """
+
+    def __init__(self, movies, times=None, params=None, metadata=None):
+
+        self.movies = movies
+        self.times = np.arange(len(movies["X_A"])) if times is None else np.asarray(times)
+        self.params = params
+        self.metadata = metadata or dict()
+
+
+    @classmethod
+    def from_store(cls, trajectory_store):
+        movies = {kind: trajectory_store[kind] for kind in trajectory_store.kinds}
+        return cls(movies, trajectory_store.times, trajectory_store.params, trajectory_store.metadata)
+
+
+    def __len__(self):
+        return len(self.times)
+
+
+    def __getitem__(self, kind):
+        return self.movies[kind]
+
+
+    @property
+    def shape(self):
+        return self.movies["X_A"].shape
+
+
+    def select(self, t_start=None, t_stop=None, every=None, region=None):
+        """
+        Return a lazy DatasetView of the snapshots at time points in
+        [t_start, t_stop) which are multiples of every, cropped to region
+        (a tuple of slices of the rows and columns of the grid).
+        """
+        keep = np.ones(len(self.times), dtype=bool)
+        if t_start is not None:
+            keep &= self.times >= t_start
+        if t_stop is not None:
+            keep &= self.times < t_stop
+        if every is not None:
+            keep &= self.times % every == 0
+        return DatasetView(self, np.flatnonzero(keep), region)
+
+
+    def frames(self, kind, every=None):
+        """Yield (time point, grid) of species kind, at the multiples of every"""
+        return self.select(every=every).frames(kind)
+
+
+
+class DatasetView:
+    """
+    Snapshots (by index into the dataset) and region of a Dataset. Nothing
+    is read until a grid is asked for: view[kind][i] reads the i-th selected
+    snapshot and crops it.
+    """
+
+    def __init__(self, data, indices, region=None):
+
+        self.data = data
+        self.indices = indices
+        self.region = tuple(region) if region is not None else (slice(None), slice(None))
+
+
+    def __len__(self):
+        return len(self.indices)
+
+
+    def __getitem__(self, kind):
+        return SpeciesSlice(self, kind)
+
+
+    @property
+    def times(self):
+        return self.data.times[self.indices]
+
+
+    @property
+    def shape(self):
+        return (len(self),) + self.read("X_A", 0).shape if len(self) else (0,)
+
+
+    def read(self, kind, i):
+        """Return the i-th selected grid of species kind, cropped to the region"""
+        return np.asarray(self.data[kind][int(self.indices[i])][self.region])
+
+
+    def frames(self, kind, step=1):
+        """Yield (time point, grid) for every step-th selected snapshot of species kind"""
+        for i in range(0, len(self), step):
+            yield int(self.data.times[self.indices[i]]), self.read(kind, i)
+
+
+
+class SpeciesSlice:
+    """
+    One species of a DatasetView, which can be indexed like the movie
+    arrays X_A and X_B (X[i], X[-1], X[start:stop:step]), e.g. by
+    vis.create_all_gifs.
+    """
+
+    def __init__(self, view, kind):
+        self.view = view
+        self.kind = kind
+
+
+    def __len__(self):
+        return len(self.view)
+
+
+    @property
+    def shape(self):
+        return self.view.shape
+
+
+    @property
+    def times(self):
+        return self.view.times
+
+
+    def __iter__(self):
+        return (M for t, M in self.view.frames(self.kind))
+
+
+    def __getitem__(self, index):
+
+        if isinstance(index, slice):
+            return np.array([self.view.read(self.kind, i) for i in range(*index.indices(len(self)))])
+
+        if np.ndim(index) == 1:
+            return np.array([self.view.read(self.kind, i) for i in index])
+
+        i = int(index)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(f"snapshot {index} is out of range for a view of length {len(self)}")
+        return self.view.read(self.kind, i)
@@ -0,0 +1,126 @@
+import sim
+import analysis
+import profiling
+import streams
+import workflow as wf
+import numpy as np
+import time
+
+
+class Ensemble:
+    """
+    Runs many independent replicates of the same stochastic simulation
+    at once, by stepping a (R, m, n) stack of grids with one kernel so
+    each Python-level step advances all R replicates together.
+    
+    Requires the following libraries:
+    * sim
+    * analysis
+    * profiling
+    * workflow as wf
+    * numpy as np
+    * time
+    
+    """
+    
+
+    def __init__(self, filename, replicates, every=None, windows=None, params=None):
+        
+        """
+        replicates is the number of replicates R, the other arguments are
+        as for workflow.Simulation (which is used to read the parameters).
+        """
+        
+        self.filename = filename
+        self.replicates = replicates
+        # The single run of the parameters, whose settings (e.g. dtype) the ensemble shares
+        self.simulation = wf.Simulation(filename, every=every, windows=windows, params=params)
+        self.params = self.simulation.params
+        
+        
+    def go(self):
+        self.run_movie()
+        self.report()
+        
+        
+    def run_movie(self):
+        """
+        Snapshots of all replicates at self.times are kept in self.X_A and
+        self.X_B (indexed by snapshot, replicate, row, column), and the 
+        statistics in self.stats are computed at each snapshot.
+        """
+        R, m, n = self.replicates, self.params['m'], self.params['n']
+        
+        self.times = sim.snapshot_times(self.params['N_t'], self.params['every'], self.params['windows'])
+        N_s = len(self.times)
+        dtype = self.simulation.dtype()
+        self.X_A = np.zeros((N_s, R, m, n), dtype=dtype)
+        self.X_B = np.zeros((N_s, R, m, n), dtype=dtype)
+        self.stats = {key: np.zeros((N_s, R)) for key in 
+                      ("mean_A", "var_A", "mean_B", "var_B", "wavelength_A", "wavelength_B")}
+        
+        M_A = np.full((R, m, n), self.params['A_init'], dtype=dtype)
+        M_B = np.full((R, m, n), self.params['B_init'], dtype=dtype)
+        
+        param_dict = {key: self.params[key] for key in 
+                      ("tau", "mu", "beta", "alpha", "kappa", "d_A", "d_B")}
+        rng = streams.make_generator(self.params['seed'], self.params['bit_generator'])
+        self.kernel = sim.TauLeapKernel(M_A.shape, **param_dict, rng=rng)
+        
+        s = 0  # index of the next snapshot to record
+        if self.times[0] == 0:
+            self.record(s, M_A, M_B)
+            s += 1
+        
+        # Progress lines (steps per second and ETA) every 100,000 steps
+        self.profiler = profiling.Profiler()
+        self.profiler.start(total=self.params['N_t'] - 1)
+        start_time = time.time()
+        for t in np.arange(self.params['N_t'] - 1):
+            
+            M_A, M_B = self.kernel.step(M_A, M_B)
+            self.profiler.step()
+            
+            if s < len(self.times) and self.times[s] == t + 1:
+                self.record(s, M_A, M_B)
+                s += 1
+        
+        end_time = time.time()
+        self.runtime = end_time - start_time
+        self.profiler.stop()
+        
+    
+    def record(self, s, M_A, M_B):
+        self.X_A, self.X_B = sim.promote(self.X_A, M_A), sim.promote(self.X_B, M_B)
+        self.X_A[s], self.X_B[s] = M_A, M_B
+        
+        for M, kind in ((M_A, "A"), (M_B, "B")):
+            self.stats["mean_" + kind][s] = M.mean(axis=(-2, -1))
+            self.stats["var_" + kind][s] = M.var(axis=(-2, -1))
+            self.stats["wavelength_" + kind][s] = analysis.dominant_wavelength(M)
+    
+    
+    def summary(self):
+        """
+        Return the mean and variance over the replicates of each 
+        statistic, as a dictionary of arrays indexed by snapshot.
+        """
+        summary = dict()
+        for key, value in self.stats.items():
+            summary[key + "_mean"] = value.mean(axis=1)
+            summary[key + "_var"] = value.var(axis=1)
+        return summary
+    
+    
+    def report(self):
+        print()
+        print('\nFilename:')
+        print(self.filename)
+        print('\nReplicates:')
+        print(self.replicates)
+        print('\nParams:')
+        print(self.params)
+        print('\nFinal statistics (mean over replicates):')
+        print({key: value[-1] for key, value in self.summary().items() if key.endswith("_mean")})
+        print('\nRuntime:')
+        print(self.runtime)
@@ -1,72 +1,71 @@
 """Plot a reaction-diffusion system to generate Turing Patterns
 
 This system described by a PDE called the FitzHugh–Nagumo equation.
-It is evaluated here using finite difference methods taken from:
+It is evaluated here with a semi-implicit spectral solver (see spectral.py),
+or with the explicit finite difference methods taken from:
 https://ipython-books.github.io/124-simulating-a-partial-differential
 -equation-reaction-diffusion-systems-and-turing-patterns/
 """
 
 import numpy as np
-import matplotlib.pyplot as plt
-from finite_difference import laplacian, show_patterns
-from gif_creator import create_gif
+from finite_difference import ExplicitSolver, show_patterns
+from spectral import SpectralSolver
+from kinetics import fitzhugh_nagumo
+from convergence import ConvergenceMonitor
 
-a = 2.8e-4
-b = 5e-3
-tau = .1
-k = -.005
 
-size = 100  # size of the 2D grid
-dx = 2. / size  # space step
+if __name__ == "__main__":
+    # Plotting is only imported when the script is run
+    import matplotlib.pyplot as plt
+    from gif_creator import create_gif
 
-T = 10.0  # total time
-dt = .001  # time step
-n = int(T / dt)  # number of iterations
-plot_num = 10
+    a = 2.8e-4
+    b = 5e-3
+    tau = .1
+    k = -.005
 
-U = np.random.rand(size, size)
-V = np.random.rand(size, size)
+    size = 100  # size of the 2D grid
+    dx = 2. / size  # space step
 
-# U = np.ones((size, size)) + 0.01 * np.random.rand(size, size)
-# V = np.ones((size, size)) + 0.01 * np.random.rand(size, size)
+    T = 10.0  # total time
+    method = "imex"  # "imex" (spectral, semi-implicit) or "explicit" (finite difference)
+    dt = .02 if method == "imex" else .001  # time step, explicit needs dt < dx**2 / (4 * b / tau)
+    plot_num = 10
+    monitor = ConvergenceMonitor(stride=1.0, tolerance=5e-3)  # stops once U is stationary, None runs to T
 
-step_plot = n // plot_num
-plot_count = 0
-# Simulate the PDE with the finite difference method.
-for i in range(n):
-    # Compute the Laplacian of u and v.
-    deltaU = laplacian(U, dx)
-    deltaV = laplacian(V, dx)
-    # Take the values of u and v inside the grid.
-    Uc = U[1:-1, 1:-1]
-    Vc = V[1:-1, 1:-1]
-    # Update the variables.
-    U[1:-1, 1:-1], V[1:-1, 1:-1] = \
-        Uc + dt * (a * deltaU + Uc - Uc**3 - Vc + k),\
-        Vc + dt * (b * deltaV + Uc - Vc) / tau
-    # Neumann/zero flux conditions: derivatives at the edges
-    # are null.
-    for Z in (U, V):
-        Z[0, :] = Z[1, :]
-        Z[-1, :] = Z[-2, :]
-        Z[:, 0] = Z[:, 1]
-        Z[:, -1] = Z[:, -2]
+    U = np.random.rand(size, size)
+    V = np.random.rand(size, size)
 
-    if i % step_plot == 0 and i < plot_num * step_plot:
+    # U = np.ones((size, size)) + 0.01 * np.random.rand(size, size)
+    # V = np.ones((size, size)) + 0.01 * np.random.rand(size, size)
+
+    D = (a, b / tau)  # the inhibitor equation is divided by tau
+
+    plot_count = 0
+    def plot(t, U, V):
+        global plot_count
         plot_count += 1
         plt.imshow(U, cmap=plt.cm.viridis,
               interpolation='bilinear',
               extent=[-1, 1, -1, 1])
-        plt.title(f'$t={i * dt:.2f}$')
+        plt.title(f'$t={t:.2f}$')
         plt.savefig(f"Images/Spatial_ODE/Turing_Evolution_Const2_{plot_count:04d}.png")
         #plt.show()
-        
-#create_gif("Images/Spatial_ODE/Turing_Evolution_Const2")
 
-fig, ax = plt.subplots(1, 1, figsize=(8, 8))
-show_patterns(U, ax=ax)
-plt.title(f'$t={i * dt:.2f}$')
-#plt.savefig("Images/Turing_Final_State.png")
-#plt.show()
+    if method == "imex":
+        solver = SpectralSolver(U.shape, dx, D, fitzhugh_nagumo, args=(k, tau), dt=dt)
+        solver.run(U, V, T, n_frames=plot_num, callback=plot, monitor=monitor)
+    else:
+        # Simulate the PDE with the finite difference method,
+        # the edges of U and V are ghost cells holding the boundary.
+        solver = ExplicitSolver((size - 2, size - 2), dx, D, fitzhugh_nagumo, args=(k, tau), dt=dt)
+        solver.run(U, V, T, n_frames=plot_num, callback=plot, monitor=monitor)
+    print(solver.stop)
 
+    #create_gif("Images/Spatial_ODE/Turing_Evolution_Const2")
 
+    fig, ax = plt.subplots(1, 1, figsize=(8, 8))
+    show_patterns(U, ax=ax)
+    plt.title(f'$t={solver.t:.2f}$')
+    #plt.savefig("Images/Turing_Final_State.png")
+    #plt.show()
@@ -6,30 +6,251 @@ https://ipython-books.github.io/124-simulating-a-partial-differential
 -equation-reaction-diffusion-systems-and-turing-patterns/
 """
 
-import matplotlib.pyplot as plt
+import numpy as np
+from scipy import ndimage
+import convergence
 
-def laplacian(Z, dx):
+def laplacian(Z, dx, out=None):
     """Calculate laplacian of array Z
     
     Params:
     Z [Array] - Array of spatial data to compute the laplacian of
     dx [float] - Spatial step size for finite difference method
                      Should be small compared to the size of the array
+    out [Array] - Array to write the laplacian into, with the shape of the
+                  inside of Z (default None, a new array is returned)
     """
     Ztop = Z[0:-2, 1:-1]
     Zleft = Z[1:-1, 0:-2]
     Zbottom = Z[2:, 1:-1]
     Zright = Z[1:-1, 2:]
     Zcenter = Z[1:-1, 1:-1]
-    return (Ztop + Zleft + Zbottom + Zright -
-            4 * Zcenter) / dx**2
+    if out is None:
+        return (Ztop + Zleft + Zbottom + Zright -
+                4 * Zcenter) / dx**2
+    np.multiply(Zcenter, -4, out=out)
+    for Zside in (Ztop, Zleft, Zbottom, Zright):
+        out += Zside
+    out *= 1 / dx**2
+    return out
+
+class Stencil:
+    """Five-point (seven-point in 3D) finite difference Laplacian on grids
+    with one layer of ghost cells, in 1, 2 or 3 dimensions
+    
+    The grids have shape (N + 2 for N in shape): the ghost cells around
+    the inside hold the boundary, either "neumann" (zero flux, a copy of
+    the neighbouring inside cell) or "periodic" (a copy of the opposite
+    inside cell). Nothing is allocated after construction.
+    
+    The "numpy" backend adds shifted views of the grid in place, the
+    "ndimage" backend does one pass of scipy.ndimage.correlate over the
+    inside (which handles the boundary itself, so needs no ghost cells).
+    """
+    
+    def __init__(self, shape, dx, boundary="neumann", backend="numpy"):
+        """
+        Params:
+        shape [tuple] - Number of inside cells along each axis
+        dx [float] - Spatial step size
+        boundary [string] - "neumann" or "periodic"
+        backend [string] - "numpy" or "ndimage"
+        """
+        if boundary not in ("neumann", "periodic"):
+            raise ValueError(f"unknown boundary {boundary!r}, use 'neumann' or 'periodic'")
+        if backend not in ("numpy", "ndimage"):
+            raise ValueError(f"unknown backend {backend!r}, use 'numpy' or 'ndimage'")
+        if not 1 <= len(shape) <= 3:
+            raise ValueError("only 1, 2 and 3 dimensional grids are supported")
+        
+        self.shape = tuple(shape)
+        self.padded_shape = tuple(N + 2 for N in shape)
+        self.dx = dx
+        self.boundary = boundary
+        self.backend = backend
+        self.ndim = len(shape)
+        self.inside = (slice(1, -1),) * self.ndim
+        
+        # Views of the neighbours along each axis, relative to the inside
+        self.neighbours = list()
+        for axis in range(self.ndim):
+            for start, stop in ((0, -2), (2, None)):
+                self.neighbours.append(self.inside[:axis] + (slice(start, stop),) + self.inside[axis + 1:])
+        
+        # Cross-shaped kernel of the ndimage backend
+        self.weights = np.zeros((3,) * self.ndim)
+        centre = (1,) * self.ndim
+        for axis in range(self.ndim):
+            for offset in (0, 2):
+                self.weights[centre[:axis] + (offset,) + centre[axis + 1:]] = 1 / dx**2
+        self.weights[centre] = -2 * self.ndim / dx**2
+        self.mode = {"neumann": "nearest", "periodic": "wrap"}[boundary]
+    
+    def grid(self, values=None):
+        """Return a new grid with ghost cells, filled with values if given
+        (an array of the inside shape, or of the full grid shape)"""
+        Z = np.zeros(self.padded_shape)
+        if values is not None:
+            values = np.asarray(values)
+            if values.shape == self.padded_shape:
+                Z[...] = values
+            else:
+                Z[self.inside] = values
+            self.fill_ghosts(Z)
+        return Z
+    
+    def fill_ghosts(self, Z):
+        """Set the ghost cells of grid Z from its inside, in place"""
+        for axis in range(self.ndim):
+            Z = np.moveaxis(Z, axis, 0)
+            if self.boundary == "neumann":
+                Z[0], Z[-1] = Z[1], Z[-2]
+            else:
+                Z[0], Z[-1] = Z[-2], Z[1]
+            Z = np.moveaxis(Z, 0, axis)
+    
+    def laplacian(self, Z, out, scale=1):
+        """Write the laplacian of the inside of grid Z, times scale, into
+        out, which has the inside shape (e.g. the inside of another grid)"""
+        if self.backend == "ndimage":
+            return ndimage.correlate(Z[self.inside], self.weights * scale, output=out, mode=self.mode)
+        np.multiply(Z[self.inside], -2 * self.ndim, out=out)
+        for neighbour in self.neighbours:
+            out += Z[neighbour]
+        out *= scale / self.dx**2
+        return out
+
+class ExplicitSolver:
+    """Explicit Euler solver of a two-species reaction-diffusion system
+    on a Stencil, without any allocation per step
+    
+    The solver holds two pairs of grids with ghost cells: each step reads
+    one pair and writes the other, then swaps them. The step is stable for
+    dt < dx**2 / (2 * ndim * max(D)).
+    
+    reaction(U, V, *args, out=(f, g)) writes the reaction rates into f and
+    g, e.g. the functions in kinetics.py.
+    """
+    
+    def __init__(self, shape, dx, D, reaction, args=(), dt=0.001, boundary="neumann", backend="numpy"):
+        """
+        Params:
+        shape [tuple] - Number of inside cells along each axis
+        dx [float] - Spatial step size
+        D [tuple] - Diffusion coefficients of U and V
+        reaction [function] - Reaction rates, see above
+        args [tuple] - Further arguments of reaction
+        dt [float] - Time step
+        boundary [string] - "neumann" or "periodic", see Stencil
+        backend [string] - "numpy" or "ndimage", see Stencil
+        """
+        self.stencil = Stencil(shape, dx, boundary, backend)
+        self.D = D
+        self.reaction = reaction
+        self.args = tuple(args)
+        self.dt = dt
+        self.t = 0.0
+        
+        self.buffers = [(self.stencil.grid(), self.stencil.grid()) for _ in range(2)]
+        self.current = 0
+        self.rates = (np.empty(self.stencil.shape), np.empty(self.stencil.shape))
+    
+    @property
+    def U(self):
+        return self.buffers[self.current][0]
+    
+    @property
+    def V(self):
+        return self.buffers[self.current][1]
+    
+    def load(self, U, V):
+        """Set the state to U and V (arrays of the inside or full grid shape)"""
+        for Z, values in zip(self.buffers[self.current], (U, V)):
+            Z[...] = self.stencil.grid(values)
+    
+    def step(self):
+        """Advance the state by one time step dt"""
+        inside = self.stencil.inside
+        old, new = self.buffers[self.current], self.buffers[1 - self.current]
+        
+        f, g = self.reaction(old[0][inside], old[1][inside], *self.args, out=self.rates)
+        for Z, Z_new, D_Z, R in zip(old, new, self.D, (f, g)):
+            out = Z_new[inside]
+            self.stencil.laplacian(Z, out=out, scale=D_Z * self.dt)
+            R *= self.dt
+            out += R
+            out += Z[inside]
+            self.stencil.fill_ghosts(Z_new)
+        
+        self.current = 1 - self.current
+        self.t += self.dt
+    
+    def advance(self, U, V, n_steps):
+        """Advance U and V (grids with ghost cells) by n_steps time steps, in place"""
+        self.load(U, V)
+        for _ in range(n_steps):
+            self.step()
+        U[...], V[...] = self.U, self.V
+    
+    def run(self, U, V, T, n_frames=0, callback=None, monitor=None):
+        """Advance U and V (grids with ghost cells) in place up to time T
+        (from the current time), calling callback(t, U, V) at n_frames
+        evenly spaced times (including the start, but not T itself),
+        and stopping early when monitor says so, as spectral.SpectralSolver.run"""
+        n_steps = int(round((T - self.t) / self.dt))
+        frames = set(np.linspace(0, n_steps, n_frames, endpoint=False).astype(int)) if n_frames else set()
+        self.load(U, V)
+        for i in range(n_steps):
+            if i in frames and callback is not None:
+                callback(self.t, self.U, self.V)
+            self.step()
+            if monitor is not None and not monitor.converged and monitor.due(self.t):
+                if monitor.check(self.t, self.U[self.stencil.inside]):
+                    if monitor.action == "stop":
+                        break
+                    frames = {j for j in frames if j <= i} | set(monitor.thin(sorted(j for j in frames if j > i)))
+        U[...], V[...] = self.U, self.V
+        self.stop = convergence.stop_metadata(monitor, self.t)
+
+def neumann(Z):
+    """Set the zero-flux (Neumann) boundary of array Z in place,
+    so the derivatives at the edges are null"""
+    Z[0, :] = Z[1, :]
+    Z[-1, :] = Z[-2, :]
+    Z[:, 0] = Z[:, 1]
+    Z[:, -1] = Z[:, -2]
+
+def euler_step(U, V, dt, dx, D, reaction, args=()):
+    """Advance U and V by one explicit Euler step, in place
+    
+    Only the inside of the grids is updated, the edges hold the Neumann
+    boundary. The step is stable for dt < dx**2 / (4 * max(D)).
+    
+    Params:
+    U, V [Array] - Arrays of spatial data of the two species
+    dt [float] - Time step
+    dx [float] - Spatial step size
+    D [tuple] - Diffusion coefficients of U and V
+    reaction [function] - Returns the reaction rates (f, g) of U and V,
+                          called as reaction(U, V, *args), see kinetics.py
+    """
+    deltaU = laplacian(U, dx)
+    deltaV = laplacian(V, dx)
+    Uc = U[1:-1, 1:-1]
+    Vc = V[1:-1, 1:-1]
+    f, g = reaction(Uc, Vc, *args)
+    U[1:-1, 1:-1], V[1:-1, 1:-1] = \
+        Uc + dt * (D[0] * deltaU + f),\
+        Vc + dt * (D[1] * deltaV + g)
+    for Z in (U, V):
+        neumann(Z)
 
 def show_patterns(U, ax=None):
     """Visual representation of Turing Pattern
     
     Params:
     U [Array] - Array of spatial data to plot"""
-    ax.imshow(U, cmap=plt.cm.viridis,
+    ax.imshow(U, cmap="viridis",
               interpolation='bilinear',
               extent=[-1, 1, -1, 1])
     ax.set_axis_off()
\ No newline at end of file
@@ -0,0 +1,76 @@
+"""Reaction terms of the reaction-diffusion systems in this repository
+
+Each function returns the reaction rates (f, g) of the two species for
+(arrays of) concentrations U and V, to be combined with diffusion by the
+PDE solvers (see spectral.py and finite_difference.py).
+
+If out=(f, g) is given, the rates are written into these arrays without
+allocating any temporaries, so the solvers can reuse the same buffers at
+every step.
+"""
+
+import numpy as np
+
+
+def schnakenberg(U, V, a, b, out=None):
+    """Non-dimensional Schnakenberg kinetics, as in ode_simulator
+
+    Params:
+    U, V [array] - Concentrations of A and B
+    a [float] - Production rate of A
+    b [float] - Production rate of B
+    out [tuple] - Arrays (f, g) to write the rates into (default None)
+    """
+    return schnakenberg_rates(U, V, a, b, 1, 1, out=out)
+
+
+def schnakenberg_rates(U, V, mu, beta, alpha, kappa, out=None):
+    """Schnakenberg kinetics with the rate constants of the stochastic model
+
+    Params:
+    U, V [array] - Concentrations of A and B
+    mu [float] - Production rate of A
+    beta [float] - Production rate of B
+    alpha [float] - Degradation rate of A
+    kappa [float] - Rate of the reaction 2A + B -> 3A
+    out [tuple] - Arrays (f, g) to write the rates into (default None)
+    """
+    if out is None:
+        UUV = kappa * U * U * V
+        return mu - alpha * U + UUV, beta - UUV
+
+    f, g = out
+    # g holds kappa A^2 B until the end
+    np.multiply(U, U, out=g)
+    g *= V
+    g *= kappa
+    np.multiply(U, -alpha, out=f)
+    f += g
+    f += mu
+    np.subtract(beta, g, out=g)
+    return f, g
+
+
+def fitzhugh_nagumo(U, V, k, tau, out=None):
+    """FitzHugh–Nagumo kinetics, as in fd_main
+
+    (the diffusion coefficient of V is also divided by tau there)
+
+    Params:
+    U, V [array] - Activator and inhibitor
+    k [float] - Constant stimulus of the activator
+    tau [float] - Time scale of the inhibitor
+    out [tuple] - Arrays (f, g) to write the rates into (default None)
+    """
+    if out is None:
+        return U - U**3 - V + k, (U - V) / tau
+
+    f, g = out
+    np.multiply(U, U, out=f)
+    f *= U
+    np.subtract(U, f, out=f)
+    f -= V
+    f += k
+    np.subtract(U, V, out=g)
+    g /= tau
+    return f, g
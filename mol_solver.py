@@ -0,0 +1,190 @@
+"""Method of lines solver of the Schnakenberg PDE in 1D and 2D
+
+A' = mu - alpha A + kappa A^2 B + D_A (Laplacian of A)
+B' = beta - kappa A^2 B + D_B (Laplacian of B)
+
+on a grid of cells with zero-flux boundaries, as in the FiPy scripts
+spatial_main.py and spatial_main_2d.py. The discrete Laplacian is
+assembled once as a sparse matrix and the system of ODEs for all cells
+is integrated with a stiff solver of scipy.integrate.solve_ivp, using
+its analytic sparse Jacobian.
+"""
+
+import numpy as np
+from scipy import sparse
+from scipy.integrate import solve_ivp
+from kinetics import schnakenberg_rates
+import convergence
+
+
+def laplacian_matrix(shape, dx, boundary="neumann"):
+    """Return the five-point (three-point in 1D) Laplacian as a sparse matrix
+
+    Acts on a grid flattened in C order.
+
+    Params:
+    shape [tuple] - Number of cells along each axis (1D or 2D)
+    dx [float] - Spatial step size
+    boundary [string] - "neumann" (zero flux) or "periodic"
+    """
+    if boundary not in ("neumann", "periodic"):
+        raise ValueError(f"unknown boundary {boundary!r}, use 'neumann' or 'periodic'")
+
+    matrices = list()
+    for N in shape:
+        L = sparse.diags([np.ones(N - 1), -2 * np.ones(N), np.ones(N - 1)], [-1, 0, 1], format="lil")
+        if boundary == "neumann":
+            # No flux through the first and last faces
+            L[0, 0] = L[-1, -1] = -1
+        else:
+            L[0, -1] += 1
+            L[-1, 0] += 1
+        matrices.append(L.tocsr())
+
+    # Sum of the 1D operators along each axis: L_x (x) I + I (x) L_y
+    L = sparse.csr_matrix((np.prod(shape), np.prod(shape)))
+    for axis, L_axis in enumerate(matrices):
+        before = sparse.identity(int(np.prod(shape[:axis])), format="csr")
+        after = sparse.identity(int(np.prod(shape[axis + 1:])), format="csr")
+        L = L + sparse.kron(sparse.kron(before, L_axis), after, format="csr")
+    return (L / dx**2).tocsr()
+
+
+class MOLSolver:
+    """
+    Solves the Schnakenberg PDE on a 1D or 2D grid, with the state of all
+    cells flattened as y = [A_1, ..., A_N, B_1, ..., B_N].
+
+    Requires the following libraries:
+    * numpy as np
+    * scipy.sparse, scipy.integrate.solve_ivp
+
+    """
+
+    def __init__(self, shape, dx, D, mu, beta, alpha, kappa, boundary="neumann"):
+
+        """
+        shape is the number of cells along each axis
+        dx is the spatial step size
+        D is the pair of diffusion coefficients (D_A, D_B)
+        mu, beta, alpha and kappa are the rate constants, as in kinetics.schnakenberg_rates
+        """
+
+        self.shape = tuple(shape)
+        self.size = int(np.prod(shape))
+        self.rates = (mu, beta, alpha, kappa)
+        self.kappa = kappa
+        self.alpha = alpha
+
+        L = laplacian_matrix(self.shape, dx, boundary)
+        zero = sparse.csr_matrix((self.size, self.size))
+        self.diffusion = sparse.bmat([[D[0] * L, zero], [zero, D[1] * L]], format="csr")
+
+        # Every cell couples A and B, plus the neighbours of the Laplacian
+        identity = sparse.identity(self.size, format="csr")
+        pattern = sparse.bmat([[L, identity], [identity, L]], format="csr")
+        pattern.data[:] = 1
+        self.sparsity = pattern
+        self.n_evaluations = 0
+
+
+    def split(self, y):
+        """Return the views A and B of the flattened state y"""
+        return y[:self.size], y[self.size:]
+
+
+    def rhs(self, t, y):
+        """Derivatives dy/dt of the flattened state y"""
+        self.n_evaluations += 1
+        A, B = self.split(y)
+        f, g = schnakenberg_rates(A, B, *self.rates)
+        return self.diffusion @ y + np.concatenate([f, g])
+
+
+    def jacobian(self, t, y):
+        """Sparse Jacobian of rhs at the flattened state y"""
+        A, B = self.split(y)
+        AB = 2 * self.kappa * A * B
+        AA = self.kappa * A * A
+        reaction = sparse.bmat([[sparse.diags(AB - self.alpha), sparse.diags(AA)],
+                                [sparse.diags(-AB), sparse.diags(-AA)]], format="csr")
+        return self.diffusion + reaction
+
+
+    def solve(self, t_max, A_init, B_init, t_eval=None, method="BDF", jacobian="analytic",
+              rtol=1e-6, atol=1e-3, t_min=0, monitor=None):
+        """Return the times and the grids of A and B at these times
+
+        Params:
+        t_max [float] - the max time to be evaluated
+        A_init, B_init [array or float] - the initial state (grids of the shape of
+                                          the solver, or uniform values)
+        t_eval [array] - the times to return the solution at (default None, the solver steps)
+        method [string] - the solver of solve_ivp, the stiff "BDF" or "Radau" use the
+                          sparse Jacobian, others (e.g. "RK45") suit non-stiff rates
+        jacobian [string] - "analytic" for the sparse Jacobian, or "sparsity" for
+                            finite differences over its sparsity pattern
+        rtol, atol [float] - the tolerances of the solver
+        t_min [float] - the time of the initial state (default 0.0)
+        monitor [ConvergenceMonitor] - ends the solve early (or thins out the
+                                       remaining t_eval) once A is stationary,
+                                       checked every monitor.stride units of time
+                                       (default None, solve up to t_max)
+
+        The grids have shape (T,) + shape, for T times. Why and when the solve
+        ended is kept in self.stop.
+        """
+        y_init = np.concatenate([np.broadcast_to(A_init, self.shape).ravel(),
+                                 np.broadcast_to(B_init, self.shape).ravel()]).astype(float)
+
+        if jacobian not in ("analytic", "sparsity"):
+            raise ValueError(f"unknown jacobian {jacobian!r}, use 'analytic' or 'sparsity'")
+        options = dict()
+        # Only the implicit solvers use the Jacobian (and accept it sparse)
+        if method in ("BDF", "Radau"):
+            options = {"jac": self.jacobian} if jacobian == "analytic" else {"jac_sparsity": self.sparsity}
+
+        def integrate(t_start, t_stop, y_start, t_eval):
+            solution = solve_ivp(self.rhs, t_span=(t_start, t_stop), y0=y_start, t_eval=t_eval,
+                                 method=method, rtol=rtol, atol=atol, **options)
+            if not solution.success:
+                raise RuntimeError(solution.message)
+            return solution.t, solution.y
+
+        t_end = t_max
+        if monitor is None:
+            t, y = integrate(t_min, t_max, y_init, t_eval)
+        else:
+            # Integrate from one check of the monitor to the next
+            t_eval = None if t_eval is None else np.asarray(t_eval, dtype=float)
+            ts, ys = list(), list()
+            t_start, y_start = t_min, y_init
+            while t_start < t_max:
+                t_stop = min(t_start + monitor.stride, t_max)
+                if t_eval is None:
+                    t, y = integrate(t_start, t_stop, y_start, None)
+                    keep = np.ones(len(t), dtype=bool) if not ts else t > t_start
+                else:
+                    # Also evaluate at t_stop, to continue from there
+                    after = t_eval > t_start if ts else t_eval >= t_start
+                    inside = t_eval[after & (t_eval < t_stop)]
+                    t, y = integrate(t_start, t_stop, y_start, np.append(inside, t_stop))
+                    keep = np.isin(t, t_eval)
+                t_start, y_start = t_stop, y[:, -1]
+
+                stop = False
+                if not monitor.converged and monitor.check(t_stop, self.split(y_start)[0].reshape(self.shape)):
+                    stop = monitor.action == "stop"
+                if stop:
+                    keep[-1] = True  # end with the stationary state
+                ts.append(t[keep])
+                ys.append(y[:, keep])
+                if stop:
+                    break
+                if monitor.converged and t_eval is not None:
+                    t_eval = np.concatenate([t_eval[t_eval < t_stop], monitor.thin(t_eval[t_eval >= t_stop])])
+            t, y, t_end = np.concatenate(ts), np.concatenate(ys, axis=1), t_start
+        self.stop = convergence.stop_metadata(monitor, t_end)
+
+        A, B = self.split(y)
+        return (t, A.T.reshape((-1,) + self.shape), B.T.reshape((-1,) + self.shape))
@@ -0,0 +1,208 @@
+"""Exact spatial stochastic simulation with the next-subvolume method
+
+Every cell (subvolume) of the lattice has the time of its next event in
+an indexed priority queue. The earliest event is fired, and only the
+cells whose molecule numbers changed (the cell and, for diffusion, one
+neighbour) get new propensities and event times, so each event costs
+O(log N) for N cells.
+
+Elf, J. and Ehrenberg, M. (2004), Spontaneous separation of bi-stable
+biochemical systems into spatial domains of opposite phases, Syst. Biol. 1, 230.
+"""
+
+import numpy as np
+import math
+
+
+class IndexedPriorityQueue:
+    """
+    Binary min-heap of the event times of N items, where the time of any
+    item can be changed in O(log N) since the heap position of every item
+    is kept in an index.
+    """
+
+    def __init__(self, times):
+        self.times = list(times)
+        self.heap = sorted(range(len(self.times)), key=self.times.__getitem__)  # a sorted list is a heap
+        self.pos = [0] * len(self.heap)
+        for k, i in enumerate(self.heap):
+            self.pos[i] = k
+
+
+    def top(self):
+        """Return the item with the earliest time and its time"""
+        i = self.heap[0]
+        return i, self.times[i]
+
+
+    def update(self, i, time):
+        """Change the time of item i and restore the heap"""
+        old_time = self.times[i]
+        self.times[i] = time
+        if time < old_time:
+            self._sift_up(self.pos[i])
+        else:
+            self._sift_down(self.pos[i])
+
+
+    def _swap(self, k, l):
+        heap, pos = self.heap, self.pos
+        heap[k], heap[l] = heap[l], heap[k]
+        pos[heap[k]], pos[heap[l]] = k, l
+
+
+    def _sift_up(self, k):
+        heap, times = self.heap, self.times
+        while k > 0:
+            parent = (k - 1) // 2
+            if times[heap[k]] >= times[heap[parent]]:
+                break
+            self._swap(k, parent)
+            k = parent
+
+
+    def _sift_down(self, k):
+        heap, times = self.heap, self.times
+        N = len(heap)
+        while True:
+            child = 2 * k + 1
+            if child >= N:
+                break
+            if child + 1 < N and times[heap[child + 1]] < times[heap[child]]:
+                child += 1
+            if times[heap[child]] >= times[heap[k]]:
+                break
+            self._swap(k, child)
+            k = child
+
+
+
+class NextSubvolumeKernel:
+    """
+    Exact alternative to sim.TauLeapKernel for the same reactions (birth
+    of A and B, death of A, 2A + B -> 3A and diffusion to the four
+    neighbouring cells), to be stepped like adaptive.AdaptiveTauLeapKernel:
+    step(M_A, M_B, tau_max) fires every event in the next tau_max of time.
+
+    The grids are loaded into the kernel on the first step (or whenever
+    other grids than the ones it returned are passed in), and the number
+    of events fired so far is self.n_events.
+    """
+
+    batch = 65_536  # number of uniform random numbers drawn at once
+
+    def __init__(self, shape, mu, beta, alpha, kappa, d_A, d_B, rng=None):
+
+        if rng is None:
+            rng = np.random.default_rng()
+
+        self.rng = rng
+        self.shape = tuple(shape)
+        self.rates = (mu, beta, alpha, kappa, d_A, d_B)
+        self.dt = 0
+        self.n_events = 0
+        self._M_A = None
+        self._uniforms = list()
+
+        # Neighbours of each (flattened) cell
+        m, n = self.shape
+        self.neighbours = list()
+        for i in range(m):
+            for j in range(n):
+                cells = [(i + 1, j), (i - 1, j), (i, j + 1), (i, j - 1)]
+                self.neighbours.append([k * n + l for k, l in cells if 0 <= k < m and 0 <= l < n])
+
+
+    def uniform(self):
+        """Return a uniform random number in (0, 1]"""
+        if not self._uniforms:
+            self._uniforms = list(1 - self.rng.random(self.batch))
+        return self._uniforms.pop()
+
+
+    def propensities(self, c):
+        """Return the propensity of each reaction in cell c"""
+        mu, beta, alpha, kappa, d_A, d_B = self.rates
+        A, B, k = self.A[c], self.B[c], len(self.neighbours[c])
+        return (mu, beta, alpha * A, kappa * A * (A - 1) * B, d_A * A * k, d_B * B * k)
+
+
+    def next_time(self, c):
+        """Set the propensities of cell c and draw the time of its next event"""
+        self.P[c] = P = self.propensities(c)
+        total = sum(P)
+        if total == 0:
+            return math.inf
+        return self.t - math.log(self.uniform()) / total
+
+
+    def load(self, M_A, M_B):
+        self._M_A = np.array(M_A, dtype=np.int64)
+        self._M_B = np.array(M_B, dtype=np.int64)
+        self.A = self._M_A.ravel().tolist()
+        self.B = self._M_B.ravel().tolist()
+        self.t = 0
+        self.P = [None] * len(self.A)
+        self.queue = IndexedPriorityQueue([self.next_time(c) for c in range(len(self.A))])
+
+
+    def fire(self, c):
+        """Fire one event in cell c and update the cells it changed"""
+        P = self.P[c]
+        u = self.uniform() * sum(P)
+
+        # Choose the reaction by its share of the propensity of the cell
+        r = 0
+        while r < len(P) - 1 and u > P[r]:
+            u -= P[r]
+            r += 1
+
+        changed = [c]
+        if r == 0:
+            self.A[c] += 1
+        elif r == 1:
+            self.B[c] += 1
+        elif r == 2:
+            self.A[c] -= 1
+        elif r == 3:
+            self.A[c] += 1
+            self.B[c] -= 1
+        else:
+            # Diffuse to a random neighbour
+            neighbours = self.neighbours[c]
+            d = neighbours[min(int(self.uniform() * len(neighbours)), len(neighbours) - 1)]
+            species = self.A if r == 4 else self.B
+            species[c] -= 1
+            species[d] += 1
+            changed.append(d)
+
+        # By memorylessness, drawing new times for the changed cells is exact
+        for cell in changed:
+            self.queue.update(cell, self.next_time(cell))
+        self.n_events += 1
+
+
+    def step(self, M_A, M_B, tau_max=np.inf):
+        """
+        Fire every event in the next tau_max of time and return the new
+        grids (self.dt is the time simulated, which is always tau_max).
+        """
+        if math.isinf(tau_max):
+            raise ValueError("the next-subvolume method needs a finite tau_max to stop at")
+        if M_A is not self._M_A or M_B is not self._M_B:
+            self.load(M_A, M_B)
+
+        t_stop = self.t + tau_max
+        while True:
+            c, t_next = self.queue.top()
+            if t_next > t_stop:
+                break
+            self.t = t_next
+            self.fire(c)
+
+        self.t = t_stop
+        self.dt = tau_max
+
+        self._M_A[:] = np.reshape(self.A, self.shape)
+        self._M_B[:] = np.reshape(self.B, self.shape)
+        return self._M_A, self._M_B
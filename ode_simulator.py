@@ -1,6 +1,8 @@
 """ Solves time dependant ODE model without spatial variation
 """
 
+import numpy as np
+from scipy import sparse
 from scipy.integrate import solve_ivp
 
 
@@ -39,3 +41,130 @@ def solve_schnakenberg(t_max, t_min = 0, y_init = [0,0], rates = [0,0], t_eval =
     return solution.t, solution.y
 
 
+
+
+def ode_schnakenberg_batch(t, y, a_prod, b_prod):
+    """Derivatives of many independent Schnakenberg systems at once
+
+    The state is flattened as y = [A_1, ..., A_N, B_1, ..., B_N], as
+    solve_ivp needs, and can also have a second axis of states to evaluate
+    (solve_ivp with vectorized=True).
+
+    Params:
+    t [float] - the time at which the derivative is evaluated
+    y [array] - the current states, of shape (2N,) or (2N, k)
+    a_prod [array] - the production rates of A, of shape (N,)
+    b_prod [array] - the production rates of B, of shape (N,)
+    """
+    A, B = y.reshape((2, len(a_prod)) + y.shape[1:])
+    if y.ndim == 2:
+        a_prod, b_prod = a_prod[:, None], b_prod[:, None]
+
+    A2B = A**2 * B
+    return np.concatenate([A2B - A + a_prod, -A2B + b_prod]).reshape(y.shape)
+
+
+def jac_schnakenberg_batch(t, y, a_prod, b_prod):
+    """Analytic Jacobian of ode_schnakenberg_batch, as a sparse (2N, 2N) matrix
+
+    Params as for ode_schnakenberg_batch (y of shape (2N,))
+    """
+    A, B = y.reshape(2, len(a_prod))
+    return sparse.bmat([[sparse.diags(2 * A * B - 1), sparse.diags(A**2)],
+                        [sparse.diags(-2 * A * B), sparse.diags(-A**2)]], format='csc')
+
+
+def rk4_step(y, dt, a_prod, b_prod):
+    """One classical Runge-Kutta step of all (2, N) states y"""
+    def f(y):
+        A2B = y[0]**2 * y[1]
+        return np.array([A2B - y[0] + a_prod, -A2B + b_prod])
+
+    k1 = f(y)
+    k2 = f(y + dt / 2 * k1)
+    k3 = f(y + dt / 2 * k2)
+    k4 = f(y + dt * k3)
+    return y + dt / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+
+
+def backward_euler_step(y, dt, a_prod, b_prod, tol=1e-10, max_iter=20):
+    """One implicit (backward) Euler step of all (2, N) states y
+
+    The implicit equations are solved by Newton's method, with the 2x2
+    Jacobian of each system inverted analytically.
+    """
+    A, B = y.copy()
+    for _ in range(max_iter):
+        A2B = A**2 * B
+        # Residuals of y_next - y - dt * f(y_next)
+        F = A - y[0] - dt * (A2B - A + a_prod)
+        G = B - y[1] - dt * (-A2B + b_prod)
+        # Jacobian of the residuals
+        J11, J12 = 1 - dt * (2 * A * B - 1), -dt * A**2
+        J21, J22 = dt * 2 * A * B, 1 + dt * A**2
+        det = J11 * J22 - J12 * J21
+        dA = (J22 * F - J12 * G) / det
+        dB = (J11 * G - J21 * F) / det
+        A, B = A - dA, B - dB
+        if max(np.abs(dA).max(), np.abs(dB).max()) < tol:
+            break
+    return np.array([A, B])
+
+
+def solve_schnakenberg_batch(t_max, y_init, rates, t_min = 0, t_eval = None, method = 'RK45', dt = None):
+    """Return solutions of many Schnakenberg systems, integrated together
+
+    The rates and initial values of all systems are arrays, so a scan over
+    thousands of parameters or initial conditions is one call. The methods
+    of solve_ivp ('RK45', 'BDF', 'LSODA', ...) integrate all systems as one
+    vectorized system (stiff methods use the sparse analytic Jacobian), but
+    share one step size. 'rk4' (explicit) and 'implicit' (backward Euler)
+    instead take fixed steps of size dt, vectorized over the systems.
+
+    Params:
+    t_max [float] - the max time to be evaluated
+    y_init [array] - the initial values [A, B] of each system, shape (N, 2) or (2,)
+    rates [array] - the production rates [a, b] of each system, shape (N, 2) or (2,)
+    t_min [float] - the time of the initial state (default 0.0)
+    t_eval [array] - the times to return the solution at (default: every step for
+                     the fixed step methods, or those chosen by solve_ivp)
+    method [string] - 'rk4', 'implicit' or a method of solve_ivp (default 'RK45')
+    dt [float] - the step size of the fixed step methods
+
+    Returns the times, and the states indexed by system, [A, B] and time.
+    """
+    y_init, rates = np.atleast_2d(y_init), np.atleast_2d(rates)
+    N = max(len(y_init), len(rates))
+    y0 = np.broadcast_to(y_init, (N, 2)).T.astype(float)
+    a_prod, b_prod = np.broadcast_to(rates, (N, 2)).T.astype(float)
+
+    if method in ('rk4', 'implicit'):
+        if dt is None:
+            raise ValueError(f"the fixed step method {method!r} needs a step size dt")
+        step = rk4_step if method == 'rk4' else backward_euler_step
+        if t_eval is None:
+            t_eval = np.append(np.arange(t_min, t_max, dt), t_max)
+
+        t, y = t_min, y0
+        states = list()
+        for t_out in t_eval:
+            # Equal steps of at most dt up to the next output time
+            n_steps = int(np.ceil((t_out - t) / dt - 1e-9))
+            for _ in range(n_steps):
+                y = step(y, (t_out - t) / n_steps if n_steps else 0, a_prod, b_prod)
+            t = t_out
+            states.append(y)
+        return np.asarray(t_eval), np.stack(states, axis=-1).transpose(1, 0, 2)
+
+    options = dict()
+    if method in ('BDF', 'Radau', 'LSODA'):
+        options['jac'] = jac_schnakenberg_batch
+    solution = solve_ivp(ode_schnakenberg_batch,
+                         args = (a_prod, b_prod),
+                         t_span = (t_min, t_max),
+                         t_eval = t_eval,
+                         y0 = y0.ravel(),
+                         method = method,
+                         vectorized = True,
+                         **options)
+    return solution.t, solution.y.reshape(2, N, -1).transpose(1, 0, 2)
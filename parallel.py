@@ -0,0 +1,253 @@
+"""Domain-decomposed tau-leaping over several processes
+
+The lattice is split into horizontal strips of rows, one per worker
+process. The grids live in shared memory, each worker steps its own strip
+with a sim.TauLeapKernel and hands the molecules diffusing out of its
+first and last rows (a one-row halo) to the neighbouring strips.
+
+The workers are started by the first call of ParallelKernel.advance and
+then wait for the number of steps of the next call, until
+ParallelKernel.close. A worker which raises breaks the barrier the
+others wait at, so they all stop and the error is raised by advance.
+"""
+
+import sim
+import streams
+import numpy as np
+import multiprocessing as mp
+import queue
+import time
+import traceback
+import weakref
+from multiprocessing import shared_memory
+
+
+def _worker(w, rows, shape, names, params, rng_state, barrier, commands, results):
+    """
+    Step strip w (rows[0]:rows[1]) of the shared grids by the number of
+    steps of each command, until the command is None. After each command
+    (w, state of the random number generator, None) is put on results,
+    or (w, None, traceback) if the steps raised.
+    """
+
+    W = len(names["bounds"]) - 1
+    r0, r1 = rows
+
+    # Attach to the shared grids and halo buffer
+    buffers = [shared_memory.SharedMemory(name=names[key]) for key in ("M_A", "M_B", "halo")]
+    try:
+        M_A = np.ndarray(shape, dtype=np.int64, buffer=buffers[0].buf)[r0:r1]
+        M_B = np.ndarray(shape, dtype=np.int64, buffer=buffers[1].buf)[r0:r1]
+        # Indexed by worker, species, direction (0 is down, 1 is up) and column
+        halo = np.ndarray((W, 2, 2, shape[1]), dtype=np.int64, buffer=buffers[2].buf)
+
+        # Only the edges of the whole lattice are closed
+        edges = ["right", "left"]
+        if w == 0:
+            edges.append("top")
+        if w == W - 1:
+            edges.append("bottom")
+
+        rng = streams.make_generator(bit_generator=rng_state["bit_generator"])
+        rng.bit_generator.state = rng_state
+        kernel = sim.TauLeapKernel(M_A.shape, **params, rng=rng, edges=tuple(edges))
+
+        for n_steps in iter(commands.get, None):
+            try:
+                for _ in range(n_steps):
+
+                    # Update the strip, the molecules leaving it are in the halo
+                    kernel.step(M_A, M_B)
+                    Z = kernel.Z
+                    if w < W - 1:
+                        halo[w, 0, 0], halo[w, 1, 0] = Z[4][-1], Z[8][-1]
+                    if w > 0:
+                        halo[w, 0, 1], halo[w, 1, 1] = Z[5][0], Z[9][0]
+                    barrier.wait()
+
+                    # Take in the molecules leaving the neighbouring strips
+                    if w > 0:
+                        M_A[0] += halo[w - 1, 0, 0]
+                        M_B[0] += halo[w - 1, 1, 0]
+                    if w < W - 1:
+                        M_A[-1] += halo[w + 1, 0, 1]
+                        M_B[-1] += halo[w + 1, 1, 1]
+                    barrier.wait()
+            except Exception:
+                # Release the workers waiting for this one, and stop
+                barrier.abort()
+                results.put((w, None, traceback.format_exc()))
+                return
+
+            results.put((w, kernel.rng.bit_generator.state, None))
+    finally:
+        for buffer in buffers:
+            buffer.close()
+
+
+def _shutdown(processes, commands, shared, terminate=False):
+    """Stop the worker processes (asking them to finish, unless terminate) and free the shared memory"""
+
+    if not terminate:
+        for command in commands:
+            command.put(None)
+    for process in processes:
+        if terminate:
+            process.terminate()
+        process.join(timeout=None if not terminate else 5)
+    for buffer in shared.values():
+        try:
+            buffer.close()
+        except BufferError:
+            pass  # still viewed by an array of the kernel (at exit), freed with the process
+        buffer.unlink()
+
+
+class ParallelKernel:
+    """
+    Parallel equivalent of sim.TauLeapKernel for large lattices, which
+    advances the grids by many steps at once with one process per strip.
+
+    Each strip w has its own random number stream (seed, tile=w) with the
+    bit generator named bit_generator (see streams.py), so a run is
+    reproducible for a given seed and number of workers. The result is
+    statistically (not bit-for-bit) equivalent to the serial kernel.
+
+    The worker processes and shared grids are kept from one call of
+    advance to the next, call close (or use the kernel in a with
+    statement) to stop them. timeout is the number of seconds advance
+    waits for the workers before giving up (default: no limit, but a
+    worker which raises or dies always ends the call with an error).
+    """
+
+    def __init__(self, shape, tau, mu, beta, alpha, kappa, d_A, d_B, workers=None, seed=None,
+                 bit_generator="PCG64", timeout=None):
+
+        m, n = shape
+        workers = min(workers or mp.cpu_count(), m)
+
+        self.shape = shape
+        self.timeout = timeout
+        self.params = {"tau": tau, "mu": mu, "beta": beta, "alpha": alpha,
+                       "kappa": kappa, "d_A": d_A, "d_B": d_B}
+        self.bounds = np.linspace(0, m, workers + 1).astype(int)  # first row of each strip
+        self.rng_states = [streams.make_generator(seed, bit_generator, tile=w).bit_generator.state
+                           for w in range(workers)]
+        self.processes = None
+
+
+    @property
+    def workers(self):
+        return len(self.bounds) - 1
+
+
+    def start(self):
+        """Create the shared grids and start the worker processes"""
+
+        W, (m, n) = self.workers, self.shape
+
+        shared = {"M_A": shared_memory.SharedMemory(create=True, size=m * n * 8),
+                  "M_B": shared_memory.SharedMemory(create=True, size=m * n * 8),
+                  "halo": shared_memory.SharedMemory(create=True, size=W * 2 * 2 * n * 8)}
+        self.shared_A = np.ndarray(self.shape, dtype=np.int64, buffer=shared["M_A"].buf)
+        self.shared_B = np.ndarray(self.shape, dtype=np.int64, buffer=shared["M_B"].buf)
+
+        names = {key: buffer.name for key, buffer in shared.items()}
+        names["bounds"] = list(self.bounds)
+
+        barrier = mp.Barrier(W)
+        self.commands = [mp.Queue() for _ in range(W)]
+        self.results = mp.Queue()
+        self.processes = [mp.Process(target=_worker, daemon=True,
+                                     args=(w, (self.bounds[w], self.bounds[w + 1]), self.shape, names,
+                                           self.params, self.rng_states[w], barrier, self.commands[w],
+                                           self.results))
+                          for w in range(W)]
+        for process in self.processes:
+            process.start()
+
+        # Stop the workers if the kernel is dropped without close()
+        self._finalizer = weakref.finalize(self, _shutdown, self.processes, self.commands, shared)
+        self._shared = shared
+
+
+    def close(self, terminate=False):
+        """Stop the worker processes and free the shared grids"""
+
+        if self.processes is not None:
+            self._finalizer.detach()
+            del self.shared_A, self.shared_B
+            _shutdown(self.processes, self.commands, self._shared, terminate=terminate)
+            self.processes = None
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+    def advance(self, M_A, M_B, n_steps):
+        """
+        Advance M_A and M_B by n_steps time steps of length tau, in place
+        (the grids are also returned, like sim.TauLeapKernel.step, and are
+        new arrays if they had to be promoted to a larger type).
+
+        The shared grids are 64-bit, so the workers never need to promote them.
+        """
+
+        if self.processes is None:
+            self.start()
+        self.shared_A[:], self.shared_B[:] = M_A, M_B
+
+        for command in self.commands:
+            command.put(n_steps)
+
+        try:
+            # Keep the random number streams going for the next call
+            for w, state in self.collect():
+                self.rng_states[w] = state
+        except BaseException:
+            self.close(terminate=True)
+            raise
+
+        M_A, M_B = sim.promote(M_A, self.shared_A), sim.promote(M_B, self.shared_B)
+        M_A[:], M_B[:] = self.shared_A, self.shared_B
+
+        return M_A, M_B
+
+
+    def collect(self):
+        """
+        Return (w, state of the random number generator) from every worker,
+        raising the error of the first worker which failed (or died, or
+        did not finish within self.timeout seconds).
+        """
+
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        states = list()
+        reported = set()
+        while len(states) < self.workers:
+            try:
+                w, state, error = self.results.get(timeout=1.0)
+            except queue.Empty:
+                dead = [w for w, process in enumerate(self.processes)
+                        if w not in reported and not process.is_alive()]
+                if dead:
+                    raise RuntimeError(f"parallel worker {dead[0]} died with exit code "
+                                       f"{self.processes[dead[0]].exitcode}")
+                if deadline is not None and time.monotonic() > deadline:
+                    raise TimeoutError(f"parallel workers did not finish within {self.timeout} s")
+                continue
+
+            reported.add(w)
+            if error is not None:
+                # The other workers only stop because the barrier was broken, so wait for
+                # the failure which broke it (if it is not this one)
+                if "BrokenBarrierError" in error:
+                    continue
+                raise RuntimeError(f"parallel worker {w} failed:\n{error}")
+            states.append((w, state))
+        return states
@@ -0,0 +1,195 @@
+"""Timers, progress and memory reports of simulation runs
+
+A Profiler counts the steps of a run to report steps per second and the
+estimated time left, and tracks the peak memory of the process. With
+phases switched on it also adds up the time spent in each named phase of
+the run (the parts of a kernel step, recording snapshots, checkpoints,
+rendering, ...), which the code marks with
+
+    with profiler.phase("draw"):
+        ...
+
+The time of a phase excludes that of the phases nested in it (e.g. the
+parts of a kernel step in the "step" of the time loop), so the fractions
+of the runtime spent in the phases add up to at most 1.
+
+With phases off, phase() returns a shared do-nothing context, so the
+marks can stay in the hot loops. The report is a dictionary which can be
+saved as JSON or CSV.
+"""
+
+import time
+import json
+import csv
+import os
+from contextlib import nullcontext
+
+
+_null_phase = nullcontext()
+
+
+def null_phase(name):
+    """Stand-in for Profiler.phase when nothing is profiled"""
+    return _null_phase
+
+
+def peak_rss():
+    """Peak resident memory of this process in MB (None where the resource module is missing)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    import sys
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+
+class Profiler:
+    """
+    Steps per second, ETA, peak memory and (optionally) time per phase of a run.
+    """
+
+    def __init__(self, phases=False, trace_memory=False, progress_every=100_000):
+
+        """
+        phases switches on the timers of phase()
+        trace_memory also tracks the peak of the memory allocated by Python
+        and numpy with tracemalloc (slower, but specific to the run)
+        progress_every is the number of steps between progress lines
+        """
+
+        self.phases = phases
+        self.trace_memory = trace_memory
+        self.progress_every = progress_every
+
+        self.times = dict()  # phase -> cumulative seconds
+        self.calls = dict()  # phase -> number of calls
+        self._nested = list()  # seconds in the phases nested in each running phase
+        self.steps = 0
+        self._start_steps = 0
+        self.total = None
+        self.runtime = 0
+        self._start = None
+
+        if not phases:
+            self.phase = null_phase
+
+
+    def start(self, total=None, steps=0):
+        """Start the clock of a run of total steps, steps of which are already done"""
+        self.total = total
+        self.steps = self._start_steps = int(steps)
+        self._start = time.perf_counter()
+        if self.trace_memory:
+            import tracemalloc
+            tracemalloc.start()
+
+
+    def stop(self):
+        """Stop the clock, adding the time since start() to the runtime"""
+        if self._start is not None:
+            self.runtime += time.perf_counter() - self._start
+            self._start = None
+        if self.trace_memory:
+            import tracemalloc
+            self.traced_peak = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.stop()
+
+
+    def elapsed(self):
+        return self.runtime + (time.perf_counter() - self._start if self._start is not None else 0)
+
+
+    def phase(self, name):
+        """Context which adds the time spent in it, outside nested phases, to phase name"""
+        return _Timer(self, name)
+
+
+    def step(self, n=1):
+        """Count n steps, printing the progress every progress_every steps"""
+        self.steps += n
+        if self.progress_every and self.steps % self.progress_every == 0:
+            print(self.progress())
+
+
+    def rate(self):
+        """Steps per second since start()"""
+        elapsed = time.perf_counter() - self._start if self._start is not None else 0
+        return (self.steps - self._start_steps) / elapsed if elapsed > 0 else float("nan")
+
+
+    def eta(self):
+        """Estimated seconds left, at the current rate"""
+        if self.total is None:
+            return float("nan")
+        return (self.total - self.steps) / self.rate()
+
+
+    def progress(self):
+        """Progress line: steps, steps per second and ETA"""
+        if self.total is None:
+            return f"{self.steps} ({self.rate():.0f} steps/s)"
+        return f"{self.steps}/{self.total} ({self.rate():.0f} steps/s, ETA {self.eta():.0f} s)"
+
+
+    def report(self):
+        """Return the report of the run as a dictionary"""
+        runtime = self.elapsed()
+        report = {"runtime": runtime, "steps": self.steps,
+                  "steps_per_second": (self.steps - self._start_steps) / runtime if runtime > 0 else None,
+                  "peak_rss_mb": peak_rss()}
+        if hasattr(self, "traced_peak"):
+            report["peak_traced_mb"] = self.traced_peak
+        if self.phases:
+            report["phases"] = {name: {"seconds": seconds, "calls": self.calls[name],
+                                       "fraction": seconds / runtime if runtime > 0 else None}
+                                for name, seconds in sorted(self.times.items(), key=lambda item: -item[1])}
+        return report
+
+
+    def save(self, path):
+        """
+        Write the report to path, as JSON (.json) or as CSV (.csv) with one
+        row per phase followed by the totals of the run.
+        """
+        report = self.report()
+        with open(path + ".tmp", "w", newline="") as file:
+            if path.endswith(".csv"):
+                writer = csv.writer(file)
+                writer.writerow(["phase", "seconds", "calls", "fraction"])
+                for name, phase in report.get("phases", {}).items():
+                    writer.writerow([name, phase["seconds"], phase["calls"], phase["fraction"]])
+                for key, value in report.items():
+                    if key != "phases":
+                        writer.writerow([key, value, "", ""])
+            else:
+                json.dump(report, file, indent=2, default=float)
+        os.replace(path + ".tmp", path)
+
+
+
+class _Timer:
+
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+
+    def __enter__(self):
+        self.profiler._nested.append(0)
+        self.start = time.perf_counter()
+
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        profiler = self.profiler
+        nested = profiler._nested.pop()
+        if profiler._nested:
+            profiler._nested[-1] += seconds  # not the enclosing phase's own time
+        profiler.times[self.name] = profiler.times.get(self.name, 0) + seconds - nested
+        profiler.calls[self.name] = profiler.calls.get(self.name, 0) + 1
@@ -0,0 +1,519 @@
+"""Rendering of simulation snapshots into GIF or MP4 movies
+
+Frames are drawn on one matplotlib figure per style and process (the
+artists are updated in place instead of creating a figure per frame),
+rendered to RGB arrays on the Agg canvas and streamed straight into the
+movie file one frame at a time, without writing any intermediate PNG files. Frames can be
+rendered in a pool of worker processes. The "lut" movie type skips
+matplotlib altogether and colors the grids with a lookup table of the
+colormap (see LUTRenderer), for thousands of frames per second.
+
+A Renderer keeps the grids it has read (keyed by file, species and time
+point) and the frames it has rendered (keyed by file, species, time point
+and style) in memory, so rendering the same snapshots again, e.g. with
+another colormap, does not read the data again.
+"""
+
+import numpy as np
+import os
+import hashlib
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib import cm, colors
+
+
+DEFAULT_STYLE = {"movie_type": "imshow", "cmap": "viridis", "vmin": 0, "vmax": 1000,
+                 "dpi": 100, "figsize": (6.4, 4.8),
+                 # Only for movie_type "lut", see LUTRenderer
+                 "scale": 8, "interpolation": "nearest", "colorbar": True}
+
+
+def make_style(**style):
+    """Return a complete style dictionary, filling in DEFAULT_STYLE"""
+    unknown = set(style) - set(DEFAULT_STYLE)
+    if unknown:
+        raise ValueError(f"unknown style keys {sorted(unknown)}, use {list(DEFAULT_STYLE)}")
+    return {**DEFAULT_STYLE, **style}
+
+
+def style_key(style):
+    """Hashable key of a style dictionary"""
+    return tuple(sorted(style.items()))
+
+
+class FrameRenderer:
+    """
+    One figure (with its colorbar) for a movie type, figure size and dpi,
+    on which any number of frames are drawn by updating its artists.
+    """
+
+    def __init__(self, movie_type, figsize, dpi):
+
+        if movie_type not in ("imshow", "surface"):
+            raise ValueError(f"unknown movie type {movie_type!r}, use 'imshow' or 'surface'")
+
+        self.movie_type = movie_type
+        self.figure = Figure(figsize=figsize, dpi=dpi)
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.mappable = cm.ScalarMappable()
+        self.shape = None
+
+        if movie_type == "imshow":
+            self.ax = self.figure.add_subplot()
+            self.ax.set_xticks([])
+            self.ax.set_yticks([])
+            self.colorbar = self.figure.colorbar(self.mappable, ax=self.ax)
+        else:
+            self.ax = self.figure.add_subplot(projection="3d")
+            self.ax.set_xticklabels([])
+            self.ax.set_yticklabels([])
+            self.colorbar = self.figure.colorbar(self.mappable, ax=self.ax, shrink=0.5, aspect=5)
+        self.artist = None
+
+
+    def render(self, M, style):
+        """Return the frame of grid M in style as an (height, width, 3) uint8 array"""
+
+        norm = colors.Normalize(vmin=style["vmin"], vmax=style["vmax"])
+        self.mappable.set_norm(norm)
+        self.mappable.set_cmap(style["cmap"])
+
+        if self.movie_type == "imshow":
+            if self.artist is None or M.shape != self.shape:
+                if self.artist is not None:
+                    self.artist.remove()
+                self.artist = self.ax.imshow(M, norm=norm, cmap=style["cmap"])
+                self.figure.tight_layout()
+            else:
+                self.artist.set_data(M)
+                self.artist.set_norm(norm)
+                self.artist.set_cmap(style["cmap"])
+        else:
+            # A surface can not be updated in place, only its axes are reused
+            if self.artist is not None:
+                self.artist.remove()
+            m, n = M.shape
+            X, Y = np.meshgrid(np.arange(n), np.arange(m))
+            self.artist = self.ax.plot_surface(X, Y, M, norm=norm, cmap=style["cmap"], linewidth=0)
+            if style["vmax"]:
+                self.ax.set_zlim(style["vmin"], style["vmax"])
+            if M.shape != self.shape:
+                self.figure.tight_layout()
+        self.shape = M.shape
+
+        self.canvas.draw()
+        return np.asarray(self.canvas.buffer_rgba())[..., :3].copy()
+
+
+def colormap_lut(cmap, n_colors=256):
+    """Return the RGB colors of the colormap named cmap as an (n_colors, 3) uint8 lookup table"""
+    from matplotlib import colormaps
+
+    return np.round(colormaps[cmap].resampled(n_colors)(np.arange(n_colors))[:, :3] * 255).astype(np.uint8)
+
+
+class LUTRenderer:
+    """
+    Fast path for imshow movies without matplotlib: the grid is clipped to
+    [vmin, vmax], upscaled by scale (with "nearest" or "bilinear"
+    interpolation) and turned into colors by indexing a lookup table of
+    the colormap. A colorbar is rendered once with matplotlib and pasted
+    to the right of every frame.
+    """
+
+    def __init__(self, shape, cmap="viridis", vmin=0, vmax=1000, scale=8, interpolation="nearest",
+                 colorbar=True, n_colors=256):
+
+        if interpolation not in ("nearest", "bilinear"):
+            raise ValueError(f"unknown interpolation {interpolation!r}, use 'nearest' or 'bilinear'")
+
+        m, n = shape
+        self.shape = shape
+        self.lut = colormap_lut(cmap, n_colors)
+        self.offset = vmin
+        self.factor = (n_colors - 1) / (vmax - vmin)
+        self.n_colors = n_colors
+        self.scale = scale
+        self.interpolation = interpolation
+
+        # Cells between which the pixels are interpolated and their weights (bilinear)
+        if interpolation == "bilinear":
+            self.rows = self.weights(m, scale)
+            self.cols = self.weights(n, scale)
+
+        self.bar = self.render_colorbar(m * scale, cmap, vmin, vmax) if colorbar else None
+        width = n * scale + (0 if self.bar is None else self.bar.shape[1])
+        self.frame = np.zeros((m * scale, width, 3), dtype=np.uint8)
+        if self.bar is not None:
+            self.frame[:, n * scale:] = self.bar
+
+        # The image part of the frame, by rows of cells (nearest), or with
+        # each pixel and color of the lookup table as one 3 byte item (bilinear)
+        self.rows_of_cells = self.frame[:, :n * scale].reshape(m, scale, n * scale, 3)
+        self.pixels = self.frame.view("V3")[:, :n * scale, 0]
+        self.colors = self.lut.view("V3")[:, 0]
+
+
+    @staticmethod
+    def render_colorbar(height, cmap, vmin, vmax):
+        """Return a colorbar of height pixels as an RGB array"""
+        dpi = 100
+        figure = Figure(figsize=(max(height / 3, 60) / dpi, height / dpi), dpi=dpi)
+        canvas = FigureCanvasAgg(figure)
+        ax = figure.add_axes([0.1, 0.05, 0.25, 0.9])
+        figure.colorbar(cm.ScalarMappable(colors.Normalize(vmin, vmax), cmap), cax=ax)
+        ax.tick_params(labelsize=max(6, min(10, height // 30)))
+        canvas.draw()
+        return np.asarray(canvas.buffer_rgba())[..., :3].copy()
+
+
+    @staticmethod
+    def weights(n, scale):
+        """Return the cells left and right of the centres of n * scale pixels and the right weights"""
+        x = np.clip((np.arange(n * scale) + 0.5) / scale - 0.5, 0, n - 1)
+        left = x.astype(np.intp)
+        return left, np.minimum(left + 1, n - 1), (x - left).astype(np.float32)
+
+
+    def indices(self, M):
+        """Return the lookup table indices of the cells of M (of the upscaled pixels for bilinear)"""
+        values = np.asarray(M, dtype=np.float32)
+        if self.interpolation == "bilinear":
+            # Interpolate along the rows, then along the columns
+            top, bottom, w = self.rows
+            values = values[top] + (values[bottom] - values[top]) * w[:, None]
+            left, right, w = self.cols
+            values = values[:, left] + (values[:, right] - values[:, left]) * w
+        indices = (values - self.offset) * self.factor
+        np.clip(indices, 0, self.n_colors - 1, out=indices)
+        return indices.astype(np.intp)
+
+
+    def render(self, M):
+        """Return the frame of grid M as an (height, width, 3) uint8 array"""
+        m, n = M.shape
+        s = self.scale
+        if self.interpolation == "nearest":
+            # Color the m x n cells, widen them to one row of pixels each and
+            # copy that row s times into the frame
+            row = self.lut[self.indices(M)].repeat(s, axis=1)
+            self.rows_of_cells[...] = row[:, None]
+        else:
+            np.take(self.colors, self.indices(M), out=self.pixels, mode="clip")
+        # The frames are kept (by Renderer.frames and the movie writers), so each needs its own copy
+        return self.frame.copy()
+
+
+def catscan_windows(M, window=10, z_min=None, z_max=None):
+    """
+    Return the lower ends z of the color ranges [z, z + window] of the
+    catscan of grid M, from z_min to z_max. By default they cover the
+    values of M, from its minimum (rounded down to a multiple of window)
+    to its maximum, and there is always at least one.
+    """
+    if z_min is None:
+        z_min = np.floor(np.min(M) / window) * window
+    if z_max is None:
+        z_max = np.max(M)
+    return np.arange(z_min, max(z_max, z_min + window), window)
+
+
+def catscan_indices(M, window=10, z_min=None, z_max=None, n_colors=256, workers=1):
+    """
+    Return the windows z and the catscan of grid M in one vectorized pass:
+    an (n_windows, m, n) uint8 stack of the lookup table indices of M with
+    the color range [z, z + window] for each z from z_min to z_max. By
+    default the windows cover the values of M, from its minimum (rounded
+    down to a multiple of window) to its maximum. The stack is filled in
+    chunks of windows (which bound the temporary arrays), on workers
+    threads.
+    """
+    M = np.asarray(M, dtype=np.float32)
+    z = catscan_windows(M, window, z_min, z_max)
+
+    stack = np.empty((len(z),) + M.shape, dtype=np.uint8)
+    factor = np.float32((n_colors - 1) / window)
+
+    def fill(chunk):
+        values = (M - z[chunk, None, None].astype(np.float32)) * factor
+        np.clip(values, 0, n_colors - 1, out=values)
+        stack[chunk] = values
+
+    chunks = np.array_split(np.arange(len(z)), max(1, stack.size // 2**22))
+    if workers > 1:
+        from concurrent.futures import ThreadPoolExecutor
+
+        # numpy releases the GIL in the arithmetic, so threads fill chunks in parallel
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(fill, chunks))
+    else:
+        for chunk in chunks:
+            fill(chunk)
+    return z, stack
+
+
+def write_gif(file, images, fps=5):
+    """
+    Write images (Pillow images of mode "P", all of the same size) to the
+    binary file as a looping GIF, one at a time, so only the frame being
+    written is in memory (Image.save with append_images keeps every frame
+    until the end). Each frame after the first carries its own palette.
+    """
+    from PIL import GifImagePlugin
+
+    n_frames = 0
+    for image in images:
+        if n_frames == 0:
+            header, _ = GifImagePlugin.getheader(image, info={"loop": 0, "duration": 1000 / fps})
+            file.write(b"".join(header))
+        for data in GifImagePlugin.getdata(image, duration=1000 / fps, include_color_table=n_frames > 0):
+            file.write(data)
+        n_frames += 1
+    if n_frames == 0:
+        raise ValueError("a GIF needs at least one frame")
+    file.write(b";")
+    return n_frames
+
+
+def palette_gif(frames, lut, fps=5):
+    """
+    Return the bytes of the GIF of frames, 2D uint8 arrays of indices into
+    lut (an (n_colors, 3) uint8 table with at most 256 colors), built in
+    memory. The frames are palette images already, so nothing is quantized.
+    """
+    import io
+    from PIL import Image
+
+    palette = np.asarray(lut, dtype=np.uint8).ravel().tolist()
+
+    def image(frame):
+        image = Image.fromarray(np.ascontiguousarray(frame), mode="P")
+        image.putpalette(palette)
+        return image
+
+    buffer = io.BytesIO()
+    write_gif(buffer, (image(frame) for frame in frames), fps)
+    return buffer.getvalue()
+
+
+# Figures (and lookup tables) of the current process, one per style
+_renderers = dict()
+
+
+def render_frame(M, style):
+    """Render grid M in style with the figure of this process for the style"""
+    M = np.asarray(M)
+    if style["movie_type"] == "lut":
+        key = ("lut", M.shape, style["cmap"], style["vmin"], style["vmax"],
+               style["scale"], style["interpolation"], style["colorbar"])
+        if key not in _renderers:
+            _renderers[key] = LUTRenderer(*key[1:])
+        return _renderers[key].render(M)
+
+    key = (style["movie_type"], tuple(style["figsize"]), style["dpi"])
+    if key not in _renderers:
+        _renderers[key] = FrameRenderer(*key)
+    return _renderers[key].render(M, style)
+
+
+def _render_job(job):
+    return render_frame(*job)
+
+
+def source_token(X):
+    """
+    Return a token of the snapshots X which changes when they are replaced
+    by those of another run: the path and modification time of the files
+    they are read from (a store view, a memory-mapped movie, or a species
+    of a dataset.DatasetView of either, with its region), and otherwise
+    the shape of X and a hash of its first and last snapshots.
+    """
+    token = ()
+    if hasattr(X, "view") and hasattr(X, "kind"):  # a species of a dataset.DatasetView
+        token = (repr(X.view.region),)
+        source = X.view.data[X.kind]
+    else:
+        source = X
+
+    path = None
+    if hasattr(source, "store"):  # a store.SpeciesView
+        path = os.path.join(source.store.path, "index.txt")
+    elif isinstance(source, np.memmap):
+        path = source.filename
+    if path is not None:
+        return token + (os.path.abspath(path), os.stat(path).st_mtime_ns, len(X))
+
+    digest = hashlib.sha1()
+    for i in (0, -1):
+        digest.update(np.ascontiguousarray(X[i]).tobytes())
+    return token + (len(X), np.shape(X[0]), digest.hexdigest())
+
+
+class LRUCache:
+    """Dictionary of arrays which drops the least recently used ones above max_bytes"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.items = OrderedDict()
+        self.n_bytes = 0
+
+
+    def __contains__(self, key):
+        return key in self.items
+
+
+    def get(self, key):
+        self.items.move_to_end(key)
+        return self.items[key]
+
+
+    def forget(self, prefix):
+        """Drop the entries whose key starts with the tuple prefix"""
+        for key in [key for key in self.items if key[:len(prefix)] == prefix]:
+            self.n_bytes -= self.items.pop(key).nbytes
+
+
+    def put(self, key, value):
+        if key in self.items:
+            self.n_bytes -= self.items.pop(key).nbytes
+        self.items[key] = value
+        self.n_bytes += value.nbytes
+        while self.n_bytes > self.max_bytes and len(self.items) > 1:
+            _, dropped = self.items.popitem(last=False)
+            self.n_bytes -= dropped.nbytes
+
+
+class Renderer:
+    """
+    Renders frames of snapshots (in a process pool if workers > 1) and
+    writes them to movies, caching the grids and frames in memory.
+    """
+
+    def __init__(self, workers=None, grid_cache_bytes=2**28, frame_cache_bytes=2**28):
+
+        """
+        workers is the number of worker processes (default: all cores, 1 renders in this process)
+        grid_cache_bytes and frame_cache_bytes are the sizes of the caches of grids and frames
+        """
+
+        self.workers = workers or os.cpu_count()
+        self.grids = LRUCache(grid_cache_bytes)
+        self.frames = LRUCache(frame_cache_bytes)
+        self.sources = dict()  # (file, species) -> token of the snapshots last rendered
+        self._executor = None
+
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+    def grid(self, X, i, key):
+        """Return snapshot i of X (an array or a store view), read at most once per key"""
+        if key not in self.grids:
+            self.grids.put(key, np.asarray(X[i]))
+        return self.grids.get(key)
+
+
+    def render(self, jobs):
+        """
+        Yield the frames of jobs, a list of (key, load, style) where load()
+        returns the grid to render with key (file, species, time point),
+        in order. Only frames which are not cached are rendered (and only
+        then are their grids loaded), at most 2 * workers at a time.
+        """
+        if self.workers > 1 and self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+
+        pending = deque()  # (frame key, frame or future of the frame)
+        for key, load, style in jobs:
+            frame_key = key + (style_key(style),)
+            if frame_key in self.frames:
+                pending.append((frame_key, self.frames.get(frame_key)))
+            elif self._executor is None or style["movie_type"] == "lut":
+                # Lookup table frames are cheaper to render than to send to a worker
+                pending.append((frame_key, render_frame(load(), style)))
+            else:
+                pending.append((frame_key, self._executor.submit(_render_job, (load(), style))))
+
+            while pending and (isinstance(pending[0][1], np.ndarray) or len(pending) > 2 * self.workers):
+                yield self._collect(*pending.popleft())
+
+        while pending:
+            yield self._collect(*pending.popleft())
+
+
+    def _collect(self, frame_key, result):
+        frame = result if isinstance(result, np.ndarray) else result.result()
+        self.frames.put(frame_key, frame)
+        return frame
+
+
+    def movie_jobs(self, X, filename, kind, style, every=5_000, N_max=None, times=None, token=None):
+        """
+        Return the jobs (see Renderer.render) of the snapshots of X at the
+        time points which are multiples of every (and below N_max).
+        times are the time points of the snapshots of X (by default
+        snapshot t is time point t). token identifies the run the
+        snapshots come from (by default source_token(X)).
+        """
+        # Snapshots of a new run under the same name replace the cached ones
+        if token is None:
+            token = source_token(X)
+        if self.sources.get((filename, kind), token) != token:
+            self.grids.forget((filename, kind))
+            self.frames.forget((filename, kind))
+        self.sources[(filename, kind)] = token
+
+        if times is None:
+            times = np.arange(len(X))
+        N_t = N_max or times[-1] + 1
+
+        jobs = list()
+        for i in np.flatnonzero((times % every == 0) & (times < N_t)):
+            key = (filename, kind, int(times[i]))
+            jobs.append((key, lambda i=i, key=key: self.grid(X, i, key), style))
+        return jobs
+
+
+    def catscan_jobs(self, M, filename, kind, t, window=10, z_min=None, z_max=None, style=None):
+        """
+        Return the jobs (see Renderer.render) of the catscan of grid M (at
+        time point t): frames with the color range [z, z + window] for z
+        from z_min to z_max, by default over the values of M (see
+        catscan_windows).
+        """
+        style = make_style(**(style or {}))
+        key = (filename, kind, int(t))
+        M = np.asarray(M)
+        if key in self.grids and not np.array_equal(self.grids.get(key), M):
+            self.frames.forget(key)  # another run under the same name
+        self.grids.put(key, M)
+        return [(key, lambda: self.grids.get(key), dict(style, vmin=z, vmax=z + window))
+                for z in catscan_windows(M, window, z_min, z_max)]
+
+
+    def write(self, frames, moviename, fps=5):
+        """
+        Stream frames (RGB arrays) into the movie moviename, writing each
+        frame as it comes: a .gif (see write_gif) or a .mp4 (with imageio,
+        which needs imageio-ffmpeg).
+        """
+        if moviename.endswith(".gif"):
+            from PIL import Image
+
+            # The fast octree palette is ~10x quicker than Pillow's default and
+            # loses nothing visible on colormapped frames
+            images = (Image.fromarray(frame).quantize(method=Image.Quantize.FASTOCTREE) for frame in frames)
+            with open(moviename, "wb") as file:
+                write_gif(file, images, fps)
+        else:
+            import imageio
+
+            with imageio.get_writer(moviename, mode="I", fps=fps) as writer:
+                for frame in frames:
+                    writer.append_data(frame)
+        return moviename
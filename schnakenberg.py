@@ -0,0 +1,194 @@
+"""Command line runner of the simulations
+
+    python schnakenberg.py run sim_1 --every 2000 --seed 1
+    python schnakenberg.py run fd_test --solver fd
+    python schnakenberg.py sweep sim_2 dr=1,10,100 --workers 4
+    python schnakenberg.py render sim_1 --every 2000 --fast
+    python schnakenberg.py bench --suite --sizes 64 128
+
+Parameters are read from Parameters/<name>.txt and results are written to
+Data/ and Gifs/, as by workflow.Simulation. The solver of run is the
+stochastic Simulation unless the parameter file (or --solver) says "fd"
+(the FitzHugh–Nagumo system of fd_main.py) or "ode" (the Schnakenberg ODE
+of ode_main.py).
+
+Only argparse is imported up front, each command imports what it uses, so
+headless runs never import matplotlib (only render and run --visualize do).
+"""
+
+import argparse
+
+
+# Defaults of the parameter files of the deterministic solvers, as in fd_main.py and ode_main.py
+FD_DEFAULTS = {"a": 2.8e-4, "b": 5e-3, "tau": .1, "k": -.005, "size": 100, "T": 10.0,
+               "method": "imex", "dt": None, "seed": None}
+ODE_DEFAULTS = {"t_max": 5.0, "y_init": [0, 1], "rates": [1, 1], "n_points": 1000}
+
+
+def run(arguments):
+    import workflow as wf
+
+    params = wf.get_params(arguments.name)
+    solver = arguments.solver or params.get("solver", "stochastic")
+    if solver == "fd":
+        return run_fd(arguments.name, {**FD_DEFAULTS, **params})
+    if solver == "ode":
+        return run_ode(arguments.name, {**ODE_DEFAULTS, **params})
+
+    for key in ("seed", "engine", "profile"):
+        if getattr(arguments, key) is not None:
+            params[key] = getattr(arguments, key)
+    simulation = wf.Simulation(arguments.name, every=arguments.every,
+                               checkpoint_every=arguments.checkpoint_every, params=params)
+    if arguments.no_store:
+        simulation.run_movie()
+        simulation.report()
+    else:
+        simulation.go()  # which reports the run
+
+    if arguments.visualize:
+        simulation.visualize(every=arguments.every or 2_000, fast=arguments.fast)
+
+
+def run_fd(name, params):
+    """Solve the FitzHugh–Nagumo system of fd_main.py, saving the final state to Data/<name>-fd.npz"""
+    import numpy as np
+    from kinetics import fitzhugh_nagumo
+
+    size = params["size"]
+    dx = 2. / size
+    D = (params["a"], params["b"] / params["tau"])
+    args = (params["k"], params["tau"])
+    rng = np.random.default_rng(params["seed"])
+    U, V = rng.random((size, size)), rng.random((size, size))
+
+    if params["method"] == "imex":
+        from spectral import SpectralSolver
+
+        solver = SpectralSolver(U.shape, dx, D, fitzhugh_nagumo, args=args, dt=params["dt"] or .02)
+    elif params["method"] == "explicit":
+        from finite_difference import ExplicitSolver
+
+        solver = ExplicitSolver((size - 2, size - 2), dx, D, fitzhugh_nagumo, args=args, dt=params["dt"] or .001)
+    else:
+        raise ValueError(f"unknown method {params['method']!r}, use 'imex' or 'explicit'")
+    solver.run(U, V, params["T"])
+    print(solver.stop)
+
+    np.savez_compressed("Data/" + name + "-fd.npz", U=U, V=V, t=solver.t)
+
+
+def run_ode(name, params):
+    """Solve the Schnakenberg ODE of ode_main.py, saving the solution to Data/<name>-ode.npz"""
+    import numpy as np
+    from ode_simulator import solve_schnakenberg
+
+    t_eval = np.linspace(0, params["t_max"], params["n_points"])
+    t, y = solve_schnakenberg(t_max=params["t_max"], y_init=params["y_init"], rates=params["rates"],
+                              t_eval=t_eval)
+    print({"A": float(y[0, -1]), "B": float(y[1, -1])})
+
+    np.savez_compressed("Data/" + name + "-ode.npz", t=t, A=y[0], B=y[1])
+
+
+def parse_range(text, method):
+    """Values of one sweep parameter: "1,10,100" for a grid, "low:high" for a Latin hypercube"""
+    import ast
+
+    if method == "lhs":
+        low, high = text.split(":")
+        return (ast.literal_eval(low), ast.literal_eval(high))
+    return [ast.literal_eval(value) for value in text.split(",")]
+
+
+def sweep(arguments):
+    import sweep
+
+    ranges = dict()
+    for item in arguments.ranges:
+        name, _, values = item.partition("=")
+        ranges[name] = parse_range(values, arguments.method)
+    study = sweep.Sweep(arguments.name, ranges, method=arguments.method, n_samples=arguments.samples,
+                        seed=arguments.seed, workers=arguments.workers, skip_non_turing=arguments.skip_non_turing)
+    study.go()
+
+
+def render(arguments):
+    import dataset
+    import vis
+
+    view = dataset.open_dataset(arguments.name).select(t_start=arguments.t_start, t_stop=arguments.t_stop,
+                                                       every=arguments.every)
+    # Color ranges of Simulation.visualize
+    for kind, window, max_value in (("X_A", 4, 1_000), ("X_B", 2, 500)):
+        vis.create_all_gifs(view[kind], arguments.name, kind, every=arguments.every, window=window,
+                            max_value=max_value, cmap=arguments.cmap, workers=arguments.workers,
+                            movie_format=arguments.format, fast=arguments.fast)
+
+
+def bench(arguments):
+    import benchmark
+
+    if arguments.suite:
+        results, regressions = benchmark.suite_main(arguments.sizes, arguments.baseline, arguments.tolerance)
+        return 1 if regressions else 0
+    benchmark.print_tables()
+
+
+def make_parser():
+    parser = argparse.ArgumentParser(prog="schnakenberg", description="Run, sweep, render and benchmark simulations")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("run", help="run the simulation of a parameter file")
+    command.add_argument("name", help="parameter file in Parameters/ (without .txt)")
+    command.add_argument("--solver", choices=("stochastic", "fd", "ode"),
+                         help="solver to use (default: the \"solver\" of the parameter file, or stochastic)")
+    command.add_argument("--every", type=int, help="stride of the snapshots in time points")
+    command.add_argument("--checkpoint-every", type=int, help="time points between checkpoints")
+    command.add_argument("--seed", type=int)
+    command.add_argument("--engine", choices=("tau", "adaptive", "nsm"))
+    command.add_argument("--profile", action="store_true", default=None, help="time the phases of the run")
+    command.add_argument("--no-store", action="store_true", help="keep the snapshots in memory only")
+    command.add_argument("--visualize", action="store_true", help="render the movies after the run")
+    command.add_argument("--fast", action="store_true", help="render with lookup tables instead of matplotlib")
+    command.set_defaults(function=run)
+
+    command = commands.add_parser("sweep", help="sweep a parameter file over a grid or Latin hypercube")
+    command.add_argument("name", help="parameter file in Parameters/ (without .txt)")
+    command.add_argument("ranges", nargs="+", metavar="NAME=VALUES",
+                         help="values of a parameter, e.g. dr=1,10,100 (or dr=1:100 with --method lhs)")
+    command.add_argument("--method", choices=("grid", "lhs"), default="grid")
+    command.add_argument("--samples", type=int, help="number of samples of --method lhs")
+    command.add_argument("--seed", type=int, default=0)
+    command.add_argument("--workers", type=int)
+    command.add_argument("--skip-non-turing", action="store_true", help="skip points which cannot form a pattern")
+    command.set_defaults(function=sweep)
+
+    command = commands.add_parser("render", help="render the movies of a saved run")
+    command.add_argument("name", help="name of the run in Data/")
+    command.add_argument("--every", type=int, default=2_000, help="stride of the frames in time points")
+    command.add_argument("--t-start", type=int)
+    command.add_argument("--t-stop", type=int)
+    command.add_argument("--cmap", default="viridis")
+    command.add_argument("--workers", type=int)
+    command.add_argument("--format", choices=("gif", "mp4"), default="gif")
+    command.add_argument("--fast", action="store_true", help="render with lookup tables instead of matplotlib")
+    command.set_defaults(function=render)
+
+    command = commands.add_parser("bench", help="benchmark the solvers")
+    command.add_argument("--suite", action="store_true", help="run the suite of standard problems instead of the tables")
+    command.add_argument("--sizes", type=int, nargs="+", default=[64, 128, 256])
+    command.add_argument("--baseline", help="commit to compare the suite with (default: the last results)")
+    command.add_argument("--tolerance", type=float, default=0.2)
+    command.set_defaults(function=bench)
+
+    return parser
+
+
+def main(argv=None):
+    arguments = make_parser().parse_args(argv)
+    return arguments.function(arguments) or 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,40 +1,50 @@
 import numpy as np
+import profiling
 
-def birth(tau, M, c):
+def birth(tau, M, c, rng=None):
     """
     Get the change in number of molecules to each cell of matrix M 
     by birth,
     the propensity in each cell is 
     c
+    
+    Random numbers are drawn from the generator rng (like all of the
+    helpers below), by default from the global np.random state.
     """
     
+    if rng is None:
+        rng = np.random
+    
     # Get the propensity 
     P = c
 
     # Get the change (positive cause of birth)
-    Z = np.random.poisson(lam=tau*P, size=M.shape)
+    Z = rng.poisson(lam=tau*P, size=M.shape)
     
     return Z
 
 
-def die(tau, M, c):
+def die(tau, M, c, rng=None):
     """
     Get the change in number of molecules to each cell of matrix M 
     by death,
     the propensity in cell i is
     c * M_i
     """
+    
+    if rng is None:
+        rng = np.random
 
     # Get the propensity
     P = c * M
 
     # Get the change (negative cause of death)
-    Z = -1 * np.random.poisson(lam=tau*P)
+    Z = -1 * rng.poisson(lam=tau*P)
     
     return Z
 
 
-def react(tau, M_A, M_B, c):
+def react(tau, M_A, M_B, c, rng=None):
     """
     Get the change in number of molecules to each cell of matrices
     M_A and M_B, respectively
@@ -44,12 +54,14 @@ def react(tau, M_A, M_B, c):
     c * M_A_i * (M_A_i - 1) * M_B_i
     """
     
+    if rng is None:
+        rng = np.random
 
     # Get the propensity
     P = c * M_A * (M_A - 1) * M_B
 
     # Get the change
-    Z = np.random.poisson(lam=tau*P)
+    Z = rng.poisson(lam=tau*P)
     
     # The change is plus one for A and minus one for B
     Z_A = 1 * Z
@@ -58,7 +70,7 @@ def react(tau, M_A, M_B, c):
     return Z_A, Z_B
 
 
-def diffuse(tau, M, d):
+def diffuse(tau, M, d, rng=None):
     """
     Get the change in number of molecules to each cell of matrix M 
     by diffusion in each of four directions,
@@ -66,11 +78,14 @@ def diffuse(tau, M, d):
     d * M_i
     """
     
+    if rng is None:
+        rng = np.random
+    
     # Get the matrix of propensity functions (for each cell)
     P  = d * M
     
     # Get the amount diffused in each of four directions
-    Ds = np.random.poisson(lam=tau*P, size=(4,) + M.shape)
+    Ds = rng.poisson(lam=tau*P, size=(4,) + M.shape)
     
     # Zero matrix (for calculating difference vector)
     Z = np.zeros(shape=M.shape, dtype=np.int16)
@@ -108,31 +123,106 @@ def diffuse(tau, M, d):
 # Initialization
 
 
-def initialize_movie(N_t, m, n, A_init, B_init):
+def initialize_movie(N_t, m, n, A_init, B_init, dtype=np.int16):
     """
     Initializes the 2D grid for a movie with N_t time points,
     m rows, and n columns. And with initial A and B set to
     A_init and B_init.
     
     Initializes the parameters with signed 16-bit integer, which
-    can go from -32_768 to 32_767.
+    can go from -32_768 to 32_767, unless another dtype is given
+    (see choose_dtype).
     """    
     
     # Initialize the grid of cells for A and B populations
     shape = (N_t, m, n)  # index by time, row, column
 
-    X_A = np.zeros(shape, dtype=np.int16)  # set A population at all times to zero
+    X_A = np.zeros(shape, dtype=dtype)  # set A population at all times to zero
     X_A[0] += A_init  # add initial A population for time zero
 
-    X_B = np.zeros(shape, dtype=np.int16)  # do the same as above for B...
+    X_B = np.zeros(shape, dtype=dtype)  # do the same as above for B...
     X_B[0] += B_init
 
     return X_A, X_B
 
 
+def choose_dtype(mu, beta, alpha, kappa, A_init, B_init, headroom=8):
+    """
+    Get the smallest integer type (uint8, uint16 or int32) which holds
+    headroom times the expected number of molecules in a cell.
+    
+    The expected numbers are the homogeneous steady state
+    A* = (mu + beta) / alpha and B* = beta / (kappa * A*^2)
+    (or the initial numbers, if larger). Patterns can peak well above
+    the steady state, the grids are promoted if they do outgrow the type.
+    """
+    
+    A_star = (mu + beta) / alpha if alpha > 0 else np.inf
+    B_star = beta / (kappa * A_star**2) if kappa > 0 and A_star > 0 else np.inf
+    high = headroom * max(A_star, B_star, A_init, B_init)
+    
+    for dtype in (np.uint8, np.uint16, np.int32):
+        if high <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def fit_dtype(dtype, low, high):
+    """
+    Get dtype if it holds all integers from low to high, and otherwise
+    the smallest integer type which holds both them and dtype.
+    """
+    
+    dtype = np.dtype(dtype)
+    info = np.iinfo(dtype)
+    if info.min <= low and high <= info.max:
+        return dtype
+    
+    return np.promote_types(dtype, np.promote_types(np.min_scalar_type(int(low)), np.min_scalar_type(int(high))))
+
+
+def snapshot_times(N_t, every=1, windows=None):
+    """
+    Get the time points (out of 0, ..., N_t - 1) at which a snapshot
+    of the grids is kept when recording a movie.
+    
+    Every "every"-th time point is kept, and if windows is given (a list
+    of (start, stop) pairs of time points) only those inside one of
+    the windows. The final time point is always kept.
+    """
+    
+    times = np.arange(0, N_t, every)
+    
+    # Only keep the time points inside at least one of the windows
+    if windows is not None:
+        keep = np.zeros(times.shape, dtype=bool)
+        for start, stop in windows:
+            keep |= (times >= start) & (times < stop)
+        times = times[keep]
+    
+    # Always keep the last time point (the final state)
+    if len(times) == 0 or times[-1] != N_t - 1:
+        times = np.append(times, N_t - 1)
+    
+    return times
+
+
+def promote(X, M):
+    """
+    Get X, converted to a larger integer type if the numbers in M do not
+    fit in its type (used to keep the recorded snapshots in the smallest
+    type which holds the grids).
+    """
+    
+    dtype = fit_dtype(X.dtype, M.min(), M.max())
+    if dtype != X.dtype:
+        X = X.astype(dtype)
+    return X
+
+
 # Calculation
 
-def calculate_picture(tau, M_A, M_B, mu, beta, alpha, kappa, d_A, d_B):
+def calculate_picture(tau, M_A, M_B, mu, beta, alpha, kappa, d_A, d_B, rng=None):
     """
     Calculate the number of molecules in each cell of the A and B grids
     for time t+1.
@@ -142,21 +232,21 @@ def calculate_picture(tau, M_A, M_B, mu, beta, alpha, kappa, d_A, d_B):
     """
     
     # Birth
-    Z_A_birth = birth(tau, M=M_A, c=mu)
-    Z_B_birth = birth(tau, M=M_B, c=beta)
+    Z_A_birth = birth(tau, M=M_A, c=mu, rng=rng)
+    Z_B_birth = birth(tau, M=M_B, c=beta, rng=rng)
 
 
     # Die
-    Z_A_death = die(tau, M=M_A, c=alpha)
+    Z_A_death = die(tau, M=M_A, c=alpha, rng=rng)
 
 
     # React
-    Z_A_react, Z_B_react = react(tau, M_A, M_B, c=kappa)
+    Z_A_react, Z_B_react = react(tau, M_A, M_B, c=kappa, rng=rng)
 
 
     # Diffuse
-    Z_A_diffusion = diffuse(tau, M=M_A, d=d_A)
-    Z_B_diffusion = diffuse(tau, M=M_B, d=d_B)
+    Z_A_diffusion = diffuse(tau, M=M_A, d=d_A, rng=rng)
+    Z_B_diffusion = diffuse(tau, M=M_B, d=d_B, rng=rng)
     
     
     # Calculate next grid
@@ -166,25 +256,176 @@ def calculate_picture(tau, M_A, M_B, mu, beta, alpha, kappa, d_A, d_B):
     return M_A_next, M_B_next
 
 
+class TauLeapKernel:
+    """
+    Fused version of calculate_picture, which updates the grids M_A and M_B
+    in place.
+    
+    All propensities are written into one preallocated (12, m, n) array
+    (birth of A and B, death of A, reaction and the four directions of
+    diffusion for A and for B) and the changes are drawn into another,
+    instead of allocating new arrays in every helper. numpy's Poisson
+    sampler has no out argument, so the only allocation left in a step is
+    the (m, n) int64 draw of each channel, copied into self.Z.
+    Diffusion out of the grid has zero propensity, rather than being 
+    drawn and thrown away as in diffuse.
+    
+    The grids can have extra leading axes (e.g. (R, m, n) for a stack of
+    replicates), the lattice is always the last two axes.
+    
+    The grids can have any integer type: before a step is applied in place
+    it is checked that the new numbers fit, and if they might not the
+    grids are promoted to a larger type (see fit_dtype).
+    
+    edges are the edges of the grid which nothing diffuses through. When
+    the grid is one tile of a larger lattice the other edges are open,
+    and the molecules leaving through them are in the last draw self.Z.
+    """
+    
+    def __init__(self, shape, tau, mu, beta, alpha, kappa, d_A, d_B, rng=None,
+                 edges=("bottom", "top", "right", "left")):
+        
+        if rng is None:
+            rng = np.random.default_rng()
+        
+        self.rng = rng
+        self.tau = tau
+        self.rates = {"alpha": alpha, "kappa": kappa, "d_A": d_A, "d_B": d_B}
+        self.edges = edges
+        
+        # Propensity times tau for each of the 12 channels
+        self.lam = np.zeros((12,) + tuple(shape))
+        self.lam[0] = tau * mu  # birth of A
+        self.lam[1] = tau * beta  # birth of B
+        
+        # Changes drawn for each channel in the last step
+        self.Z = np.zeros((12,) + tuple(shape), dtype=np.int64)
+        
+        # Timers of the parts of a step, set to Profiler.phase to profile them
+        self.phase = profiling.null_phase
+    
+    
+    def step(self, M_A, M_B):
+        """
+        Advance M_A and M_B by one time step of length tau, in place
+        (the grids are also returned, like calculate_picture, and are new
+        arrays if they had to be promoted to a larger type).
+        """
+        
+        tau, rates, lam, phase = self.tau, self.rates, self.lam, self.phase
+        
+        # Death, propensity alpha * M_A
+        with phase("die"):
+            np.multiply(M_A, tau * rates["alpha"], out=lam[2])
+        
+        # React, propensity kappa * M_A * (M_A - 1) * M_B
+        with phase("react"):
+            np.subtract(M_A, 1, out=lam[3], dtype=lam.dtype)
+            lam[3] *= M_A
+            lam[3] *= M_B
+            lam[3] *= tau * rates["kappa"]
+        
+        # Diffuse, propensity d * M in each of the four directions
+        with phase("diffuse"):
+            for M, d, i in ((M_A, rates["d_A"], 4), (M_B, rates["d_B"], 8)):
+                np.multiply(M, tau * d, out=lam[i])
+                lam[i+1:i+4] = lam[i]
+                if "bottom" in self.edges:
+                    lam[i][..., -1, :] = 0  # nothing goes down from the bottom row
+                if "top" in self.edges:
+                    lam[i+1][..., 0, :] = 0  # or up from the top row
+                if "right" in self.edges:
+                    lam[i+2][..., :, -1] = 0  # or right from the right column
+                if "left" in self.edges:
+                    lam[i+3][..., :, 0] = 0  # or left from the left column
+        
+        # All changes, drawn channel by channel into the preallocated self.Z
+        # (the same numbers as one draw of lam, which is in C order)
+        with phase("draw"):
+            Z = self.Z
+            for i in range(12):
+                Z[i] = self.rng.poisson(lam[i])
+        
+        # Bounds on the new numbers from the largest change in each channel
+        with phase("bounds"):
+            Z_max = Z.reshape(12, -1).max(axis=1)
+            low_A = M_A.min() - Z_max[2] - Z_max[4:8].sum()
+            high_A = M_A.max() + Z_max[0] + Z_max[3] + Z_max[4:8].sum()
+            low_B = M_B.min() - Z_max[3] - Z_max[8:12].sum()
+            high_B = M_B.max() + Z_max[1] + Z_max[8:12].sum()
+        
+        if (fit_dtype(M_A.dtype, low_A, high_A) == M_A.dtype and 
+                fit_dtype(M_B.dtype, low_B, high_B) == M_B.dtype):
+            with phase("apply"):
+                self.apply(M_A, M_B, Z)
+            return M_A, M_B
+        
+        # The bounds are loose, so check the exact result before promoting
+        M_A_next, M_B_next = M_A.astype(np.int64), M_B.astype(np.int64)
+        self.apply(M_A_next, M_B_next, Z)
+        M_A_next = M_A_next.astype(fit_dtype(M_A.dtype, M_A_next.min(), M_A_next.max()))
+        M_B_next = M_B_next.astype(fit_dtype(M_B.dtype, M_B_next.min(), M_B_next.max()))
+        
+        if M_A_next.dtype == M_A.dtype and M_B_next.dtype == M_B.dtype:
+            M_A[...], M_B[...] = M_A_next, M_B_next
+            return M_A, M_B
+        return M_A_next, M_B_next
+    
+    
+    @staticmethod
+    def apply(M_A, M_B, Z):
+        """
+        Add the changes Z (drawn for all 12 channels) to M_A and M_B in place,
+        which must have been checked to fit in their type.
+        """
+        
+        np.add(M_A, Z[0], out=M_A, casting="unsafe")
+        np.subtract(M_A, Z[2], out=M_A, casting="unsafe")
+        np.add(M_A, Z[3], out=M_A, casting="unsafe")
+        
+        np.add(M_B, Z[1], out=M_B, casting="unsafe")
+        np.subtract(M_B, Z[3], out=M_B, casting="unsafe")
+        
+        TauLeapKernel.move(M_A, Z[4:8])
+        TauLeapKernel.move(M_B, Z[8:12])
+    
+    
+    @staticmethod
+    def move(M, D):
+        """
+        Move the molecules D (down, up, right, left) to the neighbouring cells.
+        """
+        
+        for D_i in D:
+            np.subtract(M, D_i, out=M, casting="unsafe")
+        
+        for M_to, D_from in ((M[..., 1:, :], D[0][..., :-1, :]),  # down
+                             (M[..., :-1, :], D[1][..., 1:, :]),  # up
+                             (M[..., :, 1:], D[2][..., :, :-1]),  # right
+                             (M[..., :, :-1], D[3][..., :, 1:])):  # left
+            np.add(M_to, D_from, out=M_to, casting="unsafe")
+
+
 # Miscillaneous initialization if we don't care about the movie and only the final timepoint
 
-def initialize_picture(m, n, A_init, B_init):
+def initialize_picture(m, n, A_init, B_init, dtype=np.int16):
     """
     Initializes the 2D grid for a picture with,
     m rows, and n columns. And with initial A and B set to
     A_init and B_init.
     
     Initializes the parameters with signed 16-bit integer, which
-    can go from -32_768 to 32_767.
+    can go from -32_768 to 32_767, unless another dtype is given
+    (see choose_dtype).
     """    
     
     # Initialize the grid of cells for A and B populations
     shape = (m, n)  # index by row, column
 
-    X_A = np.zeros(shape, dtype=np.int16)  # set A population to zero
+    X_A = np.zeros(shape, dtype=dtype)  # set A population to zero
     X_A += A_init  # add initial A population for time zero
 
-    X_B = np.zeros(shape, dtype=np.int16)  # do the same as above for B...
+    X_B = np.zeros(shape, dtype=dtype)  # do the same as above for B...
     X_B += B_init
 
     return X_A, X_B
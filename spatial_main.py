@@ -1,48 +1,48 @@
 """Runs simulation of time and spatially dependant ODE model"""
 
-from fipy import Grid1D, CellVariable, TransientTerm, DiffusionTerm, Viewer
-from gif_creator import create_gif
-from builtins import range
-
-h = 1
-
-D_A, D_B = 1e-5/(2*h**2), 1e-3/(2*h**2)
-alpha = 0.02
-beta = 192000 * h**3
-mu = 64000 * h**3
-kappa = 2.44e-16 * h**-6
-A_0, B_0 = 12800000, 4882812.5 # Should be defined as floats
-
-nx = 100
-dx = 1.1
-
-time_step = 0.2
-step_num, plot_num = 100, 20  # Plot num should be less than step num
-delete_images = True  # Boolean to delete images after running
-
-m = Grid1D(dx=dx, nx=nx)
-
-v0 = CellVariable(name = "Concentration of A", mesh=m, hasOld=True, value=A_0)
-v1 = CellVariable(name = "Concentration of B", mesh=m, hasOld=True, value=B_0)
-
-eqn0 = TransientTerm(var=v0) == mu - alpha * v0 + kappa * v0**2 * v1 + DiffusionTerm(D_A, var=v0) 
-eqn1 = TransientTerm(var=v1) == beta - kappa * v0**2 * v1 +  DiffusionTerm(D_B, var=v1)
-
-eqn = eqn0 & eqn1
-
-vi = Viewer((v0, v1), datamin=0, datamax= 1.1*A_0)
-vi.axes.set_xlabel('x position (mm)')
-vi.axes.set_ylabel('Concentration')
-
-plotting_steps  = range(0, step_num, int(step_num/plot_num))
-for step in range(step_num):
-    v0.updateOld()
-    v1.updateOld()
-    eqn.solve(dt=time_step)
-    if step in plotting_steps:
-        vi.plot(f"Images/Spatial_ODE/Line1D_{step:04d}.png")
-        for txt in vi.axes.texts:
-            txt.set_visible(False)
-        vi.axes.text(0.7 * dx * nx, 0.9 * A_0, f'Time = {step * time_step:.2f} s')
-        
-create_gif("Images/Spatial_ODE/Line1D", delete_images)
\ No newline at end of file
+import numpy as np
+from mol_solver import MOLSolver
+
+
+if __name__ == "__main__":
+    # Plotting is only imported when the script is run
+    import matplotlib.pyplot as plt
+    from gif_creator import create_gif
+
+    h = 1
+
+    D_A, D_B = 1e-5/(2*h**2), 1e-3/(2*h**2)
+    alpha = 0.02
+    beta = 192000 * h**3
+    mu = 64000 * h**3
+    kappa = 2.44e-16 * h**-6
+    A_0, B_0 = 12800000, 4882812.5
+
+    nx = 100
+    dx = 1.1
+
+    t_max = 20.0
+    plot_num = 20
+    monitor = None  # e.g. convergence.ConvergenceMonitor(stride=5.0, tolerance=1e-4) stops once A is stationary
+    delete_images = True  # Boolean to delete images after running
+
+    solver = MOLSolver((nx,), dx, (D_A, D_B), mu, beta, alpha, kappa)
+    plot_times = np.linspace(0, t_max, plot_num, endpoint=False)
+    times, A, B = solver.solve(t_max, A_0, B_0, t_eval=plot_times, monitor=monitor)
+    print(solver.stop)
+
+    x = dx * (np.arange(nx) + 0.5)  # cell centres
+    fig, ax = plt.subplots()
+    for step, t in enumerate(times):
+        ax.clear()
+        ax.plot(x, A[step], label="Concentration of A")
+        ax.plot(x, B[step], label="Concentration of B")
+        ax.set_ylim(0, 1.1*A_0)
+        ax.set_xlabel('x position (mm)')
+        ax.set_ylabel('Concentration')
+        ax.legend(loc='lower right')
+        ax.text(0.7 * dx * nx, 0.9 * A_0, f'Time = {t:.2f} s')
+        fig.savefig(f"Images/Spatial_ODE/Line1D_{step:04d}.png")
+    plt.close(fig)
+
+    create_gif("Images/Spatial_ODE/Line1D", delete_images)
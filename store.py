@@ -0,0 +1,247 @@
+import sim
+import numpy as np
+import os
+import ast
+
+
+class TrajectoryStore:
+    """
+    Chunked, compressed and append-only store for the snapshots of a
+    simulation, kept in a directory with the following files:
+    * params.txt - the parameter dictionary (readable with ast.literal_eval)
+    * metadata.txt - a dictionary of facts about the run, such as why and
+      when it stopped (see TrajectoryStore.update_metadata)
+    * index.txt - one line per chunk: "<chunk file> <first snapshot> <stop snapshot>"
+    * chunk-000000.npz, ... - compressed chunks holding X_A, X_B and times
+
+    Snapshots are buffered and written as a chunk of chunk_size snapshots
+    as soon as the buffer is full, so a crashed run keeps everything up to
+    its last chunk. Chunks are only read (and decompressed) when a snapshot
+    inside them is asked for.
+
+    mode is "w" to create a new store (removing the chunks of an old one),
+    "a" to append to an existing store and "r" to only read from it.
+    """
+
+    kinds = ("X_A", "X_B")
+
+    def __init__(self, path, mode="r", params=None, chunk_size=100):
+
+        self.path = path
+        self.mode = mode
+        self.chunk_size = chunk_size
+
+        if mode == "w":
+            os.makedirs(path, exist_ok=True)
+            for file in os.listdir(path):
+                if file.startswith("chunk-") or file in ("index.txt", "metadata.txt"):
+                    os.remove(os.path.join(path, file))
+            open(os.path.join(path, "index.txt"), "w").close()
+            self.params = params
+            with open(os.path.join(path, "params.txt"), "w") as file:
+                file.write(repr(params))
+        else:
+            self.params = ast.literal_eval(open(os.path.join(path, "params.txt"), "r").read())
+
+        # Read the chunks which are already on disk
+        self.chunks = list()  # (file, start, stop) for each chunk
+        for line in open(os.path.join(path, "index.txt"), "r").read().splitlines():
+            file, start, stop = line.split()
+            self.chunks.append((file, int(start), int(stop)))
+
+        # Times of all snapshots on disk (only the small times array of each chunk is read)
+        self._times = [np.load(os.path.join(path, file))["times"] for file, _, _ in self.chunks]
+
+        self._buffer = None  # snapshots which are not yet written to a chunk
+        self._buffer_times = list()
+        self._cache = (None, None)  # last chunk read, as (file, loaded chunk)
+
+
+    def __len__(self):
+        return self.n_flushed + len(self._buffer_times)
+
+
+    def __getitem__(self, kind):
+        return SpeciesView(self, kind)
+
+
+    @property
+    def n_flushed(self):
+        return self.chunks[-1][2] if self.chunks else 0
+
+
+    @property
+    def times(self):
+        return np.concatenate(self._times + [np.array(self._buffer_times, dtype=int)])
+
+
+    @property
+    def shape(self):
+        M = self.read("X_A", 0)
+        return (len(self),) + M.shape
+
+
+    def append(self, t, M_A, M_B):
+        """
+        Add the snapshot M_A, M_B at time point t to the end of the store,
+        writing a new chunk when the buffer is full.
+
+        Snapshots are stored in the type of the grids, and the buffer is
+        promoted to a larger type if a snapshot does not fit in it.
+        """
+
+        if self._buffer is None:
+            shape = (self.chunk_size,) + M_A.shape
+            self._buffer = {"X_A": np.zeros(shape, dtype=M_A.dtype),
+                            "X_B": np.zeros(shape, dtype=M_B.dtype)}
+        self._buffer["X_A"] = sim.promote(self._buffer["X_A"], M_A)
+        self._buffer["X_B"] = sim.promote(self._buffer["X_B"], M_B)
+
+        i = len(self._buffer_times)
+        self._buffer["X_A"][i] = M_A
+        self._buffer["X_B"][i] = M_B
+        self._buffer_times.append(int(t))
+
+        if len(self._buffer_times) == self.chunk_size:
+            self.flush()
+
+
+    @property
+    def metadata(self):
+        filepath = os.path.join(self.path, "metadata.txt")
+        if not os.path.exists(filepath):
+            return dict()
+        return ast.literal_eval(open(filepath, "r").read())
+
+
+    def update_metadata(self, items):
+        """
+        Add the entries of the dictionary items (of Python literals) to
+        metadata.txt, replacing those which are already there.
+        """
+
+        metadata = self.metadata
+        metadata.update(items)
+        filepath = os.path.join(self.path, "metadata.txt")
+        with open(filepath + ".tmp", "w") as f:
+            f.write(repr(metadata))
+        os.replace(filepath + ".tmp", filepath)
+
+
+    def flush(self):
+        """
+        Write the buffered snapshots to disk as one compressed chunk.
+        """
+
+        N = len(self._buffer_times)
+        if N == 0:
+            return
+
+        start = self.n_flushed
+        file = f"chunk-{len(self.chunks):06d}.npz"
+        filepath = os.path.join(self.path, file)
+        times = np.array(self._buffer_times, dtype=int)
+
+        # Write to a temporary file first so a crash never leaves half a chunk
+        with open(filepath + ".tmp", "wb") as f:
+            np.savez_compressed(f, X_A=self._buffer["X_A"][:N], X_B=self._buffer["X_B"][:N], times=times)
+        os.replace(filepath + ".tmp", filepath)
+
+        with open(os.path.join(self.path, "index.txt"), "a") as f:
+            f.write(f"{file} {start} {start + N}\n")
+
+        self.chunks.append((file, start, start + N))
+        self._times.append(times)
+        self._buffer_times = list()
+
+
+    def close(self):
+        if self.mode != "r":
+            self.flush()
+
+
+    def truncate(self, N):
+        """
+        Drop the chunks after the first N snapshots (when resuming a run
+        from a checkpoint, which always ends on a chunk boundary).
+        """
+
+        self._buffer_times = list()
+        while self.chunks and self.chunks[-1][1] >= N:
+            file, _, _ = self.chunks.pop()
+            self._times.pop()
+            os.remove(os.path.join(self.path, file))
+
+        if self.n_flushed != N:
+            raise ValueError(f"the store does not have a chunk boundary at snapshot {N}")
+
+        with open(os.path.join(self.path, "index.txt"), "w") as f:
+            for file, start, stop in self.chunks:
+                f.write(f"{file} {start} {stop}\n")
+        self._cache = (None, None)
+
+
+    def read(self, kind, i):
+        """
+        Get snapshot i of species kind ("X_A" or "X_B"), only loading
+        the chunk it is in.
+        """
+
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(f"snapshot {i} is out of range for a store of length {len(self)}")
+
+        if i >= self.n_flushed:
+            return self._buffer[kind][i - self.n_flushed].copy()
+
+        for file, start, stop in self.chunks:
+            if start <= i < stop:
+                break
+
+        cached_file, chunk = self._cache
+        if cached_file != file:
+            chunk = dict(np.load(os.path.join(self.path, file)))
+            self._cache = (file, chunk)
+
+        return chunk[kind][i - start]
+
+
+
+class SpeciesView:
+    """
+    Lazy view of one species in a TrajectoryStore, which can be indexed
+    like the movie arrays X_A and X_B (X[i], X[start:stop:step], X[-1])
+    without loading the full trajectory.
+    """
+
+    def __init__(self, store, kind):
+        self.store = store
+        self.kind = kind
+
+
+    def __len__(self):
+        return len(self.store)
+
+
+    @property
+    def shape(self):
+        return self.store.shape
+
+
+    def __getitem__(self, index):
+
+        if isinstance(index, tuple):
+            # Index the time axis lazily and the rest of the axes afterwards
+            index, rest = index[0], index[1:]
+            if isinstance(index, slice) or np.ndim(index) == 1:
+                rest = (slice(None),) + rest
+            return self[index][rest]
+
+        if isinstance(index, slice):
+            return np.array([self.store.read(self.kind, i) for i in range(*index.indices(len(self)))])
+
+        if np.ndim(index) == 1:
+            return np.array([self.store.read(self.kind, i) for i in index])
+
+        return self.store.read(self.kind, int(index))
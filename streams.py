@@ -0,0 +1,97 @@
+"""Reproducible random number streams for the stochastic engines
+
+Every stream is derived from (seed, replicate, tile) and optionally the
+time step, so the random numbers of any replicate, tile of the lattice
+or single step can be regenerated on their own.
+"""
+
+import numpy as np
+
+
+BIT_GENERATORS = {"PCG64": np.random.PCG64,
+                  "PCG64DXSM": np.random.PCG64DXSM,
+                  "Philox": np.random.Philox,
+                  "SFC64": np.random.SFC64,
+                  "MT19937": np.random.MT19937}
+
+
+def resolve_seed(seed=None):
+    """Return seed, or fresh entropy from the operating system if it is None
+
+    A run without a seed draws its entropy once, here, and keeps it as its
+    seed, so every stream of the run comes from the same root and the run
+    can be repeated from the seed saved with it.
+    """
+    if seed is None:
+        return np.random.SeedSequence().entropy
+    return seed
+
+
+def seed_sequence(seed=None, replicate=0, tile=0, step=None):
+    """Return the np.random.SeedSequence of the stream (seed, replicate, tile, step)
+
+    Params:
+    seed [int or SeedSequence] - Root seed (a SeedSequence, e.g. spawned by
+                                 a sweep, is extended by the other keys)
+    replicate [int] - Index of the replicate
+    tile [int] - Index of the tile of the lattice
+    step [int] - Index of the time step (default None, one stream for all steps)
+    """
+    if isinstance(seed, np.random.SeedSequence):
+        entropy, spawn_key = seed.entropy, tuple(seed.spawn_key)
+    else:
+        entropy, spawn_key = seed, ()
+
+    spawn_key += (replicate, tile)
+    if step is not None:
+        spawn_key += (step,)
+
+    return np.random.SeedSequence(entropy, spawn_key=spawn_key)
+
+
+def make_generator(seed=None, bit_generator="PCG64", replicate=0, tile=0, step=None):
+    """Return a np.random.Generator for the stream (seed, replicate, tile, step)
+
+    Params:
+    bit_generator [string] - Name of the bit generator, one of BIT_GENERATORS
+    (the others are as for seed_sequence)
+    """
+    if bit_generator not in BIT_GENERATORS:
+        raise ValueError(f"unknown bit generator {bit_generator!r}, use one of {list(BIT_GENERATORS)}")
+
+    return np.random.Generator(BIT_GENERATORS[bit_generator](seed_sequence(seed, replicate, tile, step)))
+
+
+class StepStreams:
+    """
+    Independent random number stream for every time step of one replicate
+    and tile, so any step can be regenerated without running the steps
+    before it.
+
+    With the counter-based Philox bit generator the step is put in the
+    counter (a new stream costs nothing but setting the counter), for the
+    other bit generators the step is part of the seed sequence.
+
+    Without a seed the entropy is drawn once (see resolve_seed) and kept
+    in self.seed, so all steps belong to the same run.
+    """
+
+    def __init__(self, seed=None, bit_generator="Philox", replicate=0, tile=0):
+
+        self.seed = seed = resolve_seed(seed)
+        self.bit_generator = bit_generator
+        self.replicate = replicate
+        self.tile = tile
+
+        if bit_generator == "Philox":
+            self.key = seed_sequence(seed, replicate, tile).generate_state(2, np.uint64)
+
+
+    def generator(self, step):
+        """Return the np.random.Generator of time step step"""
+
+        if self.bit_generator == "Philox":
+            # Each step starts at its own block of 2**128 counter values
+            return np.random.Generator(np.random.Philox(key=self.key, counter=[0, 0, step, 0]))
+
+        return make_generator(self.seed, self.bit_generator, self.replicate, self.tile, step)
@@ -0,0 +1,230 @@
+import workflow as wf
+import analysis
+import turing
+import numpy as np
+import os
+import csv
+import itertools
+import hashlib
+import tempfile
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+
+def grid_points(ranges):
+    """
+    Return a list of parameter dictionaries, one for each point of the grid
+    spanned by ranges, a dictionary of parameter name -> list of values.
+    """
+    names = list(ranges)
+    return [dict(zip(names, values)) for values in itertools.product(*(ranges[name] for name in names))]
+
+
+def latin_hypercube(ranges, n_samples, seed=None):
+    """
+    Return a list of n_samples parameter dictionaries from a Latin hypercube
+    over ranges, a dictionary of parameter name -> (low, high).
+    """
+    from scipy.stats import qmc
+
+    names = list(ranges)
+    sampler = qmc.LatinHypercube(d=len(names), seed=seed)
+    samples = qmc.scale(sampler.random(n_samples),
+                        [ranges[name][0] for name in names],
+                        [ranges[name][1] for name in names])
+    return [{name: float(value) for name, value in zip(names, sample)} for sample in samples]
+
+
+def run_id(overrides, base=None):
+    """
+    Name of the run with parameters overrides of the base parameters (the
+    dictionary of the parameter file), the same on every restart but
+    different for sweeps of different parameter files.
+    """
+    key = repr((sorted((base or dict()).items()), sorted(overrides.items())))
+    return "run-" + hashlib.sha1(key.encode()).hexdigest()[:12]
+
+
+def run_one(filename, overrides, seed, every=None):
+    """
+    Run one configuration of a sweep (in a worker process) and return
+    its summary: the final spatial mean, variance, dominant wavelength and
+    number of spots of A and B, and the runtime. With an "analysis" entry
+    in the parameters the time series of the metrics of the run are also
+    kept, in Data/<run id>-analysis.npz (see analysis.PatternRecorder).
+    """
+    base = wf.get_params(filename)
+    params = {**base, **overrides}
+    params['seed'] = seed
+    # Only the final state is needed for the summary
+    params['every'] = every or params['N_t']
+
+    simulation = wf.Simulation(run_id(overrides, base), params=params)
+    simulation.run_movie()
+
+    summary = {"runtime": simulation.runtime}
+    for X, kind in ((simulation.X_A, "A"), (simulation.X_B, "B")):
+        M = X[-1]
+        summary["mean_" + kind] = M.mean()
+        summary["var_" + kind] = M.var()
+        summary["wavelength_" + kind] = analysis.dominant_wavelength(M)
+        summary["spots_" + kind] = analysis.count_spots(M)
+    return summary
+
+
+class Sweep:
+    """
+    Runs a parameter file over a grid or Latin hypercube of parameter
+    values on a local process pool, collecting the summaries of all runs
+    in Data/sweeps/<name>/results.csv
+
+    Requires the following libraries:
+    * workflow as wf
+    * numpy as np
+    * concurrent.futures
+
+    """
+
+
+    def __init__(self, filename, ranges, method="grid", n_samples=None, seed=0, workers=None, name=None,
+                 skip_non_turing=False):
+
+        """
+        filename is the base parameter file in Parameters/
+        ranges is a dictionary of parameter name -> list of values for
+        method="grid", or parameter name -> (low, high) for method="lhs"
+        (with n_samples samples)
+        seed is the root of the (independent) random number streams of the
+        runs, which are spawned from it with np.random.SeedSequence
+        workers is the number of worker processes (default: all cores)
+        skip_non_turing skips the configurations which the Turing analysis
+        (see turing.py) predicts cannot form a pattern, and adds the
+        prediction of each configuration to the results
+        """
+
+        self.filename = filename
+        self.base = wf.get_params(filename)
+        self.name = name or filename + "-sweep"
+        self.workers = workers
+        self.seed = seed
+        self.skip_non_turing = skip_non_turing
+
+        if method == "grid":
+            self.points = grid_points(ranges)
+        elif method == "lhs":
+            self.points = latin_hypercube(ranges, n_samples, seed=seed)
+        else:
+            raise ValueError(f"unknown sweep method {method!r}, use 'grid' or 'lhs'")
+
+        self.path = "Data/sweeps/" + self.name + "/"
+        os.makedirs(self.path + "runs/", exist_ok=True)
+        self._turing = None
+
+
+    @property
+    def turing(self):
+        """
+        Turing analysis of every configuration (see turing.TuringIndex.lookup),
+        done for the whole sweep at once the first time it is needed.
+        """
+        if self._turing is None:
+            params = [wf.Simulation(self.filename, params={**self.base, **overrides}).params
+                      for overrides in self.points]
+            self._turing = turing.TuringIndex().lookup(params)
+        return self._turing
+
+
+    def go(self):
+        self.run()
+        self.save_results()
+        self.report()
+
+
+    def run(self):
+        """
+        Run every configuration which has no result in the sweep directory
+        yet, so an interrupted sweep only runs what is missing on restart.
+        Runs which raise an error are recorded as failed (and retried on
+        restart) without stopping the others.
+        """
+        seeds = np.random.SeedSequence(self.seed).spawn(len(self.points))
+        self.failures = dict()
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            futures = dict()
+            for i, (overrides, seed) in enumerate(zip(self.points, seeds)):
+                if os.path.exists(self.result_path(overrides)):
+                    continue
+                if self.skip_non_turing and not self.turing["turing"][i]:
+                    continue
+                future = executor.submit(run_one, self.filename, overrides, seed)
+                futures[future] = overrides
+
+            for future in as_completed(futures):
+                overrides = futures[future]
+                try:
+                    summary = future.result()
+                except Exception:
+                    self.failures[run_id(overrides, self.base)] = traceback.format_exc()
+                    print(f"{run_id(overrides, self.base)} failed: {overrides}")
+                    continue
+                self.save_result(overrides, summary)
+                print(f"{run_id(overrides, self.base)} done: {overrides}")
+
+
+    def result_path(self, overrides):
+        return self.path + "runs/" + run_id(overrides, self.base) + ".txt"
+
+
+    def save_result(self, overrides, summary):
+        result = {key: float(value) for key, value in summary.items()}
+        # Write to a temporary file of its own first so a result is either complete or missing
+        filepath = self.result_path(overrides)
+        with tempfile.NamedTemporaryFile("w", dir=os.path.dirname(filepath), suffix=".tmp", delete=False) as file:
+            file.write(repr(result))
+        os.replace(file.name, filepath)
+
+
+    def load_results(self):
+        """Return one row (dictionary) per configuration, with its status"""
+        import ast
+
+        rows = list()
+        for i, overrides in enumerate(self.points):
+            row = {"run_id": run_id(overrides, self.base), **overrides}
+            if self.skip_non_turing:
+                row["turing"] = bool(self.turing["turing"][i])
+                row["predicted_wavelength"] = float(self.turing["wavelength"][i])
+            if os.path.exists(self.result_path(overrides)):
+                row["status"] = "done"
+                row.update(ast.literal_eval(open(self.result_path(overrides), "r").read()))
+            elif self.skip_non_turing and not row["turing"]:
+                row["status"] = "non-turing"
+            else:
+                row["status"] = "failed" if row["run_id"] in getattr(self, "failures", {}) else "missing"
+            rows.append(row)
+        return rows
+
+
+    def save_results(self):
+        self.results = self.load_results()
+
+        fieldnames = list()
+        for row in self.results:
+            fieldnames += [key for key in row if key not in fieldnames]
+
+        with open(self.path + "results.csv", "w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(self.results)
+
+
+    def report(self):
+        statuses = [row["status"] for row in self.results]
+        print()
+        print('\nSweep:')
+        print(self.name)
+        print('\nRuns:')
+        print({status: statuses.count(status) for status in sorted(set(statuses))})
+        print('\nResults:')
+        print(self.path + "results.csv")
@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+# The modules of the repository are imported as top-level modules (import sim, import workflow, ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run in an empty directory with the Data/ and Parameters/ folders the simulations write to"""
+    for folder in ("Data", "Parameters", "Gifs", "Pictures"):
+        (tmp_path / folder).mkdir()
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def params():
+    """Parameters of a small, short stochastic run (the rates of Parameters/sim_2.txt)"""
+    return {"h": 0.025, "m": 12, "n": 10,
+            "mu": 1, "beta": 3, "alpha": 0.02, "kappa": 1e-6,
+            "A_init": 200, "B_init": 75,
+            "tau": 0.002, "N_t": 301, "dr": 100, "d_A": 0.02,
+            "seed": 1}
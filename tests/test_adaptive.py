@@ -0,0 +1,51 @@
+import numpy as np
+
+import adaptive
+import workflow
+
+
+RATES = {"mu": 1, "beta": 3, "alpha": 0.02, "kappa": 1e-6, "d_A": 0.02, "d_B": 2.0}
+
+
+def final_grids(engine, params, seeds):
+    grids = list()
+    for seed in seeds:
+        simulation = workflow.Simulation("run", params=dict(params, engine=engine, seed=seed, every=params["N_t"]))
+        simulation.run_movie()
+        grids.append((simulation.X_A[-1], simulation.X_B[-1], simulation))
+    return grids
+
+
+def test_adaptive_engine_agrees_with_fixed_tau(workdir, params):
+    params = dict(params, m=10, n=10, N_t=501)
+    fixed = final_grids("tau", params, range(4))
+    leaped = final_grids("adaptive", params, range(4))
+
+    for i, name in ((0, "A"), (1, "B")):
+        mean_fixed = np.mean([grids[i].mean() for grids in fixed])
+        mean_leaped = np.mean([grids[i].mean() for grids in leaped])
+        var_fixed = np.mean([grids[i].var() for grids in fixed])
+        var_leaped = np.mean([grids[i].var() for grids in leaped])
+        assert abs(mean_leaped - mean_fixed) < 2, name
+        assert 0.7 < var_leaped / var_fixed < 1.4, name
+
+    # The default error control takes about as many steps as the fixed tau
+    steps = np.mean([len(simulation.taus) for _, _, simulation in leaped])
+    assert 300 < steps < 800
+    assert all(np.isclose(simulation.taus.sum(), 500 * params["tau"]) for _, _, simulation in leaped)
+
+
+def test_adaptive_step_keeps_the_grid_type():
+    kernel = adaptive.AdaptiveTauLeapKernel((6, 6), **RATES, rng=np.random.default_rng(0))
+    M_A, M_B = np.full((6, 6), 200, dtype=np.uint8), np.full((6, 6), 75, dtype=np.uint8)
+    for _ in range(20):
+        M_A, M_B = kernel.step(M_A, M_B, tau_max=0.01)
+    assert M_A.dtype == np.uint8 and M_B.dtype == np.uint8
+
+
+def test_adaptive_step_promotes_grids_which_outgrow_their_type():
+    kernel = adaptive.AdaptiveTauLeapKernel((4, 4), **dict(RATES, mu=5_000), rng=np.random.default_rng(0))
+    M_A, M_B = np.full((4, 4), 250, dtype=np.uint8), np.full((4, 4), 75, dtype=np.uint8)
+    while M_A.max() <= 255:
+        M_A, M_B = kernel.step(M_A, M_B)
+    assert M_A.dtype == np.uint16
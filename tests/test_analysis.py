@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+import analysis
+
+
+def stripes(period, size=64):
+    """Vertical stripes of the given period (in cells), never exactly at the mean"""
+    x = np.arange(size) + 0.5
+    return np.tile(100 + 50 * np.sin(2 * np.pi * x / period), (size, 1))
+
+
+def test_metrics_of_stripes():
+    M = stripes(8)
+
+    assert analysis.dominant_wavelength(M) == pytest.approx(8.0)
+    assert analysis.dominant_wavelength(M.T) == pytest.approx(8.0)
+    assert analysis.count_spots(M) == 8
+
+    k, power = analysis.radial_spectrum(M, n_bins=32)
+    width = 0.5 / 32
+    assert k[np.argmax(power)] - width / 2 <= 0.125 < k[np.argmax(power)] + width / 2
+
+
+def test_uniform_grid_has_no_pattern():
+    M = np.full((64, 64), 100.0)
+
+    assert np.isnan(analysis.dominant_wavelength(M))
+    assert analysis.count_spots(M) == 0
+    assert not analysis.radial_spectrum(M)[1].any()
+
+
+def test_one_value_per_grid_of_a_stack():
+    M = np.stack([stripes(8), stripes(16), np.full((64, 64), 100.0)])
+
+    wavelengths = analysis.dominant_wavelength(M)
+    assert wavelengths.shape == (3,)
+    np.testing.assert_allclose(wavelengths, [8.0, 16.0, np.nan])
+    np.testing.assert_array_equal(analysis.count_spots(M), [8, 4, 0])
+    assert analysis.count_spots(M.reshape(3, 1, 64, 64)).shape == (3, 1)
+
+
+def test_smoothing_merges_noisy_spots():
+    rng = np.random.default_rng(0)
+    M = stripes(16) + rng.normal(0, 20, (64, 64))
+
+    assert analysis.count_spots(M) > 4
+    assert analysis.count_spots(M, smooth=2) == 4
+
+
+def test_recorder_round_trip(workdir):
+    recorder = analysis.PatternRecorder.from_params({"stride": 10, "n_bins": 16})
+    assert analysis.PatternRecorder.from_params(None) is None
+
+    for t, period in ((0, 8), (10, 16)):
+        assert recorder.due(t)
+        recorder.record(np.int64(t), stripes(period), np.full((64, 64), 3.0))
+        assert not recorder.due(t + 5)
+    assert recorder.summary()["wavelength_A"] == pytest.approx(16.0)
+
+    recorder.save("Data/run-analysis.npz")
+    series = analysis.load_series("Data/run-analysis.npz")
+    assert set(series) == set(recorder.series())
+    np.testing.assert_array_equal(series["t"], [0, 10])
+    np.testing.assert_allclose(series["wavelength_A"], [8.0, 16.0])
+    np.testing.assert_array_equal(series["spots_A"], [8, 4])
+    assert np.isnan(series["wavelength_B"]).all()
+    assert series["spectrum_A"].shape == (2, 16)
+    np.testing.assert_allclose(series["k"], (np.arange(16) + 0.5) / 32)
@@ -0,0 +1,38 @@
+import os
+
+import benchmark
+
+
+def suite(commit, **cases):
+    return {"commit": commit, "results": {name: dict(zip(("throughput", "peak_mb", "error"), values))
+                                          for name, values in cases.items()}}
+
+
+def test_compare_suite_flags_regressions_beyond_tolerance():
+    baseline = suite("old", slower=(100.0, 50.0, 1e-3), fatter=(100.0, 50.0, 1e-3), worse=(100.0, 50.0, 1e-3),
+                     within=(100.0, 50.0, 1e-3), exact=(100.0, 50.0, None))
+    results = suite("new", slower=(70.0, 50.0, 1e-3), fatter=(100.0, 80.0, 1e-3), worse=(100.0, 50.0, 2e-3),
+                    within=(85.0, 59.0, 1.1e-3), exact=(100.0, 50.0, 1e-4), new_case=(1.0, 1e4, 1.0))
+
+    regressions = benchmark.compare_suite(results, baseline, tolerance=0.2)
+    assert len(regressions) == 3
+    assert regressions[0].startswith("slower: throughput")
+    assert regressions[1].startswith("fatter: peak memory")
+    assert regressions[2].startswith("worse: error")
+
+    # Everything is within a larger tolerance
+    assert benchmark.compare_suite(results, baseline, tolerance=1.5) == []
+
+
+def test_load_suite_picks_the_previous_results(tmp_path):
+    path = str(tmp_path)
+    assert benchmark.load_suite(path=path) is None
+    for age, commit in ((300, "older"), (200, "previous"), (100, "current")):
+        filepath = benchmark.save_suite(suite(commit, case=(1.0, 1.0, None)), path=path)
+        assert filepath == os.path.join(path, commit + ".json")
+        mtime = os.path.getmtime(filepath) - age
+        os.utime(filepath, (mtime, mtime))
+
+    assert benchmark.load_suite(path=path)["commit"] == "current"
+    assert benchmark.load_suite(path=path, exclude="current")["commit"] == "previous"
+    assert benchmark.load_suite("older", path=path) == suite("older", case=(1.0, 1.0, None))
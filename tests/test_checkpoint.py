@@ -0,0 +1,78 @@
+import pickle
+
+import numpy as np
+import pytest
+
+import workflow
+
+
+class Interrupt(Exception):
+    pass
+
+
+def interrupt_after_checkpoint(simulation):
+    """Make the run of simulation stop right after writing its first checkpoint"""
+    save_checkpoint = simulation.save_checkpoint
+
+    def save_and_stop(*args, **kwargs):
+        save_checkpoint(*args, **kwargs)
+        raise Interrupt
+
+    simulation.save_checkpoint = save_and_stop
+
+
+def test_checkpoint_round_trip(workdir, params):
+    simulation = workflow.Simulation("run", every=20, checkpoint_every=100, params=params)
+    interrupt_after_checkpoint(simulation)
+    with pytest.raises(Interrupt):
+        simulation.run_movie()
+
+    with open(simulation.checkpoint_path(), "rb") as file:
+        state = pickle.load(file)
+    assert state["t"] == 100
+    assert state["s"] == 6  # snapshots 0, 20, ..., 100
+    assert state["params"] == simulation.params
+    assert not state["stored"]
+    np.testing.assert_array_equal(state["X_A"][:6], simulation.X_A[:6])
+    np.testing.assert_array_equal(state["M_A"], simulation.X_A[5])
+
+
+@pytest.mark.parametrize("stored", [False, True])
+def test_resume_without_seed_matches_uninterrupted_run(workdir, params, stored):
+    params = dict(params, seed=None)
+    interrupted = workflow.Simulation("run", every=20, checkpoint_every=100, params=params)
+    interrupt_after_checkpoint(interrupted)
+    with pytest.raises(Interrupt):
+        interrupted.go() if stored else interrupted.run_movie()
+
+    resumed = workflow.Simulation.resume(interrupted.checkpoint_path())
+
+    # The seed drawn by the interrupted run is kept in its parameters
+    assert isinstance(interrupted.params["seed"], int)
+    uninterrupted = workflow.Simulation("full", every=20, params=dict(params, seed=interrupted.params["seed"]))
+    uninterrupted.run_movie()
+
+    np.testing.assert_array_equal(resumed.times, uninterrupted.times)
+    np.testing.assert_array_equal(resumed.X_A[:], uninterrupted.X_A)
+    np.testing.assert_array_equal(resumed.X_B[:], uninterrupted.X_B)
+
+
+@pytest.mark.parametrize("bit_generator", ["Philox", "PCG64"])
+def test_resume_with_step_streams_matches_uninterrupted_run(workdir, params, bit_generator):
+    params = dict(params, seed=None, step_streams=True, bit_generator=bit_generator)
+    interrupted = workflow.Simulation("run", every=20, checkpoint_every=100, params=params)
+    interrupt_after_checkpoint(interrupted)
+    with pytest.raises(Interrupt):
+        interrupted.go()
+
+    with open(interrupted.checkpoint_path(), "rb") as file:
+        state = pickle.load(file)
+    assert state["seed"] == interrupted.params["seed"]
+    assert state["step_streams"].seed == interrupted.params["seed"]
+
+    resumed = workflow.Simulation.resume(interrupted.checkpoint_path())
+    uninterrupted = workflow.Simulation("full", every=20, params=dict(params, seed=interrupted.params["seed"]))
+    uninterrupted.run_movie()
+
+    np.testing.assert_array_equal(resumed.X_A[:], uninterrupted.X_A)
+    np.testing.assert_array_equal(resumed.X_B[:], uninterrupted.X_B)
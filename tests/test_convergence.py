@@ -0,0 +1,99 @@
+import ast
+
+import numpy as np
+import pytest
+
+import convergence
+import store
+import workflow
+from kinetics import fitzhugh_nagumo
+from spectral import SpectralSolver
+from test_checkpoint import Interrupt, interrupt_after_checkpoint
+
+
+@pytest.fixture
+def constant(params):
+    """Parameters of a run whose grids never change (no reactions and no diffusion)"""
+    return dict(params, mu=0, beta=0, alpha=0, kappa=0, d_A=0, dtype="int64",
+                convergence={"stride": 20, "tolerance": 1e-6, "patience": 2})
+
+
+def test_monitor_needs_patience_checks_without_change():
+    monitor = convergence.ConvergenceMonitor(stride=1, patience=2)
+    M = np.ones((8, 8))
+    assert [monitor.check(t, M) for t in range(4)] == [False, False, True, True]
+    assert monitor.stop_time == 2 and monitor.stop_reason.startswith("stationary")
+    np.testing.assert_array_equal(monitor.thin(np.arange(25)), [0, 10, 20, 24])
+
+    monitor = convergence.ConvergenceMonitor(stride=1, patience=2)
+    rng = np.random.default_rng(0)
+    assert not any(monitor.check(t, rng.random((8, 8))) for t in range(10))
+    assert convergence.stop_metadata(monitor, 9)["stop_reason"] == "horizon"
+
+
+def test_stop_truncates_the_snapshots_and_the_store(workdir, constant):
+    simulation = workflow.Simulation("run", every=10, params=constant)
+    simulation.go()
+
+    # Checks at time points 1, 21 and 41, stationary at the third
+    assert simulation.monitor.stop_time == 41
+    assert simulation.stop["stop_reason"].startswith("stationary")
+    metadata = ast.literal_eval(open("Data/run/metadata.txt").read())
+    assert metadata["stop_reason"] == simulation.stop["stop_reason"]
+    assert metadata["end_time"] == 41
+
+    trajectory = store.TrajectoryStore("Data/run")
+    np.testing.assert_array_equal(trajectory.times, simulation.times)
+    np.testing.assert_array_equal(simulation.times, [0, 10, 20, 30, 40, 41])
+    assert len(simulation.X_A) == len(simulation.times)
+    np.testing.assert_array_equal(simulation.X_A[-1], constant["A_init"])
+
+
+@pytest.mark.parametrize("stored", [False, True])
+def test_sparse_keeps_the_snapshots_aligned(workdir, constant, stored):
+    constant["convergence"]["action"] = "sparse"
+    simulation = workflow.Simulation("run", every=10, params=constant)
+    simulation.go() if stored else simulation.run_movie()
+
+    times = np.asarray(simulation.times)
+    assert len(times) == len(simulation.X_A) == len(simulation.X_B)
+    assert np.all(np.diff(times) > 0)
+    # Every snapshot up to convergence at 41, then every 10th of the remaining ones and the last
+    np.testing.assert_array_equal(times, [0, 10, 20, 30, 40, 50, 150, 250, 300])
+    if stored:
+        np.testing.assert_array_equal(store.TrajectoryStore("Data/run").times, times)
+    assert simulation.stop["action"] == "sparse" and simulation.stop["end_time"] == 300
+
+
+def test_spectral_solver_stops_before_the_end(tmp_path):
+    # U = V = cbrt(k) is a fixed point of the FitzHugh–Nagumo kinetics
+    k, tau = -.005, .1
+    U, V = np.full((16, 16), np.cbrt(k)), np.full((16, 16), np.cbrt(k))
+    solver = SpectralSolver(U.shape, 2 / 16, (2.8e-4, 5e-2), fitzhugh_nagumo, args=(k, tau), dt=.02)
+    monitor = convergence.ConvergenceMonitor(stride=1.0, tolerance=1e-6, patience=2)
+
+    solver.run(U, V, 10.0, monitor=monitor)
+    assert solver.t < 10.0
+    assert solver.stop["stop_reason"].startswith("stationary")
+    assert solver.stop["end_time"] == pytest.approx(solver.t)
+
+
+@pytest.mark.parametrize("stored", [False, True])
+def test_resume_after_convergence_continues_the_run(workdir, constant, stored):
+    constant["convergence"]["action"] = "sparse"
+    uninterrupted = workflow.Simulation("whole", every=10, params=constant)
+    uninterrupted.go() if stored else uninterrupted.run_movie()
+
+    interrupted = workflow.Simulation("run", every=10, checkpoint_every=100, params=constant)
+    interrupt_after_checkpoint(interrupted)
+    with pytest.raises(Interrupt):
+        interrupted.go() if stored else interrupted.run_movie()
+    assert interrupted.monitor.converged  # the checkpoint at 100 is after convergence at 41
+
+    resumed = workflow.Simulation.resume(interrupted.checkpoint_path())
+    assert resumed.monitor.stop_time == 41
+    assert len(resumed.monitor.history) == len(uninterrupted.monitor.history)
+    np.testing.assert_array_equal(resumed.times, uninterrupted.times)
+    assert len(resumed.X_A) == len(resumed.times)
+    np.testing.assert_array_equal(resumed.X_A[:], uninterrupted.X_A[:])
+    assert resumed.stop == uninterrupted.stop
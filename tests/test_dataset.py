@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+import dataset
+import workflow
+
+
+@pytest.fixture
+def legacy(workdir):
+    """The movie files Data/old-X_A.npy and Data/old-X_B.npy of older versions, one snapshot per time point"""
+    X_A = np.arange(20 * 6 * 5).reshape(20, 6, 5)
+    np.save("Data/old-X_A.npy", X_A)
+    np.save("Data/old-X_B.npy", -X_A)
+    return X_A
+
+
+def test_open_a_store_written_by_go(workdir, params):
+    simulation = workflow.Simulation("run", every=50, params=params)
+    simulation.go()
+
+    data = dataset.open_dataset("run")
+    np.testing.assert_array_equal(data.times, np.arange(0, 301, 50))
+    assert data.shape == (7, params["m"], params["n"])
+    assert data.params["seed"] == simulation.params["seed"]
+    assert data.metadata["stop_reason"] == "horizon"
+    np.testing.assert_array_equal(data["X_A"][3], simulation.X_A[3])
+    np.testing.assert_array_equal(data["X_B"][-1], simulation.X_B[-1])
+
+
+def test_open_legacy_movies_memory_mapped(legacy):
+    data = dataset.open_dataset("old")
+    assert isinstance(data["X_A"], np.memmap) and isinstance(data["X_B"], np.memmap)
+    np.testing.assert_array_equal(data.times, np.arange(20))
+    np.testing.assert_array_equal(data["X_B"][7], -legacy[7])
+
+    with pytest.raises(FileNotFoundError):
+        dataset.open_dataset("missing")
+
+
+def test_select_times_and_crops(legacy):
+    view = dataset.open_dataset("old").select(t_start=3, t_stop=17, every=4, region=(slice(1, 4), slice(0, 2)))
+
+    np.testing.assert_array_equal(view.times, [4, 8, 12, 16])
+    assert view.shape == (4, 3, 2)
+    np.testing.assert_array_equal(view["X_A"][1], legacy[8, 1:4, 0:2])
+    np.testing.assert_array_equal(view["X_A"][:], legacy[4:17:4, 1:4, 0:2])
+    np.testing.assert_array_equal(list(view["X_A"]), legacy[4:17:4, 1:4, 0:2])
+
+
+def test_species_slice_indexing(legacy):
+    X = dataset.open_dataset("old").select(every=2)["X_A"]
+
+    assert len(X) == 10
+    np.testing.assert_array_equal(X[-1], legacy[18])
+    np.testing.assert_array_equal(X[-10], legacy[0])
+    np.testing.assert_array_equal(X[1:7:3], legacy[[2, 8]])
+    np.testing.assert_array_equal(X[::-4], legacy[[18, 10, 2]])
+    np.testing.assert_array_equal(X[[0, 2]], legacy[[0, 4]])
+    for index in (10, -11):
+        with pytest.raises(IndexError):
+            X[index]
+
+
+def test_frames_stride(legacy):
+    data = dataset.open_dataset("old")
+
+    assert [t for t, M in data.frames("X_A", every=5)] == [0, 5, 10, 15]
+    view = data.select(t_start=2)
+    frames = list(view.frames("X_B", step=6))
+    assert [t for t, M in frames] == [2, 8, 14]
+    np.testing.assert_array_equal(frames[-1][1], -legacy[14])
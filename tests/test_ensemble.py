@@ -0,0 +1,25 @@
+import numpy as np
+
+import ensemble
+
+
+def test_replicates_are_independent_runs(workdir, params, capsys):
+    runs = ensemble.Ensemble("test", replicates=3, every=100, params=params)
+    runs.run_movie()
+
+    assert runs.X_A.shape == (4, 3, params["m"], params["n"])
+    assert np.all(runs.X_A[0] == params["A_init"])
+    assert not np.array_equal(runs.X_A[-1, 0], runs.X_A[-1, 1])
+    assert runs.stats["mean_A"].shape == (4, 3)
+    np.testing.assert_allclose(runs.stats["mean_A"][-1], runs.X_A[-1].mean(axis=(-2, -1)))
+    assert capsys.readouterr().out == ""  # no progress lines before 100,000 steps
+
+
+def test_the_grid_type_is_that_of_the_single_run(workdir, params):
+    params["N_t"] = 3
+    for dtype in ("auto", "int64"):
+        params["dtype"] = dtype
+        runs = ensemble.Ensemble("test", replicates=2, every=1, params=params)
+        runs.run_movie()
+        assert runs.X_A.dtype == runs.simulation.dtype()
+    assert runs.X_A.dtype == np.int64
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+import finite_difference as fd
+from kinetics import fitzhugh_nagumo
+
+
+D, ARGS = (2.8e-4, 5e-3 / .1), (-.005, .1)
+
+
+def test_laplacian_into_out_matches_the_new_array():
+    Z = np.random.default_rng(0).random((12, 9))
+    out = np.empty((10, 7))
+    fd.laplacian(Z, 0.1, out=out)
+    np.testing.assert_allclose(out, fd.laplacian(Z, 0.1), rtol=1e-12)
+
+
+@pytest.mark.parametrize("boundary", ["neumann", "periodic"])
+@pytest.mark.parametrize("shape", [(17,), (10, 7), (5, 6, 4)])
+def test_stencil_backends_agree(shape, boundary):
+    values = np.random.default_rng(0).random(shape)
+    results = list()
+    for backend in ("numpy", "ndimage"):
+        stencil = fd.Stencil(shape, 0.1, boundary, backend)
+        out = np.empty(shape)
+        stencil.laplacian(stencil.grid(values), out=out)
+        results.append(out)
+    np.testing.assert_allclose(results[0], results[1], atol=1e-9)
+
+
+def test_stencil_matches_laplacian():
+    values = np.random.default_rng(0).random((10, 7))
+    stencil = fd.Stencil(values.shape, 0.1)
+    Z = stencil.grid(values)
+    out = np.empty(values.shape)
+    stencil.laplacian(Z, out=out)
+    np.testing.assert_allclose(out, fd.laplacian(Z, 0.1), rtol=1e-12)
+
+
+def test_explicit_solver_matches_the_euler_loop():
+    N, dx, dt, n_steps = 30, 2 / 30, 1e-3, 500
+    rng = np.random.default_rng(0)
+    U, V = rng.random((N + 2, N + 2)), rng.random((N + 2, N + 2))
+    for Z in (U, V):
+        fd.neumann(Z)  # ExplicitSolver sets the ghost cells from the inside when loading
+
+    U_loop, V_loop = U.copy(), V.copy()
+    for _ in range(n_steps):
+        fd.euler_step(U_loop, V_loop, dt, dx, D, fitzhugh_nagumo, ARGS)
+
+    fd.ExplicitSolver((N, N), dx, D, fitzhugh_nagumo, args=ARGS, dt=dt).advance(U, V, n_steps)
+    np.testing.assert_allclose(U, U_loop, rtol=1e-9, atol=1e-12)
+    np.testing.assert_allclose(V, V_loop, rtol=1e-9, atol=1e-12)
+
+
+def test_periodic_diffusion_conserves_the_mean():
+    def no_reaction(U, V, out):
+        out[0][...], out[1][...] = 0, 0
+        return out
+
+    values = np.random.default_rng(0).random((6, 5, 4))
+    solver = fd.ExplicitSolver(values.shape, 0.1, (1e-3, 1e-3), no_reaction, dt=1, boundary="periodic")
+    U, V = solver.stencil.grid(values), solver.stencil.grid(values)
+    solver.advance(U, V, 50)
+    assert U[solver.stencil.inside].mean() == pytest.approx(values.mean(), rel=1e-12)
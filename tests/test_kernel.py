@@ -0,0 +1,48 @@
+import numpy as np
+
+import sim
+
+
+RATES = {"mu": 1, "beta": 3, "alpha": 0.02, "kappa": 1e-6, "d_A": 0.02, "d_B": 2.0}
+
+
+def test_diffusion_conserves_molecules():
+    rates = dict(RATES, mu=0, beta=0, alpha=0, kappa=0)
+    kernel = sim.TauLeapKernel((8, 9), tau=0.002, **rates, rng=np.random.default_rng(0))
+    M_A, M_B = np.full((8, 9), 200, dtype=np.uint16), np.full((8, 9), 75, dtype=np.uint16)
+    for _ in range(50):
+        M_A, M_B = kernel.step(M_A, M_B)
+    assert M_A.sum() == 200 * 72
+    assert M_B.sum() == 75 * 72
+    assert M_B.min() >= 0
+
+
+def test_step_reuses_the_draw_buffer():
+    kernel = sim.TauLeapKernel((5, 5), tau=0.002, **RATES, rng=np.random.default_rng(0))
+    Z = kernel.Z
+    M_A, M_B = np.full((5, 5), 200, dtype=np.uint16), np.full((5, 5), 75, dtype=np.uint16)
+    kernel.step(M_A, M_B)
+    assert kernel.Z is Z
+    assert Z[8:].sum() > 0  # diffusion of B
+
+
+def test_step_promotes_grids_which_outgrow_their_type():
+    kernel = sim.TauLeapKernel((4, 4), tau=1.0, **dict(RATES, mu=100, d_A=0, d_B=0), rng=np.random.default_rng(0))
+    M_A, M_B = np.full((4, 4), 250, dtype=np.uint8), np.full((4, 4), 75, dtype=np.uint8)
+    M_A, M_B = kernel.step(M_A, M_B)
+    assert M_A.dtype == np.uint16
+    assert M_A.min() > 255
+
+
+def test_kernel_agrees_with_calculate_picture_on_average():
+    shape = (20, 20)
+    kernel = sim.TauLeapKernel(shape, tau=0.002, **RATES, rng=np.random.default_rng(1))
+    M_A, M_B = sim.initialize_picture(*shape, 200, 75)
+    np.random.seed(1)
+    X_A, X_B = sim.initialize_picture(*shape, 200, 75)
+    for _ in range(200):
+        M_A, M_B = kernel.step(M_A, M_B)
+        X_A, X_B = sim.calculate_picture(0.002, X_A, X_B, **RATES)
+    # Means over 400 cells, whose standard error is below 1 molecule
+    assert abs(M_A.mean() - X_A.mean()) < 3
+    assert abs(M_B.mean() - X_B.mean()) < 3
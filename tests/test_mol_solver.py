@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+import mol_solver
+
+
+RATES = {"mu": 1.0, "beta": 3.0, "alpha": 0.02, "kappa": 1e-6}
+
+
+@pytest.mark.parametrize("shape", [(15,), (6, 5)])
+def test_jacobian_matches_finite_differences(shape):
+    solver = mol_solver.MOLSolver(shape, 0.1, (0.02, 2.0), **RATES)
+    rng = np.random.default_rng(0)
+    y = np.concatenate([rng.uniform(100, 300, solver.size), rng.uniform(30, 120, solver.size)])
+
+    J = solver.jacobian(0, y).toarray()
+    J_fd = np.empty_like(J)
+    for j in range(len(y)):
+        h = 1e-4 * max(1, abs(y[j]))
+        e = np.zeros_like(y)
+        e[j] = h
+        J_fd[:, j] = (solver.rhs(0, y + e) - solver.rhs(0, y - e)) / (2 * h)
+
+    assert np.abs(J - J_fd).max() / np.abs(J).max() < 1e-7
+    # and the sparsity pattern covers every entry of the Jacobian
+    assert not np.any((J != 0) & (solver.sparsity.toarray() == 0))
+
+
+def test_laplacian_matrix_conserves_mass():
+    for boundary in ("neumann", "periodic"):
+        L = mol_solver.laplacian_matrix((4, 5), 0.1, boundary)
+        np.testing.assert_allclose(L.sum(axis=0), 0, atol=1e-9)
+
+
+def test_uniform_state_follows_the_ode():
+    # Without gradients the grid follows the well-mixed ODE, from the stiff solver or RK45
+    solver = mol_solver.MOLSolver((4, 4), 0.1, (0.02, 2.0), **RATES)
+    _, A, B = solver.solve(5.0, 200, 75, t_eval=[5.0], rtol=1e-8, atol=1e-8)
+    _, A_rk, B_rk = solver.solve(5.0, 200, 75, t_eval=[5.0], method="RK45", rtol=1e-8, atol=1e-8)
+    assert np.ptp(A[-1]) < 1e-6
+    np.testing.assert_allclose(A[-1], A_rk[-1], rtol=1e-5)
+    np.testing.assert_allclose(B[-1], B_rk[-1], rtol=1e-5)
@@ -0,0 +1,67 @@
+import math
+
+import numpy as np
+import pytest
+
+import adaptive
+import nsm
+
+
+def test_priority_queue_keeps_the_earliest_time_on_top():
+    rng = np.random.default_rng(0)
+    times = rng.random(50)
+    queue = nsm.IndexedPriorityQueue(times)
+    for _ in range(200):
+        i, time = rng.integers(50), rng.random()
+        times[i] = time
+        queue.update(i, time)
+        assert queue.top() == (int(np.argmin(times)), times.min())
+
+
+def test_birth_and_death_match_the_exact_mean():
+    # A alone, with birth mu and death alpha * A: the mean is A_0 e^(-alpha t) + mu / alpha (1 - e^(-alpha t))
+    mu, alpha, t, A_0 = 5.0, 1.0, 2.0, 20
+    kernel = nsm.NextSubvolumeKernel((20, 20), mu=mu, beta=0, alpha=alpha, kappa=0, d_A=1.0, d_B=0,
+                                     rng=np.random.default_rng(0))
+    M_A, M_B = kernel.step(np.full((20, 20), A_0), np.zeros((20, 20)), tau_max=t)
+
+    mean = A_0 * math.exp(-alpha * t) + mu / alpha * (1 - math.exp(-alpha * t))
+    # The standard error of the mean of 400 cells is about 0.12
+    assert abs(M_A.mean() - mean) < 0.5
+    assert M_B.sum() == 0
+
+
+def test_diffusion_conserves_molecules():
+    kernel = nsm.NextSubvolumeKernel((5, 7), mu=0, beta=0, alpha=0, kappa=0, d_A=3.0, d_B=1.0,
+                                     rng=np.random.default_rng(0))
+    M_A, M_B = np.zeros((5, 7), dtype=int), np.zeros((5, 7), dtype=int)
+    M_A[0, 0], M_B[-1, -1] = 100, 50
+    for _ in range(3):
+        M_A, M_B = kernel.step(M_A, M_B, tau_max=0.5)
+    assert M_A.sum() == 100 and M_B.sum() == 50
+    assert M_A[0, 0] < 100
+    with pytest.raises(ValueError):
+        kernel.step(M_A, M_B)
+
+
+def test_nsm_agrees_with_the_ssa_on_average():
+    # All reactions on a 3x3 lattice with a few molecules per cell (A* = 5, B* = 12),
+    # against the direct SSA of adaptive.AdaptiveTauLeapKernel
+    rates = {"mu": 2.0, "beta": 3.0, "alpha": 1.0, "kappa": 0.01, "d_A": 1.0, "d_B": 0.5}
+    shape, t, R = (3, 3), 0.5, 150
+    rng = np.random.default_rng(0)
+    exact = nsm.NextSubvolumeKernel(shape, **rates, rng=rng)
+    direct = adaptive.AdaptiveTauLeapKernel(shape, **rates, rng=rng, n_ssa=10**6)
+
+    totals = {"nsm": list(), "ssa": list()}
+    for _ in range(R):
+        M_A, M_B = np.full(shape, 8), np.full(shape, 4)
+        totals["nsm"].append([M.sum() for M in exact.step(M_A, M_B, tau_max=t)])
+        M_A, M_B, _ = direct.ssa(np.full(shape, 8), np.full(shape, 4), t)
+        totals["ssa"].append([M_A.sum(), M_B.sum()])
+
+    nsm_totals, ssa_totals = np.array(totals["nsm"]), np.array(totals["ssa"])
+    error = np.sqrt((nsm_totals.var(axis=0) + ssa_totals.var(axis=0)) / R)
+    assert np.all(np.abs(nsm_totals.mean(axis=0) - ssa_totals.mean(axis=0)) < 4 * error)
+    # and A moved well away from its initial total of 72
+    assert nsm_totals[:, 0].mean() < 65
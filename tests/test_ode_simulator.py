@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from scipy.integrate import solve_ivp
+
+import ode_simulator as ode
+
+
+Y_INIT = np.array([[0.0, 1.0], [1.0, 0.5], [0.5, 2.0]])
+RATES = np.array([[1.0, 1.0], [0.1, 0.9], [0.2, 1.5]])
+T_EVAL = np.linspace(0, 5, 11)
+
+
+def test_batch_matches_the_single_systems():
+    t, y = ode.solve_schnakenberg_batch(5.0, Y_INIT, RATES, t_eval=T_EVAL, method="BDF")
+
+    np.testing.assert_allclose(t, T_EVAL)
+    assert y.shape == (3, 2, len(T_EVAL))
+    for i in range(3):
+        _, expected = ode.solve_schnakenberg(5.0, y_init=list(Y_INIT[i]), rates=list(RATES[i]), t_eval=T_EVAL)
+        np.testing.assert_allclose(y[i], expected, rtol=1e-2, atol=1e-2)
+
+
+def test_jacobian_matches_finite_differences():
+    rng = np.random.default_rng(0)
+    a_prod, b_prod = rng.random(4), rng.random(4)
+    y = rng.random(8) + 0.5
+
+    jacobian = ode.jac_schnakenberg_batch(0, y, a_prod, b_prod).toarray()
+    h = 1e-6
+    expected = np.column_stack([(ode.ode_schnakenberg_batch(0, y + h * e, a_prod, b_prod)
+                                 - ode.ode_schnakenberg_batch(0, y - h * e, a_prod, b_prod)) / (2 * h)
+                                for e in np.eye(8)])
+    np.testing.assert_allclose(jacobian, expected, atol=1e-6)
+
+
+def test_vectorized_derivatives_match_column_by_column():
+    rng = np.random.default_rng(1)
+    a_prod, b_prod = rng.random(3), rng.random(3)
+    Y = rng.random((6, 4))
+
+    dY = ode.ode_schnakenberg_batch(0, Y, a_prod, b_prod)
+    for k in range(4):
+        np.testing.assert_allclose(dY[:, k], ode.ode_schnakenberg_batch(0, Y[:, k], a_prod, b_prod))
+
+
+@pytest.mark.parametrize("method, dt, tolerance", [("rk4", 0.01, 1e-6), ("implicit", 0.001, 1e-2)])
+def test_fixed_step_methods_agree_with_solve_ivp(method, dt, tolerance):
+    t, y = ode.solve_schnakenberg_batch(5.0, Y_INIT, RATES, t_eval=T_EVAL, method=method, dt=dt)
+
+    np.testing.assert_allclose(t, T_EVAL)
+    for i in range(3):
+        expected = solve_ivp(ode.ode_schnakenberg, (0, 5.0), Y_INIT[i], args=tuple(RATES[i]), t_eval=T_EVAL,
+                             rtol=1e-10, atol=1e-10).y
+        np.testing.assert_allclose(y[i], expected, rtol=tolerance, atol=tolerance)
+
+
+def test_fixed_step_methods_need_a_step_size():
+    with pytest.raises(ValueError):
+        ode.solve_schnakenberg_batch(1.0, [0, 1], [1, 1], method="rk4")
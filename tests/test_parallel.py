@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+import parallel
+import sim
+
+
+RATES = {"tau": 0.002, "mu": 1, "beta": 3, "alpha": 0.02, "kappa": 1e-6, "d_A": 0.02, "d_B": 2.0}
+
+
+def test_diffusion_across_strips_conserves_molecules():
+    rates = dict(RATES, mu=0, beta=0, alpha=0, kappa=0)
+    M_A, M_B = np.zeros((9, 6), dtype=np.uint16), np.zeros((9, 6), dtype=np.uint16)
+    M_A[:3], M_B[-3:] = 500, 300  # everything starts in the first and last strip
+    with parallel.ParallelKernel(M_A.shape, **rates, workers=3, seed=0) as kernel:
+        for _ in range(3):  # the workers are reused between calls
+            M_A, M_B = kernel.advance(M_A, M_B, 100)
+        processes = kernel.processes
+    assert M_A.sum() == 500 * 18 and M_B.sum() == 300 * 18
+    assert M_B[:3].sum() > 0  # and crosses the middle strip
+    assert not any(process.is_alive() for process in processes)
+
+
+def test_parallel_kernel_is_statistically_equivalent_to_serial():
+    shape, n_steps = (16, 16), 400
+    M_A, M_B = sim.initialize_picture(*shape, 200, 75)
+    serial = sim.TauLeapKernel(shape, **RATES, rng=np.random.default_rng(0))
+    S_A, S_B = M_A.copy(), M_B.copy()
+    for _ in range(n_steps):
+        S_A, S_B = serial.step(S_A, S_B)
+    with parallel.ParallelKernel(shape, **RATES, workers=2, seed=0) as kernel:
+        P_A, P_B = kernel.advance(M_A.copy(), M_B.copy(), n_steps)
+
+    # The means over 256 cells (of a Poisson-like spread around 200 and 75)
+    # have a standard error of about one molecule
+    assert abs(P_A.mean() - S_A.mean()) < 4
+    assert abs(P_B.mean() - S_B.mean()) < 4
+    assert 0.5 < P_A.var() / S_A.var() < 2
+
+
+def test_failing_worker_raises_instead_of_hanging(monkeypatch):
+    step = sim.TauLeapKernel.step
+
+    def fail_on_second_strip(kernel, M_A, M_B):
+        if M_A.shape[0] == 5:
+            raise FloatingPointError("broken strip")
+        return step(kernel, M_A, M_B)
+
+    # The workers are forked, so they see the patched kernel
+    monkeypatch.setattr(sim.TauLeapKernel, "step", fail_on_second_strip)
+    M_A, M_B = sim.initialize_picture(9, 6, 200, 75)
+    kernel = parallel.ParallelKernel(M_A.shape, **RATES, workers=2, seed=0, timeout=30)
+    with pytest.raises(RuntimeError, match="broken strip"):
+        kernel.advance(M_A, M_B, 10)
+    assert kernel.processes is None
@@ -0,0 +1,31 @@
+import time
+
+import profiling
+import workflow as wf
+
+
+def test_nested_phases_are_not_counted_twice():
+    profiler = profiling.Profiler(phases=True)
+    profiler.start()
+    with profiler.phase("step"):
+        time.sleep(0.02)
+        for _ in range(2):
+            with profiler.phase("draw"):
+                time.sleep(0.03)
+    profiler.stop()
+
+    phases = profiler.report()["phases"]
+    assert phases["draw"]["calls"] == 2
+    assert 0.06 <= phases["draw"]["seconds"] < 0.09
+    assert 0.02 <= phases["step"]["seconds"] < 0.05
+    assert sum(phase["fraction"] for phase in phases.values()) <= 1
+
+
+def test_the_phases_of_a_run_are_within_its_runtime(workdir, params):
+    params.update(profile=True, analysis={"stride": 50})
+    simulation = wf.Simulation("sim_2", every=100, params=params)
+    simulation.run_movie()
+
+    report = simulation.profiler.report()
+    assert report["phases"]["analysis"]["calls"] == len(range(0, params["N_t"], 50))
+    assert sum(phase["seconds"] for phase in report["phases"].values()) <= report["runtime"]
@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("matplotlib")
+from PIL import Image
+
+import render
+import store
+
+
+LUT_STYLE = render.make_style(movie_type="lut", vmin=0, vmax=100, scale=2, colorbar=False)
+
+
+def test_write_gif_streams_every_frame(tmp_path):
+    lut = render.colormap_lut("viridis")
+    frames = [lut[np.full((6, 8), 40 * i, dtype=np.uint8)] for i in range(5)]
+    path = str(tmp_path / "movie.gif")
+    render.Renderer(workers=1).write(iter(frames), path, fps=4)
+
+    image = Image.open(path)
+    assert image.n_frames == 5
+    assert image.info["loop"] == 0 and image.info["duration"] == 250
+    for i, frame in enumerate(frames):
+        image.seek(i)
+        assert np.abs(np.asarray(image.convert("RGB")).astype(int) - frame).max() <= 8
+
+    with pytest.raises(ValueError):
+        render.write_gif(open(str(tmp_path / "empty.gif"), "wb"), iter([]))
+
+
+def test_palette_gif_keeps_the_indices():
+    lut = render.colormap_lut("viridis")
+    frames = [np.arange(48, dtype=np.uint8).reshape(6, 8) * i for i in range(1, 4)]
+    import io
+
+    image = Image.open(io.BytesIO(render.palette_gif(frames, lut)))
+    assert image.n_frames == 3
+    image.seek(2)
+    np.testing.assert_array_equal(np.asarray(image.convert("RGB")), lut[frames[2]])
+
+
+def rendered(renderer, X, **kwargs):
+    return list(renderer.render(renderer.movie_jobs(X, "run", "X_A", LUT_STYLE, every=1, **kwargs)))
+
+
+def test_cache_is_dropped_for_a_new_run_in_memory():
+    renderer = render.Renderer(workers=1)
+    first = rendered(renderer, np.zeros((3, 4, 4)))
+    assert rendered(renderer, np.zeros((3, 4, 4)))[0] is first[0]  # same snapshots, cached frames
+    second = rendered(renderer, np.full((3, 4, 4), 90))
+    assert not np.array_equal(second[0], first[0])
+
+
+def test_cache_is_dropped_for_a_rewritten_store(tmp_path):
+    renderer = render.Renderer(workers=1)
+    path = str(tmp_path / "run")
+    for value in (0, 90):
+        trajectory = store.TrajectoryStore(path, mode="w", params={})
+        for t in range(3):
+            trajectory.append(t, np.full((4, 4), value, dtype=np.uint8), np.zeros((4, 4), dtype=np.uint8))
+        trajectory.close()
+        view = store.TrajectoryStore(path)["X_A"]
+        frames = rendered(renderer, view)
+        assert np.array_equal(frames[0], render.render_frame(np.full((4, 4), value), LUT_STYLE))
+
+
+@pytest.mark.parametrize("interpolation", ["nearest", "bilinear"])
+def test_lut_renderer_fills_the_frame(interpolation):
+    M = np.random.default_rng(0).integers(0, 1000, (6, 5))
+    renderer = render.LUTRenderer(M.shape, vmin=0, vmax=1000, scale=3, interpolation=interpolation)
+    indices = renderer.indices(M)
+    if interpolation == "nearest":
+        indices = indices.repeat(3, axis=0).repeat(3, axis=1)
+    expected = renderer.lut[indices]
+
+    for _ in range(2):  # the buffers are reused
+        frame = renderer.render(M)
+        np.testing.assert_array_equal(frame[:, :15], expected)
+        np.testing.assert_array_equal(frame[:, 15:], renderer.bar)
+    assert not np.shares_memory(frame, renderer.render(M))
+
+
+def test_catscan_covers_the_range_of_the_data():
+    M = np.array([[13, 40], [27, 58]])
+    np.testing.assert_array_equal(render.catscan_windows(M, 10), [10, 20, 30, 40, 50])
+    np.testing.assert_array_equal(render.catscan_windows(np.full((2, 2), 7), 10), [0])
+
+    jobs = render.Renderer(workers=1).catscan_jobs(M, "run", "X_A", 0, window=10)
+    assert [style["vmin"] for _, _, style in jobs] == [10, 20, 30, 40, 50]
+    z, stack = render.catscan_indices(M, 10)
+    np.testing.assert_array_equal(z, [10, 20, 30, 40, 50])
+
+
+def test_create_all_gifs_builds_the_catscan_in_one_pass(workdir, monkeypatch):
+    import vis
+
+    def matplotlib_catscan(*args, **kwargs):
+        raise AssertionError("the GIF catscan should not be rendered frame by frame")
+
+    monkeypatch.setattr(render.Renderer, "catscan_jobs", matplotlib_catscan)
+    X = np.random.default_rng(0).integers(100, 160, (3, 5, 5))
+    vis.create_all_gifs(X, "run", "X_A", every=1, window=10, dpi=30, workers=1)
+
+    image = Image.open("Gifs/run-catscan-X_A.gif")
+    assert image.n_frames == len(render.catscan_windows(X[-1], 10))
+
+
+def test_vis_does_not_import_pyplot():
+    import os
+    import subprocess
+    import sys
+
+    code = "import sys, vis; assert 'matplotlib.pyplot' not in sys.modules"
+    subprocess.run([sys.executable, "-c", code], check=True,
+                   cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
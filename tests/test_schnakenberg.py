@@ -0,0 +1,10 @@
+import pytest
+
+import schnakenberg
+
+
+@pytest.mark.parametrize("flags", [[], ["--no-store"]])
+def test_run_reports_once(workdir, params, capsys, flags):
+    (workdir / "Parameters" / "small.txt").write_text(repr(params))
+    assert schnakenberg.main(["run", "small", "--every", "100"] + flags) == 0
+    assert capsys.readouterr().out.count("Filename:") == 1
@@ -0,0 +1,30 @@
+import numpy as np
+
+import sim
+import workflow
+
+
+def test_snapshot_times_keep_stride_windows_and_final_point():
+    assert list(sim.snapshot_times(10, every=3)) == [0, 3, 6, 9]
+    assert list(sim.snapshot_times(11, every=3)) == [0, 3, 6, 9, 10]
+    assert list(sim.snapshot_times(20, every=2, windows=[(4, 8)])) == [4, 6, 19]
+
+
+def test_run_movie_records_only_the_snapshots(workdir, params):
+    simulation = workflow.Simulation("test", every=100, params=params)
+    simulation.run_movie()
+
+    assert list(simulation.times) == [0, 100, 200, 300]
+    assert simulation.X_A.shape == (4, params["m"], params["n"])
+    assert np.all(simulation.X_A[0] == params["A_init"])
+    assert np.all(simulation.X_B[0] == params["B_init"])
+
+
+def test_strided_run_matches_full_run(workdir, params):
+    full = workflow.Simulation("full", every=1, params=params)
+    full.run_movie()
+    strided = workflow.Simulation("strided", every=50, params=params)
+    strided.run_movie()
+
+    np.testing.assert_array_equal(strided.X_A, full.X_A[strided.times])
+    np.testing.assert_array_equal(strided.X_B, full.X_B[strided.times])
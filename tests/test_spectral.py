@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from finite_difference import ExplicitSolver
+from kinetics import fitzhugh_nagumo
+from spectral import SpectralSolver, neumann_eigenvalues
+
+
+# The FitzHugh–Nagumo problem of fd_main.py, on a 30x30 grid of side 2
+N, DX = 30, 2 / 30
+D, ARGS = (2.8e-4, 5e-3 / .1), (-.005, .1)
+
+
+def initial_state(seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.random((N + 2, N + 2)), rng.random((N + 2, N + 2))  # with the ghost cells of ExplicitSolver
+
+
+def explicit_reference(U, V, T, dt=1e-3):
+    U, V = U.copy(), V.copy()
+    ExplicitSolver((N, N), DX, D, fitzhugh_nagumo, args=ARGS, dt=dt).advance(U, V, int(round(T / dt)))
+    return U[1:-1, 1:-1], V[1:-1, 1:-1]
+
+
+def relative_error(Z, reference):
+    return np.abs(Z - reference).max() / np.abs(reference).max()
+
+
+def test_lattice_eigenvalues_match_the_five_point_laplacian():
+    # The DCT-II basis vectors are eigenvectors of the Neumann five-point Laplacian
+    from scipy import fft
+
+    q = neumann_eigenvalues((6, 5), DX, lattice=True)
+    Z_hat = np.zeros((6, 5))
+    Z_hat[2, 3] = 1
+    Z = fft.idctn(Z_hat, type=2, norm="ortho")
+    padded = np.pad(Z, 1, mode="edge")
+    laplacian = (padded[2:, 1:-1] + padded[:-2, 1:-1] + padded[1:-1, 2:] + padded[1:-1, :-2] - 4 * Z) / DX**2
+    np.testing.assert_allclose(laplacian, -q[2, 3] * Z, atol=1e-9 * q.max())
+
+
+@pytest.mark.parametrize("dt, tolerance", [(1e-3, 5e-3), (0.02, 5e-2)])
+def test_spectral_agrees_with_explicit(dt, tolerance):
+    U_0, V_0 = initial_state()
+    U_ref, V_ref = explicit_reference(U_0, V_0, T=1.0)
+
+    U, V = U_0[1:-1, 1:-1].copy(), V_0[1:-1, 1:-1].copy()
+    solver = SpectralSolver((N, N), DX, D, fitzhugh_nagumo, args=ARGS, dt=dt, lattice=True)
+    solver.run(U, V, 1.0)
+
+    assert solver.t == pytest.approx(1.0)
+    assert relative_error(U, U_ref) < tolerance
+    assert relative_error(V, V_ref) < tolerance
+    # The patterns did move (by about a third of their range)
+    assert relative_error(U_0[1:-1, 1:-1], U_ref) > 0.1
+
+
+def test_spectral_conserves_the_mean_under_pure_diffusion():
+    def no_reaction(U, V, out):
+        out[0][...], out[1][...] = 0, 0
+        return out
+
+    U, V = initial_state()[0][1:-1, 1:-1].copy(), initial_state(1)[0][1:-1, 1:-1].copy()
+    means = U.mean(), V.mean()
+    SpectralSolver((N, N), DX, (1e-2, 1.0), no_reaction, dt=0.5).advance(U, V, 20)
+    np.testing.assert_allclose((U.mean(), V.mean()), means, rtol=1e-12)
+    assert V.std() < 1e-6  # diffused flat
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+import store
+
+
+def snapshots(N, shape=(4, 5), seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 300, (N,) + shape).astype(np.uint16), rng.integers(0, 300, (N,) + shape).astype(np.uint16)
+
+
+def test_append_and_read(tmp_path):
+    X_A, X_B = snapshots(25)
+    trajectory = store.TrajectoryStore(str(tmp_path / "run"), mode="w", params={"every": 2}, chunk_size=10)
+    for s in range(25):
+        trajectory.append(2 * s, X_A[s], X_B[s])
+
+    # Two chunks on disk and five snapshots in the buffer
+    assert len(trajectory.chunks) == 2
+    assert len(trajectory) == 25
+    np.testing.assert_array_equal(trajectory["X_A"][24], X_A[24])
+    trajectory.close()
+
+    reopened = store.TrajectoryStore(str(tmp_path / "run"), mode="r")
+    assert reopened.params == {"every": 2}
+    assert reopened.shape == (25, 4, 5)
+    np.testing.assert_array_equal(reopened.times, 2 * np.arange(25))
+    np.testing.assert_array_equal(reopened["X_A"][:], X_A)
+    np.testing.assert_array_equal(reopened["X_B"][3:20:4], X_B[3:20:4])
+    np.testing.assert_array_equal(reopened["X_B"][-1], X_B[-1])
+    np.testing.assert_array_equal(reopened["X_A"][[0, 12, 24], 1:3], X_A[[0, 12, 24], 1:3])
+    with pytest.raises(IndexError):
+        reopened["X_A"][25]
+
+
+def test_append_promotes_the_buffer(tmp_path):
+    trajectory = store.TrajectoryStore(str(tmp_path / "run"), mode="w", params={}, chunk_size=4)
+    small = np.full((2, 2), 7, dtype=np.uint8)
+    large = np.full((2, 2), 1_000, dtype=np.uint16)
+    trajectory.append(0, small, small)
+    trajectory.append(1, large, small)
+    trajectory.close()
+
+    reopened = store.TrajectoryStore(str(tmp_path / "run"), mode="r")
+    assert reopened["X_A"][0][0, 0] == 7
+    assert reopened["X_A"][1][0, 0] == 1_000
+
+
+def test_truncate_to_a_chunk_boundary(tmp_path):
+    X_A, X_B = snapshots(30)
+    path = str(tmp_path / "run")
+    trajectory = store.TrajectoryStore(path, mode="w", params={}, chunk_size=10)
+    for s in range(30):
+        trajectory.append(s, X_A[s], X_B[s])
+    trajectory.close()
+
+    appended = store.TrajectoryStore(path, mode="a", chunk_size=10)
+    appended.truncate(10)
+    assert len(appended) == 10
+    with pytest.raises(ValueError):
+        appended.truncate(5)
+
+    # Append different snapshots after the truncation
+    for s in range(10, 20):
+        appended.append(s, X_B[s], X_A[s])
+    appended.close()
+
+    reopened = store.TrajectoryStore(path, mode="r")
+    assert len(reopened) == 20
+    np.testing.assert_array_equal(reopened["X_A"][:10], X_A[:10])
+    np.testing.assert_array_equal(reopened["X_A"][10:], X_B[10:20])
+    assert sorted(f for f in (tmp_path / "run").iterdir() if f.name.startswith("chunk-")) == \
+        [tmp_path / "run" / "chunk-000000.npz", tmp_path / "run" / "chunk-000001.npz"]
+
+
+def test_metadata_and_rewrite(tmp_path):
+    path = str(tmp_path / "run")
+    trajectory = store.TrajectoryStore(path, mode="w", params={}, chunk_size=2)
+    trajectory.append(0, *[np.zeros((2, 2), dtype=np.uint8)] * 2)
+    trajectory.update_metadata({"stop_reason": "converged", "t_end": 10})
+    trajectory.update_metadata({"t_end": 12})
+    trajectory.close()
+    assert store.TrajectoryStore(path).metadata == {"stop_reason": "converged", "t_end": 12}
+
+    # Opening with mode "w" starts over
+    rewritten = store.TrajectoryStore(path, mode="w", params={"new": True})
+    assert len(rewritten) == 0
+    assert rewritten.metadata == {}
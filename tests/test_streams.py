@@ -0,0 +1,38 @@
+import ast
+
+import numpy as np
+import pytest
+
+import streams
+import workflow
+
+
+@pytest.mark.parametrize("bit_generator", ["Philox", "PCG64"])
+def test_step_streams_without_seed_are_fixed_once(bit_generator):
+    step_streams = streams.StepStreams(None, bit_generator)
+    assert step_streams.seed is not None
+    first = step_streams.generator(7).random(4)
+    np.testing.assert_array_equal(step_streams.generator(7).random(4), first)
+    assert not np.array_equal(step_streams.generator(8).random(4), first)
+
+    # and can be regenerated from the seed
+    again = streams.StepStreams(step_streams.seed, bit_generator)
+    np.testing.assert_array_equal(again.generator(7).random(4), first)
+
+
+def test_streams_are_independent_of_each_other():
+    draws = [streams.make_generator(1, replicate=r, tile=w).random(4) for r in range(2) for w in range(2)]
+    assert len({tuple(draw) for draw in draws}) == 4
+    np.testing.assert_array_equal(streams.make_generator(1, tile=1).random(4), draws[1])
+
+
+def test_simulation_saves_the_seed_it_drew(workdir, params):
+    simulation = workflow.Simulation("run", every=100, params=dict(params, seed=None))
+    simulation.go()
+
+    seed = ast.literal_eval(open("Data/run/params.txt").read())["seed"]
+    assert seed == simulation.params["seed"] is not None
+
+    repeat = workflow.Simulation("repeat", every=100, params=dict(params, seed=seed))
+    repeat.run_movie()
+    np.testing.assert_array_equal(repeat.X_A, simulation.X_A[:])
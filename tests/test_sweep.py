@@ -0,0 +1,47 @@
+import os
+
+import numpy as np
+
+import sweep
+import turing
+
+
+def test_grid_points():
+    assert sweep.grid_points({"dr": [1, 10], "mu": [1]}) == [{"dr": 1, "mu": 1}, {"dr": 10, "mu": 1}]
+
+
+def test_run_id_depends_on_the_base_parameters():
+    assert sweep.run_id({"dr": 10}, {"mu": 1}) == sweep.run_id({"dr": 10}, {"mu": 1})
+    assert sweep.run_id({"dr": 10}, {"mu": 1}) != sweep.run_id({"dr": 10}, {"mu": 2})
+    assert sweep.run_id({"dr": 10}, {"mu": 1}) != sweep.run_id({"dr": 100}, {"mu": 1})
+
+
+def test_turing_analysis_is_only_done_when_needed(workdir, params):
+    (workdir / "Parameters" / "base.txt").write_text(repr(params))
+    study = sweep.Sweep("base", {"dr": [1, 100]})
+    assert study._turing is None
+    assert not os.path.exists("Data/turing_index.npz")
+
+    screened = sweep.Sweep("base", {"dr": [1, 100]}, skip_non_turing=True)
+    assert list(screened.turing["turing"]) == [False, True]
+    assert os.path.exists("Data/turing_index.npz")
+
+
+def test_results_are_written_without_temporary_files(workdir, params):
+    (workdir / "Parameters" / "base.txt").write_text(repr(params))
+    study = sweep.Sweep("base", {"dr": [1, 100]})
+    study.save_result({"dr": 1}, {"mean_A": np.float64(2.5)})
+    assert os.listdir(study.path + "runs/") == [sweep.run_id({"dr": 1}, params) + ".txt"]
+
+    rows = study.load_results()
+    assert [row["status"] for row in rows] == ["done", "missing"]
+    assert rows[0]["mean_A"] == 2.5
+
+
+def test_turing_index_reloads_what_it_saved(workdir, params):
+    index = turing.TuringIndex()
+    first = index.lookup([dict(params, d_B=2.0), dict(params, d_B=0.02)])
+    assert list(first["turing"]) == [True, False]
+    assert os.listdir("Data") == ["turing_index.npz"]
+    again = turing.TuringIndex().lookup([dict(params, d_B=2.0)])
+    assert again["wavelength"][0] == first["wavelength"][0]
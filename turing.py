@@ -0,0 +1,140 @@
+"""Linear stability (Turing) analysis of the Schnakenberg system
+
+For the kinetics in molecules per cell of the stochastic model
+
+A' = mu - alpha A + kappa A^2 B + d_A * (Laplacian of A)
+B' = beta - kappa A^2 B + d_B * (Laplacian of B)
+
+(the non-dimensional system in ode_simulator is alpha = kappa = 1) this
+computes the homogeneous steady state, its Jacobian and the dispersion
+relation lambda(k), the growth rate of a perturbation with wavenumber k
+(in radians per cell). All functions broadcast over arrays of parameters,
+so whole parameter grids are analysed at once.
+"""
+
+import numpy as np
+import os
+import tempfile
+
+
+KEYS = ("mu", "beta", "alpha", "kappa", "d_A", "d_B")
+
+
+def steady_state(mu, beta, alpha, kappa):
+    """Return the homogeneous steady state A*, B*"""
+    A = (mu + beta) / alpha
+    B = beta / (kappa * A**2)
+    return A, B
+
+
+def jacobian(mu, beta, alpha, kappa):
+    """Return the entries f_A, f_B, g_A, g_B of the Jacobian at the steady state"""
+    A, B = steady_state(mu, beta, alpha, kappa)
+    f_A = -alpha + 2 * kappa * A * B
+    f_B = kappa * A**2
+    g_A = -2 * kappa * A * B
+    g_B = -kappa * A**2
+    return f_A, f_B, g_A, g_B
+
+
+def laplacian_eigenvalue(k, lattice=True):
+    """Return -(eigenvalue of the Laplacian) for wavenumber k
+
+    On the lattice (diffusion between neighbouring cells) this is
+    2 - 2 cos(k), which is k^2 for long waves (lattice=False).
+    """
+    return 2 - 2 * np.cos(k) if lattice else k**2
+
+
+def dispersion(k, mu, beta, alpha, kappa, d_A, d_B, lattice=True):
+    """Return the growth rate (largest real part of the eigenvalues) at wavenumber k
+
+    The parameters broadcast against k, e.g. parameters of shape (P, 1)
+    and k of shape (K,) give the growth rates of shape (P, K).
+    """
+    f_A, f_B, g_A, g_B = jacobian(mu, beta, alpha, kappa)
+    q = laplacian_eigenvalue(k, lattice)
+    trace = f_A + g_B - q * (d_A + d_B)
+    det = (f_A - d_A * q) * (g_B - d_B * q) - f_B * g_A
+    return np.real(trace / 2 + np.sqrt(trace.astype(complex)**2 / 4 - det))
+
+
+def analyse(mu, beta, alpha, kappa, d_A, d_B, n_k=512, lattice=True):
+    """Return the Turing analysis of (arrays of) parameters as a dictionary
+
+    * A_star, B_star - the homogeneous steady state
+    * stable - whether the steady state is stable without diffusion
+    * turing - whether it is stable without diffusion but unstable with it
+    * k_max, growth_max - the fastest growing wavenumber and its growth rate
+    * wavelength - the predicted wavelength of the pattern (in cells), 2 pi / k_max
+    """
+    params = np.broadcast_arrays(*(np.asarray(p, dtype=float) for p in (mu, beta, alpha, kappa, d_A, d_B)))
+    mu, beta, alpha, kappa, d_A, d_B = (p[..., None] for p in params)
+
+    f_A, f_B, g_A, g_B = jacobian(mu, beta, alpha, kappa)
+    stable = (f_A + g_B < 0) & (f_A * g_B - f_B * g_A > 0)
+
+    # Largest growth rate over the wavenumbers the lattice can hold
+    k = np.linspace(0, np.pi, n_k)[1:]
+    growth = dispersion(k, mu, beta, alpha, kappa, d_A, d_B, lattice)
+    i = np.argmax(growth, axis=-1)
+    growth_max = np.take_along_axis(growth, i[..., None], axis=-1)[..., 0]
+    k_max = k[i]
+
+    A_star, B_star = steady_state(mu, beta, alpha, kappa)
+    turing = stable[..., 0] & (growth_max > 0)
+    return {"A_star": A_star[..., 0], "B_star": B_star[..., 0], "stable": stable[..., 0],
+            "turing": turing, "k_max": k_max, "growth_max": growth_max,
+            "wavelength": np.where(turing, 2 * np.pi / k_max, np.nan)}
+
+
+def grid_size(wavelength, n_wavelengths=8, minimum=10):
+    """Return a number of cells along a side holding n_wavelengths of the pattern"""
+    if not np.isfinite(wavelength):
+        return minimum
+    return max(minimum, int(np.ceil(n_wavelengths * wavelength)))
+
+
+class TuringIndex:
+    """
+    On-disk cache of analyse, keyed by the parameters (mu, beta, alpha,
+    kappa, d_A, d_B), so screening the same parameters again (e.g. in a
+    restarted sweep) costs nothing. The index is kept in one .npz file.
+    """
+
+    def __init__(self, path="Data/turing_index.npz"):
+        self.path = path
+        self.keys = np.zeros((0, len(KEYS)))
+        self.results = dict()
+        if os.path.exists(path):
+            data = np.load(path)
+            self.keys = data["keys"]
+            self.results = {name: data[name] for name in data.files if name != "keys"}
+        self.rows = {tuple(key): i for i, key in enumerate(self.keys)}
+
+
+    def lookup(self, params):
+        """Return the analysis of a list of parameter dictionaries, computing only new ones"""
+        keys = np.array([[float(p[key]) for key in KEYS] for p in params]).reshape(-1, len(KEYS))
+
+        new = list({tuple(key) for key in keys if tuple(key) not in self.rows})
+        if new:
+            result = analyse(*np.array(new).T)
+            for i, key in enumerate(new):
+                self.rows[key] = len(self.keys) + i
+            self.keys = np.concatenate([self.keys, np.array(new)])
+            for name, value in result.items():
+                self.results[name] = np.concatenate([self.results.get(name, value[:0]), value])
+            self.save()
+
+        rows = [self.rows[tuple(key)] for key in keys]
+        return {name: value[rows] for name, value in self.results.items()}
+
+
+    def save(self):
+        folder = os.path.dirname(self.path) or "."
+        os.makedirs(folder, exist_ok=True)
+        # A temporary file of its own, as processes of a sweep can save at the same time
+        with tempfile.NamedTemporaryFile(dir=folder, suffix=".tmp", delete=False) as file:
+            np.savez(file, keys=self.keys, **self.results)
+        os.replace(file.name, self.path)
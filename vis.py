@@ -1,138 +1,76 @@
 import numpy as np
-import matplotlib.pyplot as plt
-import imageio
-import os
-
-
-
-def catscan2png(M, filename, kind="X_A", window=10):
-    
-    picturepath = "Pictures/"
-    picture_names = list()
-    
-    for z in np.arange(0, 1000, window):
-        
-        suffix =  "-catscan" + f"-{z}-" + kind
-        
-        plt.imshow(M, vmin=z, vmax=z+window)
-        
-        plt.xticks([])
-        plt.yticks([])
-        cb = plt.colorbar()
-        
-        picturename = picturepath + filename + suffix + ".png"
-        picture_names.append(picturename)
-
-        plt.tight_layout()
-        plt.savefig(picturename, dpi=350)
-
-        cb.remove()
-        
-    return picture_names
-
-
-
-def movie2png(X, filename, kind="X_A", every=5_000, max_value=1000, movie_type="imshow", N_max=None):
-    
-    picturepath = "Pictures/"
-    picture_names = list()
-    
-    N_t, m, n  = X.shape
-    
-    if N_max:
-        N_t = N_max
-    
-    for t in np.arange(0, N_t, every):
-        
-        M = X[t]
-        
-        suffix = "-" + movie_type + f"-{t}-" + kind
-        picturename = picturepath + filename + suffix + ".png"
-        picture_names.append(picturename)
-        
-        if movie_type == "imshow":
-            plot_imshow(M, picturename, vmin=0, vmax=max_value, save=True, dpi=350)
-            
-        if movie_type == "surface":
-            plot_surface(M, picturename, zmin=0, zmax=max_value, save=True, dpi=350)
-            
-    return picture_names
-            
-    
-
-def plot_imshow(M, picturename, vmin, vmax, save, dpi):
-    
-    plt.imshow(M, vmin=vmin, vmax=vmax)
-    plt.xticks([])
-    plt.yticks([])
-    cb = plt.colorbar()
-
-    if save:
-        plt.tight_layout()
-        plt.savefig(picturename, dpi=dpi)
-    
-    cb.remove()
-
-    
-
-def plot_surface(M, picturename, zmin, zmax, save, dpi):
-    
-    m, n = M.shape
-
-    fig, ax = plt.subplots(subplot_kw={"projection": "3d"})
-
-    # Make data
-    X, Y = np.meshgrid(np.arange(m), np.arange(n))
-    Z = M
-
-    # Plot the surface
-    surf = ax.plot_surface(X, Y, Z, cmap='viridis',
-                           linewidth=0)
-
-    if zmax:
-        ax.set_zlim(zmin, zmax)
-
-    # Remove tick labels on x and y
-    ax.set_xticklabels([])
-    ax.set_yticklabels([])
-
-    # ax.view_init(30, -60)
-
-    # Add a color bar which maps values to colors
-    fig.colorbar(surf, shrink=0.5, aspect=5)
-
-    if save:
-        plt.tight_layout()
-        plt.savefig(picturename, dpi=dpi)
-    # plt.show()
-    
-
-
-def make_gif(picture_names, filename, kind, gif_type):
-    
-    gifname = "Gifs/" + filename + "-" + gif_type + "-" + kind + ".gif"
-    
-    with imageio.get_writer(gifname, mode='I') as writer:
-        for picturename in picture_names:
-            image = imageio.imread(picturename)
-            writer.append_data(image)
-            
-    # Remove files
-    for picturename in picture_names:
-        os.remove(picturename)
-
-
-
-def create_all_gifs(X, filename, kind, every=2_000, window=4, max_value=1000, N_max=None):
-    # imshow
-    imshow_names = movie2png(X, filename, kind, every=every, max_value=max_value, movie_type='imshow', N_max=N_max)
-    make_gif(imshow_names, filename, kind, 'imshow')
-    
-    # surface
-    surface_names = movie2png(X, filename, kind, every=every, max_value=max_value, movie_type='surface', N_max=N_max)
-    make_gif(surface_names, filename, kind, 'surface')
-    
-    # catscan
-    catscan_names = catscan2png(X[-1], filename, kind, window=window)
-    make_gif(catscan_names, filename, kind, 'catscan')
+import render
+
+
+# Shared by all calls, so its caches of grids and frames carry over
+renderer = None
+
+
+
+def catscan_gif(M, filename, kind, window=10, z_min=None, z_max=None, cmap="viridis", scale=4, workers=1):
+    """
+    Write the catscan of grid M to Gifs/<filename>-catscan-<kind>.gif in one
+    pass (see render.catscan_indices): by default the windows cover the
+    values of M instead of 0 to 1000. Each cell is scale x scale pixels,
+    and the frames have no colorbar, frame i shows [z_min + i * window,
+    z_min + (i + 1) * window]. Returns the windows.
+    """
+    lut = render.colormap_lut(cmap)
+    z, stack = render.catscan_indices(M, window, z_min, z_max, n_colors=len(lut), workers=workers)
+    frames = (np.repeat(np.repeat(frame, scale, axis=0), scale, axis=1) for frame in stack)
+
+    gifname = "Gifs/" + filename + "-catscan-" + kind + ".gif"
+    with open(gifname, "wb") as file:
+        file.write(render.palette_gif(frames, lut))
+    return z
+
+
+
+def get_renderer(workers=None):
+    global renderer
+    if renderer is None or (workers is not None and renderer.workers != workers):
+        if renderer is not None:
+            renderer.close()
+        renderer = render.Renderer(workers=workers)
+    return renderer
+
+
+
+def create_all_gifs(X, filename, kind, every=2_000, window=4, max_value=1000, N_max=None, times=None,
+                    cmap="viridis", dpi=350, workers=None, movie_format="gif", fast=False, scale=8):
+    """
+    Render the imshow, surface and catscan movies of X straight into
+    Gifs/<filename>-<type>-<kind>.gif (or .mp4), on workers processes
+    (see render.py). Rendering the same X again, e.g. with another cmap,
+    reuses the grids (and unchanged frames) kept by the shared renderer.
+    X can be anything indexed like an array, such as a (lazy) species of
+    a dataset.DatasetView, and only the snapshots rendered are read.
+    With fast the imshow movie is colored with a lookup table instead of
+    matplotlib (render.LUTRenderer), each cell scale x scale pixels. The
+    catscan covers the range of the data, and as a GIF it is built in one
+    pass (catscan_gif).
+    """
+    renderer = get_renderer(workers)
+    if times is None:
+        times = getattr(X, "times", None)  # e.g. a species of a dataset.DatasetView
+    if times is None:
+        times = np.arange(len(X))
+    
+    for movie_type in ('imshow', 'surface'):
+        style = render.make_style(movie_type=movie_type, cmap=cmap, vmin=0, vmax=max_value, dpi=dpi)
+        if fast and movie_type == 'imshow':
+            style.update(movie_type='lut', scale=scale)
+        jobs = renderer.movie_jobs(X, filename, kind, style, every=every, N_max=N_max, times=times)
+        gifname = "Gifs/" + filename + "-" + movie_type + "-" + kind + "." + movie_format
+        renderer.write(renderer.render(jobs), gifname)
+    
+    # catscan of the last snapshot
+    if movie_format == "gif":
+        catscan_gif(X[-1], filename, kind, window=window, cmap=cmap, scale=scale, workers=renderer.workers)
+        return
+
+    style = {"cmap": cmap, "dpi": dpi}
+    jobs = renderer.catscan_jobs(X[-1], filename, kind, times[-1], window=window, style=style)
+    gifname = "Gifs/" + filename + "-catscan-" + kind + "." + movie_format
+    renderer.write(renderer.render(jobs), gifname)
 
@@ -1,7 +1,17 @@
 import sim
-import vis
+import adaptive
+import nsm
+import streams
+import turing
+import convergence
+import analysis
+import profiling
+import store
+import dataset
 import numpy as np
 import time
+import os
+import pickle
 
 
 def get_params(filename):
@@ -24,11 +34,12 @@ class Simulation:
     * sim
     * numpy as np
     * time
+    * pickle
     
     """
     
 
-    def __init__(self, filename):
+    def __init__(self, filename, every=None, windows=None, checkpoint_every=None, params=None):
         
         """
         k2 is the birth rate for species A
@@ -36,10 +47,69 @@ class Simulation:
         k3 is the death rate for species A
         k1 is the reaction rate for "2A + B -> 3A" 
 
+        every is the stride (in time points) at which snapshots of the grids
+        are recorded, and windows an optional list of (start, stop) pairs of
+        time points outside of which nothing is recorded. Both can also be
+        set in the parameter file, by default every time point is recorded.
+        
+        checkpoint_every is the number of time points between checkpoints
+        (see Simulation.resume), by default no checkpoints are written.
+        
+        The random number generator is seeded with params['seed'] if it is
+        given in the parameter file (otherwise with entropy drawn once from
+        the operating system, which is kept as params['seed'] and so saved
+        with the store and the checkpoints), and uses the bit generator named by
+        params['bit_generator'] (by default "PCG64", see streams.py). With
+        params['step_streams'] set to True the "tau" engine draws each step
+        from its own stream, derived from the seed and the time point.
+        
+        params['engine'] is "tau" for tau-leaping with the fixed step tau
+        (the default), "adaptive" for adaptive tau-leaping (see adaptive.py)
+        with error control params['epsilon'] (by default 0.08) or "nsm"
+        for exact simulation with the next-subvolume method (see nsm.py).
+        
+        params['dtype'] is the integer type of the grids and snapshots, by
+        default "auto" for the smallest type expected to hold them (see
+        sim.choose_dtype). The grids are promoted if they outgrow it.
+        
+        params['convergence'] is an optional dictionary of settings of a
+        convergence.ConvergenceMonitor (e.g. {'stride': 10_000, 'tolerance':
+        0.02, 'smooth': 1}), which watches A and ends the run early (or
+        thins out the remaining snapshots) once the pattern is stationary.
+        Why and when the run ended is kept in self.stop and the metadata
+        of the store.
+        
+        params['m'] and params['n'] can be "auto", to fit 8 wavelengths of the
+        pattern predicted by the Turing analysis (see Simulation.turing).
+        
+        params can be given to use instead of the parameter file.
         """
         
         self.filename = filename
-        self.params = get_params(self.filename)
+        if params is None:
+            self.params = get_params(self.filename)
+        else:
+            self.params = dict(params)
+        
+        if every is not None:
+            self.params['every'] = every
+        if windows is not None:
+            self.params['windows'] = windows
+        if checkpoint_every is not None:
+            self.params['checkpoint_every'] = checkpoint_every
+        self.params.setdefault('every', 1)
+        self.params.setdefault('windows', None)
+        self.params.setdefault('checkpoint_every', None)
+        self.params.setdefault('seed', None)
+        self.params['seed'] = streams.resolve_seed(self.params['seed'])
+        self.params.setdefault('bit_generator', 'PCG64')
+        self.params.setdefault('step_streams', False)
+        self.params.setdefault('dtype', 'auto')
+        self.params.setdefault('engine', 'tau')
+        self.params.setdefault('epsilon', 0.08)
+        self.params.setdefault('convergence', None)
+        self.params.setdefault('analysis', None)
+        self.params.setdefault('profile', False)
         
         h = self.params['h']
 
@@ -52,35 +122,357 @@ class Simulation:
         self.params['k3'] = self.params['alpha']
         self.params['k1'] = self.params['kappa'] * h**6
         
+        for key in ('m', 'n'):
+            if self.params[key] == 'auto':
+                self.params[key] = turing.grid_size(self.turing()['wavelength'])
+        
+        
+    def turing(self):
+        """
+        Return the Turing analysis of the parameters (see turing.analyse),
+        cached in Data/turing_index.npz, to check whether they can form a
+        pattern at all before running.
+        """
+        index = turing.TuringIndex()
+        result = index.lookup([self.params])
+        return {key: value[0] for key, value in result.items()}
+        
         
     def go(self):
-        self.run_movie()
-        self.save_movie()
+        self.run_movie(store=self.open_store(mode="w"))
         self.report()
 
-    def run_movie(self):
+    def run_movie(self, store=None):
+        """
+        Only the current grids are carried through the time loop, the
+        snapshots at self.times are copied into self.X_A and self.X_B
+        so memory scales with the number of snapshots and not with N_t.
+        
+        If a store (see store.TrajectoryStore) is given the snapshots are
+        streamed to disk instead, and self.X_A and self.X_B become lazy
+        views of the store.
+        """
         arg_dict = {key: self.params[key] for key in 
-                    ("N_t", "m", "n", "A_init", "B_init")}
+                    ("m", "n", "A_init", "B_init")}
+        arg_dict['dtype'] = self.dtype()
+        
+        self.times = sim.snapshot_times(self.params['N_t'], self.params['every'], self.params['windows'])
+        if store is None:
+            self.X_A, self.X_B = sim.initialize_movie(len(self.times), **arg_dict)
+        M_A, M_B = sim.initialize_picture(**arg_dict)
+        
+        s = 0  # index of the next snapshot to record
+        if self.times[0] == 0:
+            self.record(s, M_A, M_B, store)
+            s += 1
+        
+        self.kernel = self.make_kernel()
+        self.step_streams = self.make_step_streams()
+        self.profiler = self.make_profiler()
+        self.monitor = convergence.ConvergenceMonitor.from_params(self.params['convergence'])
+        self.recorder = analysis.PatternRecorder.from_params(self.params['analysis'])
+        # Start the clock before the first phase, so the phases are part of the runtime
+        adaptive_steps = self.params['engine'] in ('adaptive', 'nsm')
+        self.profiler.start(total=None if adaptive_steps else self.params['N_t'] - 1)
+        self.analyse(0, M_A, M_B)
+        self.runtime = 0
+        
+        if adaptive_steps:
+            self.run_adaptive(M_A, M_B, s, store)
+        else:
+            self.run_from(0, M_A, M_B, s, store)
+    
+    
+    def dtype(self):
+        if self.params['dtype'] == 'auto':
+            return sim.choose_dtype(**{key: self.params[key] for key in 
+                                       ("mu", "beta", "alpha", "kappa", "A_init", "B_init")})
+        return np.dtype(self.params['dtype'])
+    
+    
+    def make_kernel(self):
         param_dict = {key: self.params[key] for key in 
-                      ("tau", "mu", "beta", "alpha", "kappa", "d_A", "d_B")}
-        self.X_A, self.X_B = sim.initialize_movie(**arg_dict)
+                      ("mu", "beta", "alpha", "kappa", "d_A", "d_B")}
+        shape = (self.params['m'], self.params['n'])
+        rng = streams.make_generator(self.params['seed'], self.params['bit_generator'])
         
+        if self.params['engine'] == 'adaptive':
+            return adaptive.AdaptiveTauLeapKernel(shape, **param_dict, rng=rng, epsilon=self.params['epsilon'])
+        if self.params['engine'] == 'nsm':
+            return nsm.NextSubvolumeKernel(shape, **param_dict, rng=rng)
+        if self.params['engine'] == 'tau':
+            return sim.TauLeapKernel(shape, tau=self.params['tau'], **param_dict, rng=rng)
+        raise ValueError(f"unknown engine {self.params['engine']!r}, use 'tau', 'adaptive' or 'nsm'")
+    
+    
+    def make_step_streams(self):
+        """The streams.StepStreams of the run if params['step_streams'] is set (and otherwise None)"""
+        if self.params['step_streams']:
+            return streams.StepStreams(self.params['seed'], self.params['bit_generator'])
+        return None
+    
+    
+    def run_from(self, t_start, M_A, M_B, s, store=None):
+        """
+        Run the time loop from time point t_start with grids M_A and M_B,
+        where s is the index of the next snapshot to record. The clock of
+        self.profiler must be started.
+        """
+        checkpoint_every = self.params['checkpoint_every']
+        step_streams = self.step_streams
+        
+        t_end = t_start
+        profiler = self.profiler
         start_time = time.time()
-        for t in np.arange(self.params['N_t'] - 1):
+        for t in np.arange(t_start, self.params['N_t'] - 1):
             
-            if t % 100_000 == 0:
-                print(t)
+            if step_streams is not None:
+                self.kernel.rng = step_streams.generator(t)
 
-            self.X_A[t+1], self.X_B[t+1] = sim.calculate_picture(**param_dict, M_A=self.X_A[t], M_B=self.X_B[t])
+            with profiler.phase("step"):
+                M_A, M_B = self.kernel.step(M_A, M_B)
+            profiler.step()
+            
+            if s < len(self.times) and self.times[s] == t + 1:
+                with profiler.phase("record"):
+                    self.record(s, M_A, M_B, store)
+                s += 1
+            t_end = t + 1
+            self.analyse(t + 1, M_A, M_B)
+            
+            if self.monitor is not None and not self.monitor.converged and self.monitor.due(t + 1):
+                with profiler.phase("convergence"):
+                    converged = self.monitor.check(t + 1, M_A)
+                if converged:
+                    s = self.settle(t + 1, M_A, M_B, s, store)
+                    if self.monitor.action == "stop":
+                        break
+            
+            if checkpoint_every and (t + 1) % checkpoint_every == 0:
+                with profiler.phase("checkpoint"):
+                    self.save_checkpoint(t + 1, M_A, M_B, s, store, 
+                                         runtime=self.runtime + time.time() - start_time)
         
         end_time = time.time()
-        self.runtime = end_time - start_time
+        self.runtime += end_time - start_time
+        
+        self.finish(store, t_end)
+    
+    
+    def run_adaptive(self, M_A, M_B, s, store=None):
+        """
+        Run the time loop with adaptive step sizes up to the same final time
+        as the fixed step loop, (N_t - 1) * tau, where s is the index of the
+        next snapshot to record. Steps are shortened to end exactly on the
+        time of each snapshot, and the step sizes are kept in self.taus.
+        
+        This is also the time loop of the "nsm" engine, which steps from
+        one snapshot to the next. The convergence monitor (if any) is only
+        checked at the snapshots.
+        """
+        if self.params['checkpoint_every']:
+            raise ValueError("checkpoints are only supported for the 'tau' engine")
         
+        tau = self.params['tau']
+        t_end = (self.params['N_t'] - 1) * tau
+        t_now = 0
+        self.taus = list()
+        
+        profiler = self.profiler
+        start_time = time.time()
+        while s < len(self.times):
             
-    def save_movie(self):
+            with profiler.phase("step"):
+                M_A, M_B = self.kernel.step(M_A, M_B, tau_max=self.times[s] * tau - t_now)
+            profiler.step()
+            t_now += self.kernel.dt
+            self.taus.append(self.kernel.dt)
+            
+            # Allow for rounding in the sum of the step sizes
+            if t_now >= self.times[s] * tau - 1e-9 * t_end:
+                t_now = self.times[s] * tau
+                with profiler.phase("record"):
+                    self.record(s, M_A, M_B, store)
+                s += 1
+                
+                t = self.times[s - 1]
+                self.analyse(t, M_A, M_B)
+                if self.monitor is not None and not self.monitor.converged and self.monitor.due(t):
+                    with profiler.phase("convergence"):
+                        converged = self.monitor.check(t, M_A)
+                    if converged:
+                        s = self.settle(t, M_A, M_B, s, store)
+                        if self.monitor.action == "stop":
+                            break
+        
+        end_time = time.time()
+        self.runtime += end_time - start_time
+        self.taus = np.array(self.taus)
+        
+        self.finish(store, self.times[s - 1])
+    
+    
+    def settle(self, t, M_A, M_B, s, store=None):
+        """
+        Act on the convergence monitor finding the pattern stationary at
+        time point t, where s is the index of the next snapshot to record:
+        either end the snapshots at t (recording the grids at t if they
+        are not yet), or keep every sparse_every-th of the remaining ones.
+        Returns the new s.
+        """
+        if self.monitor.action == "stop":
+            if s < len(self.times) and (s == 0 or self.times[s - 1] != t):
+                self.times[s] = t
+                self.record(s, M_A, M_B, store)
+                s += 1
+            self.times = self.times[:s]
+        else:
+            self.times = np.concatenate([self.times[:s], self.monitor.thin(self.times[s:])])
+        
+        if store is None:
+            self.X_A, self.X_B = self.X_A[:len(self.times)].copy(), self.X_B[:len(self.times)].copy()
+        print(f"Converged at time point {t}: {self.monitor.stop_reason}")
+        return s
+    
+    
+    def finish(self, store=None, t_end=None):
+        self.stop = convergence.stop_metadata(self.monitor, t_end)
+        if self.recorder is not None:
+            self.recorder.save(self.analysis_path())
+        self.profiler.stop()
+        if self.params['profile']:
+            self.profiler.save(self.profile_path())
+        
+        if store is not None:
+            store.update_metadata(self.stop)
+            store.close()
+            self.X_A, self.X_B = store["X_A"], store["X_B"]
+        
+    
+    def analyse(self, t, M_A, M_B):
+        """Record the pattern metrics (see analysis.PatternRecorder) at time point t, if due"""
+        if self.recorder is not None and self.recorder.due(t):
+            with self.profiler.phase("analysis"):
+                self.recorder.record(t, M_A, M_B)
+    
+    
+    def make_profiler(self):
+        """
+        Profiler (see profiling.py) of the run, which times the phases of
+        the steps of the kernel if the parameter profile is True (or a
+        dictionary of Profiler settings).
+        """
+        settings = self.params['profile']
+        if isinstance(settings, dict):
+            profiler = profiling.Profiler(**{"phases": True, **settings})
+        else:
+            profiler = profiling.Profiler(phases=bool(settings))
+        if hasattr(self.kernel, 'phase'):
+            self.kernel.phase = profiler.phase
+        return profiler
+    
+    
+    def profile_path(self):
+        datapath = "Data/"
+        return datapath + self.filename + "-profile.json"
+    
+    
+    def analysis_path(self):
+        datapath = "Data/"
+        return datapath + self.filename + "-analysis.npz"
+    
+    
+    def record(self, s, M_A, M_B, store=None):
+        if store is None:
+            self.X_A, self.X_B = sim.promote(self.X_A, M_A), sim.promote(self.X_B, M_B)
+            self.X_A[s], self.X_B[s] = M_A, M_B
+        else:
+            store.append(self.times[s], M_A, M_B)
+    
+    
+    def save_checkpoint(self, t, M_A, M_B, s, store, runtime):
+        """
+        Save everything needed to continue the run from time point t
+        (including the seed, the state of the random number generator and
+        the per-step streams) to Data/<filename>-checkpoint.pkl
+        """
+        state = {"filename": self.filename, "params": self.params,
+                 "t": t, "M_A": M_A, "M_B": M_B, "s": s, "runtime": runtime,
+                 "seed": self.params['seed'], "rng_state": self.kernel.rng.bit_generator.state,
+                 "step_streams": self.step_streams, "stored": store is not None,
+                 "times": self.times, "monitor": self.monitor, "recorder": self.recorder}
+        
+        if store is None:
+            state["X_A"], state["X_B"] = self.X_A, self.X_B
+        else:
+            store.flush()  # so the store on disk holds exactly the first s snapshots
+        
+        # Write to a temporary file first so a crash never leaves half a checkpoint
+        checkpoint = self.checkpoint_path()
+        with open(checkpoint + ".tmp", "wb") as file:
+            pickle.dump(state, file)
+        os.replace(checkpoint + ".tmp", checkpoint)
+    
+    
+    def checkpoint_path(self):
+        datapath = "Data/"
+        return datapath + self.filename + "-checkpoint.pkl"
+    
+    
+    @classmethod
+    def resume(cls, checkpoint):
+        """
+        Continue the run saved in the checkpoint file, giving exactly the
+        same result as the uninterrupted run would have.
+        """
+        with open(checkpoint, "rb") as file:
+            state = pickle.load(file)
+        
+        simulation = cls(state["filename"], params=state["params"])
+        if "seed" in state:
+            simulation.params['seed'] = state["seed"]
+        simulation.times = state.get("times", sim.snapshot_times(simulation.params['N_t'], simulation.params['every'], simulation.params['windows']))
+        simulation.monitor = state.get("monitor")
+        simulation.recorder = state.get("recorder")
+        simulation.runtime = state["runtime"]
+        simulation.kernel = simulation.make_kernel()
+        simulation.profiler = simulation.make_profiler()
+        simulation.kernel.rng.bit_generator.state = state["rng_state"]
+        simulation.step_streams = state.get("step_streams", simulation.make_step_streams())
+        
+        if state["stored"]:
+            movie_store = simulation.open_store(mode="a")
+            movie_store.truncate(state["s"])
+        else:
+            movie_store = None
+            simulation.X_A, simulation.X_B = state["X_A"], state["X_B"]
+        
+        simulation.profiler.start(total=simulation.params['N_t'] - 1, steps=state["t"])
+        simulation.run_from(state["t"], state["M_A"], state["M_B"], state["s"], movie_store)
+        simulation.report()
+        
+        return simulation
+    
+    
+    def open_store(self, mode="r"):
         datapath = "Data/"
-        np.save(datapath + self.filename + "-X_A" + ".npy", self.X_A)
-        np.save(datapath + self.filename + "-X_B" + ".npy", self.X_B)
+        return store.TrajectoryStore(datapath + self.filename, mode=mode, params=self.params)
+        
+            
+    def dataset(self):
+        """Lazy dataset.Dataset of the snapshots saved in Data/ (see dataset.py)"""
+        return dataset.open_dataset(self.filename)
+
+
+    def save_movie(self):
+        """
+        Write the snapshots kept in memory to the chunked store in Data/
+        (a run started with go() streams them there as it goes instead).
+        """
+        movie_store = self.open_store(mode="w")
+        for s in range(len(self.times)):
+            movie_store.append(self.times[s], self.X_A[s], self.X_B[s])
+        movie_store.close()
     
 
     def report(self):
@@ -91,9 +483,30 @@ class Simulation:
         print(self.params)
         print('\nRuntime:')
         print(self.runtime)
+        if hasattr(self, 'stop'):
+            print('\nStop:')
+            print(self.stop)
+        if getattr(self, 'recorder', None) is not None:
+            print('\nPattern:')
+            print(self.recorder.summary())
+        if getattr(self, 'profiler', None) is not None:
+            print('\nProfile:')
+            print(self.profiler.report())
+        if self.params['engine'] == 'nsm':
+            print('\nEvents:')
+            print(self.kernel.n_events)
+        elif hasattr(self, 'taus'):
+            print('\nStep sizes:')
+            print({'steps': len(self.taus), 'min': self.taus.min(), 'mean': self.taus.mean(), 
+                   'max': self.taus.max(), 'fixed tau steps': self.params['N_t'] - 1})
 
 
-    def visualize(self, every=2_000, window_A=4, max_value_A=1_000, window_B=2, max_value_B=500):
-        vis.create_all_gifs(self.X_A, self.filename, kind="X_A", every=every, window=window_A, max_value=max_value_A)
-        vis.create_all_gifs(self.X_B, self.filename, kind="X_B", every=every, window=window_B, max_value=max_value_B)
-
+    def visualize(self, every=2_000, window_A=4, max_value_A=1_000, window_B=2, max_value_B=500, cmap="viridis", workers=None, fast=False):
+        phase = self.profiler.phase if hasattr(self, 'profiler') else profiling.null_phase
+        import vis  # matplotlib is only imported when rendering
+        
+        with phase("render"):
+            vis.create_all_gifs(self.X_A, self.filename, kind="X_A", every=every, window=window_A, max_value=max_value_A, times=self.times, cmap=cmap, workers=workers, fast=fast)
+            vis.create_all_gifs(self.X_B, self.filename, kind="X_B", every=every, window=window_B, max_value=max_value_B, times=self.times, cmap=cmap, workers=workers, fast=fast)
+        if self.params['profile']:
+            self.profiler.save(self.profile_path())  # now with the time spent rendering